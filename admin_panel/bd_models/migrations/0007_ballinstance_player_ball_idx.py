@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bd_models", "0006_player_extra_data"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ballinstance",
+            index=models.Index(fields=["player", "ball"], name="ballinstance_player_ball_idx"),
+        ),
+    ]
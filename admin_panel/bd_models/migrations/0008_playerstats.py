@@ -0,0 +1,62 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bd_models", "0007_ballinstance_player_ball_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlayerStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("owned", models.IntegerField(default=0, help_text="Number of instances owned")),
+                (
+                    "caught",
+                    models.IntegerField(
+                        default=0, help_text="Number of owned instances not traded"
+                    ),
+                ),
+                (
+                    "specials",
+                    models.IntegerField(
+                        default=0, help_text="Number of owned special instances"
+                    ),
+                ),
+                (
+                    "distinct_balls",
+                    models.IntegerField(default=0, help_text="Number of different balls owned"),
+                ),
+                (
+                    "trades",
+                    models.IntegerField(default=0, help_text="Number of trades and donations"),
+                ),
+                (
+                    "trade_partners",
+                    models.IntegerField(default=0, help_text="Number of players traded with"),
+                ),
+                ("last_catch", models.DateTimeField(blank=True, null=True)),
+                (
+                    "player",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="bd_models.player",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "player stats",
+                "db_table": "playerstats",
+                "managed": True,
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bd_models", "0008_playerstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ballinstance",
+            name="effective_attack",
+            field=models.IntegerField(
+                default=0,
+                editable=False,
+                help_text="Attack including the bonus, maintained for sorting",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ballinstance",
+            name="effective_health",
+            field=models.IntegerField(
+                default=0,
+                editable=False,
+                help_text="Health including the bonus, maintained for sorting",
+            ),
+        ),
+        migrations.RunSQL(
+            "UPDATE ballinstance i SET "
+            "effective_attack = b.attack + trunc(b.attack * i.attack_bonus * 0.01), "
+            "effective_health = b.health + trunc(b.health * i.health_bonus * 0.01) "
+            "FROM ball b WHERE b.id = i.ball_id",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="ballinstance",
+            index=models.Index(fields=["player", "catch_date"], name="ballinstance_player_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ballinstance",
+            index=models.Index(fields=["player", "favorite"], name="ballinstance_player_fav_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ballinstance",
+            index=models.Index(
+                fields=["player", "effective_attack"], name="ballinstance_player_atk_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ballinstance",
+            index=models.Index(
+                fields=["player", "effective_health"], name="ballinstance_player_hp_idx"
+            ),
+        ),
+    ]
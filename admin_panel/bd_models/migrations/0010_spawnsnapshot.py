@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bd_models", "0009_ballinstance_effective_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpawnSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("shard_id", models.IntegerField(unique=True)),
+                (
+                    "shard_count",
+                    models.IntegerField(help_text="Number of shards when the state was saved"),
+                ),
+                (
+                    "manager",
+                    models.CharField(
+                        help_text="Python path of the spawn manager", max_length=200
+                    ),
+                ),
+                ("saved_at", models.DateTimeField(auto_now=True)),
+                (
+                    "data",
+                    models.BinaryField(
+                        help_text="Compressed state, specific to the spawn manager"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "spawnsnapshot",
+                "managed": True,
+            },
+        ),
+    ]
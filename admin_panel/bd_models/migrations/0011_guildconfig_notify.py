@@ -0,0 +1,47 @@
+from django.db import migrations
+
+# notifies the bot of every change to a guild configuration, so that its cache stays up to date
+# with the edits made from the admin panel or other processes
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION guildconfig_notify() RETURNS trigger AS $$
+DECLARE
+    config guildconfig;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        config := OLD;
+    ELSE
+        config := NEW;
+    END IF;
+    PERFORM pg_notify(
+        'guildconfig',
+        json_build_object(
+            'op', TG_OP,
+            'guild_id', config.guild_id,
+            'spawn_channel', config.spawn_channel,
+            'enabled', config.enabled
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER guildconfig_notify
+AFTER INSERT OR UPDATE OR DELETE ON guildconfig
+FOR EACH ROW EXECUTE FUNCTION guildconfig_notify();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS guildconfig_notify ON guildconfig;
+DROP FUNCTION IF EXISTS guildconfig_notify();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bd_models", "0010_spawnsnapshot"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# notifies the bot of the players whose instances were created, deleted, or changed owner, ball
+# or special, so that their cached inventory summaries are dropped when another process wrote
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION ballinstance_notify() RETURNS trigger AS $$
+BEGIN
+    -- identical notifications of a transaction are sent once, so each player is notified once
+    -- whatever the number of rows written
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM pg_notify('ballinstance', json_build_object('player_id', OLD.player_id)::text);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM pg_notify('ballinstance', json_build_object('player_id', NEW.player_id)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER ballinstance_notify_insert
+AFTER INSERT ON ballinstance
+FOR EACH ROW EXECUTE FUNCTION ballinstance_notify();
+
+-- locks, favorites and the other columns aren't summarized and don't fire the trigger
+CREATE TRIGGER ballinstance_notify_update
+AFTER UPDATE OF player_id, ball_id, special_id ON ballinstance
+FOR EACH ROW
+WHEN ((OLD.player_id, OLD.ball_id, OLD.special_id)
+    IS DISTINCT FROM (NEW.player_id, NEW.ball_id, NEW.special_id))
+EXECUTE FUNCTION ballinstance_notify();
+
+CREATE TRIGGER ballinstance_notify_delete
+AFTER DELETE ON ballinstance
+FOR EACH ROW EXECUTE FUNCTION ballinstance_notify();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS ballinstance_notify_insert ON ballinstance;
+DROP TRIGGER IF EXISTS ballinstance_notify_update ON ballinstance;
+DROP TRIGGER IF EXISTS ballinstance_notify_delete ON ballinstance;
+DROP FUNCTION IF EXISTS ballinstance_notify();
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bd_models", "0011_guildconfig_notify"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -5,7 +5,7 @@ from typing import Any, Iterable, cast
 
 from django.contrib import admin
 from django.core.cache import cache
-from django.db import models
+from django.db import connections, models
 from django.utils.safestring import SafeText, mark_safe
 from django.utils.timezone import now
 
@@ -249,7 +249,19 @@ class Ball(models.Model):
         self.catch_names = lower_catch_names(self.catch_names)
         self.translations = lower_catch_names(self.translations)
 
-        return super().save(force_insert, force_update, using, update_fields)
+        previous = None
+        if self.pk is not None:
+            previous = Ball.objects.filter(pk=self.pk).values_list("attack", "health").first()
+        super().save(force_insert, force_update, using, update_fields)
+        if previous is not None and previous != (self.attack, self.health):
+            # keep the sorting columns of the instances in sync with the new stats
+            with connections[using or "default"].cursor() as cursor:
+                cursor.execute(
+                    "UPDATE ballinstance SET "
+                    "effective_attack = %s + trunc(%s * attack_bonus * 0.01), "
+                    "effective_health = %s + trunc(%s * health_bonus * 0.01) WHERE ball_id = %s",
+                    [self.attack, self.attack, self.health, self.health, self.pk],
+                )
 
     class Meta:
         managed = True
@@ -284,6 +296,12 @@ class BallInstance(models.Model):
         blank=True, null=True, help_text="If the instance was locked for a trade and when"
     )
     spawned_time = models.DateTimeField(blank=True, null=True)
+    effective_attack = models.IntegerField(
+        default=0, editable=False, help_text="Attack including the bonus, maintained for sorting"
+    )
+    effective_health = models.IntegerField(
+        default=0, editable=False, help_text="Health including the bonus, maintained for sorting"
+    )
 
     def __getattribute__(self, name: str) -> Any:
         if name == "ball":
@@ -317,10 +335,33 @@ class BallInstance(models.Model):
             return str(self.catch_date - self.spawned_time)
         return "-"
 
+    def save(
+        self,
+        force_insert: bool = False,
+        force_update: bool = False,
+        using: str | None = None,
+        update_fields: Iterable[str] | None = None,
+    ) -> None:
+        # same rounding as the bot
+        self.effective_attack = self.ball.attack + int(self.ball.attack * self.attack_bonus * 0.01)
+        self.effective_health = self.ball.health + int(self.ball.health * self.health_bonus * 0.01)
+        return super().save(force_insert, force_update, using, update_fields)
+
     class Meta:
         managed = True
         db_table = "ballinstance"
         unique_together = (("player", "id"),)
+        indexes = [
+            models.Index(fields=("player", "ball"), name="ballinstance_player_ball_idx"),
+            models.Index(fields=("player", "catch_date"), name="ballinstance_player_date_idx"),
+            models.Index(fields=("player", "favorite"), name="ballinstance_player_fav_idx"),
+            models.Index(
+                fields=("player", "effective_attack"), name="ballinstance_player_atk_idx"
+            ),
+            models.Index(
+                fields=("player", "effective_health"), name="ballinstance_player_hp_idx"
+            ),
+        ]
 
 
 class BlacklistedID(models.Model):
@@ -412,3 +453,38 @@ class Block(models.Model):
     class Meta:
         managed = True
         db_table = "block"
+
+
+class PlayerStats(models.Model):
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, related_name="stats")
+    player_id: int
+    owned = models.IntegerField(default=0, help_text="Number of instances owned")
+    caught = models.IntegerField(default=0, help_text="Number of owned instances not traded")
+    specials = models.IntegerField(default=0, help_text="Number of owned special instances")
+    distinct_balls = models.IntegerField(default=0, help_text="Number of different balls owned")
+    trades = models.IntegerField(default=0, help_text="Number of trades and donations")
+    trade_partners = models.IntegerField(default=0, help_text="Number of players traded with")
+    last_catch = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"Stats of {self.player}"
+
+    class Meta:
+        managed = True
+        db_table = "playerstats"
+        verbose_name_plural = "player stats"
+
+
+class SpawnSnapshot(models.Model):
+    shard_id = models.IntegerField(unique=True)
+    shard_count = models.IntegerField(help_text="Number of shards when the state was saved")
+    manager = models.CharField(max_length=200, help_text="Python path of the spawn manager")
+    saved_at = models.DateTimeField(auto_now=True)
+    data = models.BinaryField(help_text="Compressed state, specific to the spawn manager")
+
+    def __str__(self) -> str:
+        return f"Spawn state of shard {self.shard_id}"
+
+    class Meta:
+        managed = True
+        db_table = "spawnsnapshot"
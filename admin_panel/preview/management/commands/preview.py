@@ -5,6 +5,7 @@ import sys
 from django.core.management.base import BaseCommand, CommandError, CommandParser
 from tortoise.exceptions import DoesNotExist
 
+from ballsdex.core.image_generator.encoder import get_encoder
 from ballsdex.core.image_generator.image_gen import draw_card
 from ballsdex.core.models import Ball, BallInstance, Special
 from ballsdex.settings import settings
@@ -82,7 +83,7 @@ class Command(BaseCommand):
                 )
             image.show(title=ball.country)
         else:
-            image.save(sys.stdout.buffer, **kwargs)
+            sys.stdout.buffer.write(get_encoder("preview").encode(image, kwargs))
 
     def handle(self, *args, **options):
         loop = asyncio.get_event_loop()
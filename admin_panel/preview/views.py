@@ -1,6 +1,7 @@
 from django.contrib import messages
 from django.http import HttpRequest, HttpResponse
 
+from ballsdex.core.image_generator.encoder import get_encoder, image_format
 from ballsdex.core.image_generator.image_gen import draw_card
 from ballsdex.core.models import Ball, BallInstance, Special
 
@@ -14,9 +15,8 @@ async def render_ballinstance(request: HttpRequest, ball_pk: int) -> HttpRespons
     instance = BallInstance(ball=ball)
     image, kwargs = draw_card(instance, media_path="./media/")
 
-    response = HttpResponse(content_type="image/png")
-    image.save(response, **kwargs)  # type: ignore
-    return response
+    data = get_encoder("preview").encode(image, kwargs)
+    return HttpResponse(data, content_type=f"image/{image_format(data).lower()}")
 
 
 async def render_special(request: HttpRequest, special_pk: int) -> HttpResponse:
@@ -34,6 +34,5 @@ async def render_special(request: HttpRequest, special_pk: int) -> HttpResponse:
     instance = BallInstance(ball=ball, special=special)
     image, kwargs = draw_card(instance, media_path="./media/")
 
-    response = HttpResponse(content_type="image/png")
-    image.save(response, **kwargs)  # type: ignore
-    return response
+    data = get_encoder("preview").encode(image, kwargs)
+    return HttpResponse(data, content_type=f"image/{image_format(data).lower()}")
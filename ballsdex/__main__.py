@@ -14,9 +14,11 @@ import yarl
 from discord.ext.commands import when_mentioned_or
 from rich import print
 from tortoise import Tortoise
+from tortoise.backends.base.config_generator import expand_db_url
 
 from ballsdex import __version__ as bot_version
 from ballsdex.core.bot import BallsDexBot
+from ballsdex.core.utils.notifications import notifications
 from ballsdex.logging import init_logger
 from ballsdex.settings import read_settings, settings, update_settings, write_default_settings
 
@@ -238,7 +240,10 @@ class RemoveWSBehindMsg(logging.Filter):
 
 async def init_tortoise(db_url: str, *, skip_migrations: bool = False):
     log.debug(f"Database URL: {db_url}")
-    await Tortoise.init(config=TORTOISE_ORM)
+    connection = expand_db_url(db_url)
+    # track the connections of the pool, to recognize the notifications of our own writes
+    connection["credentials"]["init"] = notifications.register_backend
+    await Tortoise.init(config={**TORTOISE_ORM, "connections": {"default": connection}})
 
 
 def main():
@@ -1,30 +1,40 @@
 from __future__ import annotations
 
 import asyncio
-import inspect
 import logging
 import math
 import time
-import types
 from datetime import datetime
+from pathlib import Path
 from typing import TYPE_CHECKING, Self, cast
 
 import aiohttp
 import discord
 import discord.gateway
 from aiohttp import ClientTimeout
-from cachetools import TTLCache
 from discord import app_commands
 from discord.app_commands.translator import TranslationContextTypes, locale_str
 from discord.enums import Locale
 from discord.ext import commands
-from prometheus_client import Histogram
 from rich import box, print
 from rich.console import Console
 from rich.table import Table
 
 from ballsdex.core.commands import Core
 from ballsdex.core.dev import Dev
+from ballsdex.core.image_generator.assets import asset_store
+from ballsdex.core.image_generator.cache import card_cache, changed_rows
+from ballsdex.core.image_generator.encoder import get_encoder
+from ballsdex.core.image_generator.image_gen import artwork_size
+from ballsdex.core.image_generator.render import RenderService
+from ballsdex.core.image_generator.wild_cards import wild_cards
+from ballsdex.core.instrumentation import (
+    instrument_database,
+    instrument_http,
+    on_request_end,
+    on_request_start,
+    track_queries,
+)
 from ballsdex.core.metrics import PrometheusServer
 from ballsdex.core.models import (
     Ball,
@@ -38,13 +48,18 @@ from ballsdex.core.models import (
     regimes,
     specials,
 )
+from ballsdex.core.utils.completion import completion_engine
+from ballsdex.core.utils.guild_configs import guild_configs
+from ballsdex.core.utils.inventory import inventories
+from ballsdex.core.utils.notifications import notifications
+from ballsdex.core.utils.sampling import samplers
+from ballsdex.core.utils.search import ball_search
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
     from discord.ext.commands.bot import PrefixType
 
 log = logging.getLogger("ballsdex.core.bot")
-http_counter = Histogram("discord_http_requests", "HTTP requests", ["key", "code"])
 
 
 def owner_check(ctx: commands.Context[BallsDexBot]):
@@ -63,38 +78,6 @@ class Translator(app_commands.Translator):
         )
 
 
-# observing the duration and status code of HTTP requests through aiohttp TraceConfig
-async def on_request_start(
-    session: aiohttp.ClientSession,
-    trace_ctx: types.SimpleNamespace,
-    params: aiohttp.TraceRequestStartParams,
-):
-    # register t1 before sending request
-    trace_ctx.start = session.loop.time()
-
-
-async def on_request_end(
-    session: aiohttp.ClientSession,
-    trace_ctx: types.SimpleNamespace,
-    params: aiohttp.TraceRequestEndParams,
-):
-    time = session.loop.time() - trace_ctx.start
-
-    # to categorize HTTP calls per path, we need to access the corresponding discord.http.Route
-    # object, which is not available in the context of an aiohttp TraceConfig, therefore it's
-    # obtained by accessing the locals() from the calling function HTTPConfig.request
-    # "params.url.path" is not usable as it contains raw IDs and tokens, breaking categories
-    frame = inspect.currentframe()
-    _locals = frame.f_back.f_back.f_back.f_back.f_back.f_locals  # type: ignore
-    if route := _locals.get("route"):
-        route_key = route.key
-    else:
-        # calling function is HTTPConfig.static_login which has no Route object
-        route_key = f"{params.response.method} {params.url.path}"
-
-    http_counter.labels(route_key, params.response.status).observe(time)
-
-
 class CommandTree(app_commands.CommandTree):
     disable_time_check: bool = False
 
@@ -122,6 +105,13 @@ class CommandTree(app_commands.CommandTree):
             return False  # wait for all shards to be connected
         return await bot.blacklist_check(interaction)
 
+    async def _call(self, interaction: discord.Interaction[BallsDexBot]):
+        if settings.prometheus_enabled or settings.query_log_threshold is not None:
+            with track_queries(interaction):
+                await super()._call(interaction)
+        else:
+            await super()._call(interaction)
+
 
 class BallsDexBot(commands.AutoShardedBot):
     """
@@ -156,6 +146,9 @@ class BallsDexBot(commands.AutoShardedBot):
             trace.on_request_start.append(on_request_start)
             trace.on_request_end.append(on_request_end)
             options["http_trace"] = trace
+            instrument_http()
+        if settings.prometheus_enabled or settings.query_log_threshold is not None:
+            instrument_database()
 
         super().__init__(command_prefix, intents=intents, tree_cls=CommandTree, **options)
         self.tree.disable_time_check = disable_time_check  # type: ignore
@@ -174,7 +167,13 @@ class BallsDexBot(commands.AutoShardedBot):
         self.blacklist_guild: set[int] = set()
         self.catch_log: set[int] = set()
         self.command_log: set[int] = set()
-        self.locked_balls = TTLCache(maxsize=99999, ttl=60 * 30)
+        self.inventories = inventories
+
+        card_cache.configure(
+            settings.card_cache_size * 1024 * 1024,
+            Path(settings.card_cache_directory) if settings.card_cache_directory else None,
+        )
+        self.render_service = RenderService(settings.render_workers, settings.render_queue_size)
 
         self.owner_ids: set[int]
 
@@ -220,6 +219,9 @@ class BallsDexBot(commands.AutoShardedBot):
         for emoji in await self.fetch_application_emojis():
             self.application_emojis[emoji.id] = emoji
 
+        old_balls, old_regimes = balls.copy(), regimes.copy()
+        old_economies, old_specials = economies.copy(), specials.copy()
+
         balls.clear()
         for ball in await Ball.all():
             balls[ball.pk] = ball
@@ -240,6 +242,51 @@ class BallsDexBot(commands.AutoShardedBot):
             specials[special.pk] = special
         table.add_row("Special events", str(len(specials)))
 
+        samplers.rebuild_balls(balls.values())
+        completion_engine.rebuild(balls.values(), specials.values())
+        ball_search.rebuild(balls.values())
+        # the admin panel may have edited instances without notifying us
+        inventories.invalidate()
+        samplers.schedule_specials(self.loop)
+
+        if old_balls:
+            # the keys of the cards depending on edited rows changed, free their entries
+            changed_regimes = changed_rows(old_regimes, regimes)
+            changed_economies = changed_rows(old_economies, economies)
+            card_cache.invalidate(
+                ball_ids=changed_rows(old_balls, balls)
+                | {
+                    x.pk
+                    for x in balls.values()
+                    if x.regime_id in changed_regimes or x.economy_id in changed_economies
+                },
+                special_ids=changed_rows(old_specials, specials),
+            )
+
+        # the render workers hold their own assets, the bot only loads the ones it draws
+        if self.render_service.workers <= 0:
+            await self.loop.run_in_executor(
+                None,
+                asset_store.preload,
+                list(balls.values()),
+                list(regimes.values()),
+                list(economies.values()),
+                list(specials.values()),
+                artwork_size,
+            )
+            table.add_row(
+                "Card assets", f"{len(asset_store)} ({asset_store.memory_usage >> 20} MiB)"
+            )
+        await self.loop.run_in_executor(
+            None,
+            wild_cards.load,
+            list(balls.values()),
+            settings.spawn_cache_size * 1024 * 1024,
+            get_encoder("spawn") if settings.spawn_cache_reencode else None,
+        )
+        table.add_row("Wild cards", f"{len(wild_cards)} ({wild_cards.size >> 20} MiB)")
+        self.render_service.start()
+
         self.blacklist = set()
         for blacklisted_id in await BlacklistedID.all().only("discord_id"):
             self.blacklist.add(blacklisted_id.discord_id)
@@ -250,10 +297,23 @@ class BallsDexBot(commands.AutoShardedBot):
             self.blacklist_guild.add(blacklisted_id.discord_id)
         table.add_row("Blacklisted guilds", str(len(self.blacklist_guild)))
 
+        # listen first to receive the changes made while loading
+        notifications.start(self.loop)
+        await guild_configs.load(self.shard_count or 1, self.shards.keys() or (0,))
+        table.add_row("Guild configs", str(len(guild_configs)))
+
+        self.dispatch("ballsdex_cache_loaded")
+
         log.info("Cache loaded, summary displayed below:")
         console = Console()
         console.print(table)
 
+    async def close(self) -> None:
+        samplers.cancel()
+        notifications.cancel()
+        self.render_service.shutdown()
+        await super().close()
+
     async def gateway_healthy(self) -> bool:
         """Check whether or not the gateway proxy is ready and healthy."""
         if settings.gateway_url is None:
@@ -7,12 +7,18 @@ import discord
 from discord.ext import commands
 from tortoise import Tortoise
 
-from ballsdex.core.dev import pagify, send_interactive
-from ballsdex.core.models import Ball
+from ballsdex.core.dev import box, pagify, send_interactive
+from ballsdex.core.image_generator.encoder import SITES, Encoder, benchmark_encoders, get_encoder
+from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.models import Ball, BallInstance, Player, PlayerStats, balls
+from ballsdex.core.utils.sorting import benchmark_sorting
 from ballsdex.settings import settings
 
 log = logging.getLogger("ballsdex.core.commands")
 
+# number of players processed by each query of the player statistics commands
+STATS_BATCH_SIZE = 1000
+
 if TYPE_CHECKING:
     from .bot import BallsDexBot
 
@@ -112,6 +118,148 @@ class Core(commands.Cog):
         t2 = time.time()
         await ctx.send(f"Analyzed database in {round((t2 - t1) * 1000)}ms.")
 
+    async def _player_id_batches(self):
+        last = await Player.all().order_by("-id").limit(1).values_list("id", flat=True)
+        for first_id in range(1, (last[0] if last else 0) + 1, STATS_BATCH_SIZE):
+            yield first_id, first_id + STATS_BATCH_SIZE - 1
+
+    @commands.command()
+    @commands.is_owner()
+    async def rebuildstats(self, ctx: commands.Context):
+        """
+        Recompute the statistics of every player from their instances and trades.
+
+        This backfills the statistics after the table was created, the bot keeps them updated
+        afterwards.
+        """
+        t1 = time.time()
+        total = 0
+        async with ctx.typing():
+            async for first_id, last_id in self._player_id_batches():
+                total += await PlayerStats.rebuild(first_id, last_id)
+        t2 = time.time()
+        await ctx.send(f"Rebuilt the statistics of {total:,} players in {round(t2 - t1, 1)}s.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def checkstats(self, ctx: commands.Context, fix: bool = False):
+        """
+        Compare the statistics of every player with their instances and trades.
+
+        Parameters
+        ----------
+        fix: bool
+            Rebuild the statistics of the inconsistent players.
+        """
+        inconsistent: list[int] = []
+        async with ctx.typing():
+            async for first_id, last_id in self._player_id_batches():
+                ids = await PlayerStats.inconsistent(first_id, last_id)
+                if ids and fix:
+                    for player_id in ids:
+                        await PlayerStats.rebuild(player_id, player_id)
+                inconsistent.extend(ids)
+        if not inconsistent:
+            await ctx.send("The statistics of every player are consistent.")
+            return
+        log.warning(f"Inconsistent statistics for players {inconsistent}")
+        text = f"{len(inconsistent):,} players have inconsistent statistics"
+        text += ", they were rebuilt." if fix else ", use `checkstats true` to rebuild them."
+        await ctx.send(f"{text}\n{box(', '.join(map(str, inconsistent[:100])))}")
+
+    @commands.command()
+    @commands.is_owner()
+    async def benchencoders(self, ctx: commands.Context):
+        """
+        Render the card of every countryball and report the size and encoding time of each
+        configured output format, along with a few reference formats.
+        """
+        encoders = {f"{site} (config)": get_encoder(site) for site in SITES}
+        encoders.update(
+            {
+                "webp q80 m4": Encoder("WEBP", quality=80, method=4),
+                "webp q60 m6": Encoder("WEBP", quality=60, method=6),
+                "webp lossless": Encoder("WEBP", lossless=True),
+                "jpeg q85": Encoder("JPEG", quality=85),
+                "png": Encoder("PNG"),
+            }
+        )
+        # rendered lazily to avoid holding every decoded card in memory
+        images = (draw_card(BallInstance(ball=ball))[0] for ball in list(balls.values()))
+
+        async with ctx.typing():
+            results = await self.bot.loop.run_in_executor(
+                None, benchmark_encoders, images, encoders
+            )
+
+        lines = [f"{'Encoder':<20} {'Avg size':>10} {'Avg time':>10}"]
+        for name, (count, size, duration) in results.items():
+            if not count:
+                continue
+            lines.append(
+                f"{name:<20} {size / count / 1024:>7.1f} KB {duration / count:>7.1f} ms"
+            )
+        table = "\n".join(lines)
+        await ctx.send(f"Encoded {len(balls)} {settings.plural_collectible_name}.\n{box(table)}")
+
+    @commands.command()
+    @commands.is_owner()
+    async def benchsort(
+        self, ctx: commands.Context, rows: int = 1_000_000, player_rows: int = 100_000
+    ):
+        """
+        Explain the first page of an inventory with each sorting method, over a temporary
+        table of synthetic instances. Nothing is written to the real tables.
+
+        Parameters
+        ----------
+        rows: int
+            Total number of synthetic instances.
+        player_rows: int
+            Number of instances owned by the explained player.
+        """
+        async with ctx.typing():
+            results = await benchmark_sorting(rows, player_rows)
+
+        lines = [f"{rows:,} instances, {player_rows:,} for the player"]
+        for name, (nodes, duration) in results.items():
+            lines.append(f"{name:<14} {duration:>9.1f} ms  {' > '.join(nodes)}")
+        await send_interactive(ctx, pagify("\n".join(lines), shorten_by=10), block="")
+
+    @commands.command()
+    @commands.is_owner()
+    async def benchspawn(
+        self, ctx: commands.Context, guilds: int = 50_000, messages: int = 1_000_000
+    ):
+        """
+        Replay a synthetic message stream through the configured spawn manager, in a separate
+        thread and event loop. Peak memory is traced for the whole process.
+
+        Parameters
+        ----------
+        guilds: int
+            Number of synthetic guilds.
+        messages: int
+            Number of messages, spread over one hour.
+        """
+        from ballsdex.packages.countryballs.benchmark import benchmark_spawn_manager
+        from ballsdex.packages.countryballs.spawn import SpawnManager
+
+        cog = self.bot.get_cog("CountryBallsSpawner")
+        manager_cls = type(cog.spawn_manager) if cog else SpawnManager  # type: ignore
+
+        async with ctx.typing():
+            rate, peak, spawns = await asyncio.to_thread(
+                asyncio.run,
+                benchmark_spawn_manager(lambda: manager_cls(self.bot), guilds, messages),
+            )
+
+        await ctx.send(
+            f"{manager_cls.__name__}: {messages:,} messages across {guilds:,} guilds\n"
+            f"{rate:,.0f} messages per second, {peak / 1024 / 1024:.1f} MB peak memory, "
+            f"{spawns:,} spawns"
+        )
+
     @commands.command()
     @commands.is_owner()
     async def migrateemotes(self, ctx: commands.Context):
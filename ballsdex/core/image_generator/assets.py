@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from PIL import Image, ImageOps
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import Ball, Economy, Regime, Special
+
+log = logging.getLogger("ballsdex.core.image_generator.assets")
+
+__all__ = ("AssetStore", "asset_store")
+
+ICON_SIZE = (170, 170)
+
+
+def _mtime(path: str) -> int:
+    return os.stat(path).st_mtime_ns
+
+
+class AssetStore:
+    """
+    In-memory atlas of the decoded images used to draw cards.
+
+    Backgrounds are stored converted to RGBA, economy icons, collection artworks and frame
+    overlays are additionally fitted to the size they are pasted with, so a render only has to
+    copy the background and composite onto it.
+
+    Each entry remembers the modification time of its source file and is reloaded when the
+    file changes on disk. Missing entries are loaded on first access, this object is
+    thread-safe.
+    """
+
+    def __init__(self):
+        self._images: dict[tuple[str, str], tuple[int, Image.Image]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def memory_usage(self) -> int:
+        """
+        The number of bytes used by the decoded images.
+        """
+        return sum(
+            image.width * image.height * len(image.getbands())
+            for _, image in self._images.values()
+        )
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def _get(self, kind: str, path: str, loader: Callable[[Image.Image], Image.Image]):
+        mtime = _mtime(path)
+        with self._lock:
+            entry = self._images.get((kind, path))
+            if entry and entry[0] == mtime:
+                return entry[1]
+
+        with Image.open(path) as source:
+            image = loader(source.convert("RGBA"))
+        # loading is done outside the lock, the last loader wins in case of a race
+        with self._lock:
+            if entry:
+                log.debug(f"Reloading modified asset {path}")
+            self._images[(kind, path)] = (mtime, image)
+        return image
+
+    def background(self, path: str) -> Image.Image:
+        """
+        Return a regime or special background, converted to RGBA.
+
+        The returned image is shared and must be copied before being drawn on.
+        """
+        return self._get("background", path, lambda x: x)
+
+    def icon(self, path: str) -> Image.Image:
+        """
+        Return an economy icon, converted to RGBA and fitted to 170x170.
+        """
+        return self._get("icon", path, lambda x: ImageOps.fit(x, ICON_SIZE))
+
+    def artwork(self, path: str, size: tuple[int, int]) -> Image.Image:
+        """
+        Return a collection artwork, converted to RGBA and fitted to the given size.
+        """
+        return self._get(f"artwork-{size[0]}x{size[1]}", path, lambda x: ImageOps.fit(x, size))
+
+    def overlay(self, path: str, size: tuple[int, int]) -> Image.Image:
+        """
+        Return a frame overlay, converted to RGBA and resized to the size of the card.
+        """
+        return self._get(f"overlay-{size[0]}x{size[1]}", path, lambda x: x.resize(size))
+
+    def preload(
+        self,
+        balls: Iterable["Ball"],
+        regimes: Iterable["Regime"],
+        economies: Iterable["Economy"],
+        specials: Iterable["Special"],
+        artwork_size: tuple[int, int],
+        media_path: str = "./admin_panel/media/",
+    ):
+        """
+        Load all the assets used by the given models, and drop the ones no longer referenced.
+
+        This is blocking and should be ran in an executor.
+        """
+        wanted: list[tuple[str, str]] = []
+        wanted.extend(("background", media_path + x.background) for x in regimes)
+        wanted.extend(("background", media_path + x.background) for x in specials if x.background)
+        wanted.extend(("icon", media_path + x.icon) for x in economies)
+        wanted.extend(
+            (f"artwork-{artwork_size[0]}x{artwork_size[1]}", media_path + x.collection_card)
+            for x in balls
+        )
+
+        with self._lock:
+            for key in self._images.keys() - set(wanted):
+                if not key[0].startswith("overlay"):
+                    del self._images[key]
+
+        for kind, path in wanted:
+            try:
+                if kind == "background":
+                    self.background(path)
+                elif kind == "icon":
+                    self.icon(path)
+                else:
+                    self.artwork(path, artwork_size)
+            except OSError:
+                log.warning(f"Failed to load card asset {path}", exc_info=True)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+
+asset_store = AssetStore()
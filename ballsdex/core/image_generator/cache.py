@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Mapping
+
+if TYPE_CHECKING:
+    from tortoise.models import Model
+
+    from ballsdex.core.models import BallInstance
+
+log = logging.getLogger("ballsdex.core.image_generator.cache")
+
+__all__ = ("CardCache", "card_cache", "changed_rows")
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _row_signature(instance: "Model") -> tuple:
+    return tuple(getattr(instance, name) for name in instance._meta.fields_db_projection)
+
+
+def changed_rows(old: Mapping[int, "Model"], new: Mapping[int, "Model"]) -> set[int]:
+    """
+    Compare two snapshots of a model cache and return the primary keys of the rows that were
+    added, removed or modified in between.
+
+    Parameters
+    ----------
+    old: Mapping[int, Model]
+        The previous content of the cache, indexed by primary key.
+    new: Mapping[int, Model]
+        The new content of the cache, indexed by primary key.
+
+    Returns
+    -------
+    set[int]
+        The primary keys of the rows that differ.
+    """
+    changed = set(old.keys() ^ new.keys())
+    for pk in old.keys() & new.keys():
+        if _row_signature(old[pk]) != _row_signature(new[pk]):
+            changed.add(pk)
+    return changed
+
+
+class CardCache:
+    """
+    Content-addressed cache of encoded card images.
+
+    A card is fully determined by its countryball, special, stat bonuses and frame, as well as
+    the content of the rows and asset files used to draw it. Those inputs are hashed together
+    to form the key of the cache entry, so a row edited while the bot was offline or a modified
+    asset file on disk naturally results in a miss.
+
+    The cache has two tiers: an in-memory LRU bounded by a byte budget, and an optional on-disk
+    tier that persists across restarts. Entries are indexed by ball and special, allowing
+    invalidation when the corresponding database rows are edited.
+
+    This object is thread-safe, since cards are rendered outside of the event loop.
+
+    Parameters
+    ----------
+    max_size: int
+        Maximum number of bytes held in memory. ``0`` disables the memory tier.
+    directory: Path | None
+        Directory of the on-disk tier, or ``None`` to disable it.
+    """
+
+    def __init__(self, max_size: int = 0, directory: Path | None = None):
+        self.max_size = max_size
+        self.directory = directory
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._owners: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 or self.directory is not None
+
+    def configure(self, max_size: int, directory: Path | None = None):
+        """
+        Update the limits of the cache, evicting entries if needed.
+
+        Parameters
+        ----------
+        max_size: int
+            Maximum number of bytes held in memory. ``0`` disables the memory tier.
+        directory: Path | None
+            Directory of the on-disk tier, or ``None`` to disable it.
+        """
+        with self._lock:
+            self.max_size = max_size
+            self.directory = directory
+            if directory is not None:
+                directory.mkdir(parents=True, exist_ok=True)
+            self._evict()
+
+    def key(
+        self,
+        ball_instance: "BallInstance",
+        frame: str | None = None,
+        media_path: str = "./admin_panel/media/",
+        variant: str = "",
+    ) -> str:
+        """
+        Compute the cache key of a card.
+
+        Parameters
+        ----------
+        ball_instance: BallInstance
+            The instance to render. Its countryball and special must be cached.
+        frame: str | None
+            The path of the frame overlay applied on top of the card.
+        media_path: str
+            The path to the media folder, used to read the modification time of the assets.
+        variant: str
+            Any additional information that changes the output, like the encoding format.
+
+        Returns
+        -------
+        str
+            The hexadecimal digest identifying the card.
+        """
+        ball = ball_instance.countryball
+        special = ball_instance.specialcard
+        assets = [ball.collection_card, ball.cached_regime.background]
+        if ball.cached_economy:
+            assets.append(ball.cached_economy.icon)
+        if special and special.background:
+            assets.append(special.background)
+        files = [media_path + str(asset) for asset in assets]
+        if frame:
+            # the overlay path is already resolved, outside of the media folder
+            files.append(frame)
+
+        # names, stats, texts and credits are drawn from the rows themselves
+        rows = (ball, ball.cached_regime, ball.cached_economy, special)
+        parts = [
+            ball.pk,
+            special.pk if special else 0,
+            ball_instance.attack_bonus,
+            ball_instance.health_bonus,
+            *(_row_signature(row) if row else None for row in rows),
+            variant,
+            *((path, _mtime(path)) for path in files),
+        ]
+        digest = hashlib.sha1(repr(parts).encode(), usedforsecurity=False).hexdigest()
+        return f"{ball.pk}-{special.pk if special else 0}-{digest}"
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        ball_id, _ = key.split("-", 1)
+        return self.directory / ball_id / key
+
+    def _evict(self):
+        while self.size > self.max_size and self._entries:
+            key, data = self._entries.popitem(last=False)
+            del self._owners[key]
+            self.size -= len(data)
+
+    def _store(self, key: str, data: bytes):
+        if len(data) > self.max_size:
+            return
+        ball_id, special_id, _ = key.split("-", 2)
+        self._entries[key] = data
+        self._owners[key] = (int(ball_id), int(special_id))
+        self.size += len(data)
+        self._evict()
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Retrieve an encoded card from the cache.
+
+        Parameters
+        ----------
+        key: str
+            The key returned by `key`.
+
+        Returns
+        -------
+        bytes | None
+            The encoded image, or ``None`` if it's not cached.
+        """
+        with self._lock:
+            if (data := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            if self.directory is not None:
+                try:
+                    data = self._path(key).read_bytes()
+                except OSError:
+                    pass
+                else:
+                    self._store(key, data)
+                    self.hits += 1
+                    return data
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: bytes):
+        """
+        Insert an encoded card in the cache.
+
+        Parameters
+        ----------
+        key: str
+            The key returned by `key`.
+        data: bytes
+            The encoded image.
+        """
+        with self._lock:
+            if key in self._entries:
+                return
+            self._store(key, data)
+            if self.directory is None:
+                return
+            path = self._path(key)
+            try:
+                path.parent.mkdir(exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+            except OSError:
+                log.warning(f"Failed to write card {key} to the disk cache", exc_info=True)
+
+    def invalidate(self, ball_ids: Iterable[int] = (), special_ids: Iterable[int] = ()) -> int:
+        """
+        Drop all cached cards of the given balls and specials, from both tiers.
+
+        Parameters
+        ----------
+        ball_ids: Iterable[int]
+            IDs of the balls whose cards must be dropped.
+        special_ids: Iterable[int]
+            IDs of the specials whose cards must be dropped.
+
+        Returns
+        -------
+        int
+            The number of entries dropped from memory.
+        """
+        ball_ids = set(ball_ids)
+        special_ids = set(special_ids)
+        if not ball_ids and not special_ids:
+            return 0
+        with self._lock:
+            keys = [
+                key
+                for key, (ball_id, special_id) in self._owners.items()
+                if ball_id in ball_ids or special_id in special_ids
+            ]
+            for key in keys:
+                self.size -= len(self._entries.pop(key))
+                del self._owners[key]
+
+            if self.directory is not None:
+                for ball_id in ball_ids:
+                    shutil.rmtree(self.directory / str(ball_id), ignore_errors=True)
+                for special_id in special_ids:
+                    for path in self.directory.glob(f"*/*-{special_id}-*"):
+                        path.unlink(missing_ok=True)
+        if keys:
+            log.debug(f"Invalidated {len(keys)} cached cards")
+        return len(keys)
+
+    def clear(self):
+        """
+        Drop every entry from the memory tier. The disk tier is left untouched, its entries
+        are only reached by keys hashing the current rows and asset files.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self.size = 0
+
+
+card_cache = CardCache()
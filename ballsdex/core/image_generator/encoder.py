@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Iterable
+
+from ballsdex.settings import settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+log = logging.getLogger("ballsdex.core.image_generator.encoder")
+
+__all__ = ("Encoder", "get_encoder", "image_format", "benchmark_encoders")
+
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg", "PNG": "png", "GIF": "gif"}
+SITES = ("spawn", "info", "pack", "preview")
+
+
+def image_format(data: bytes) -> str:
+    """
+    Detect the format of encoded image data from its header.
+
+    Returns
+    -------
+    str
+        The PIL name of the format, ``WEBP`` if it cannot be determined.
+    """
+    if data[:3] == b"\xff\xd8\xff":
+        return "JPEG"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "PNG"
+    if data[:4] == b"GIF8":
+        return "GIF"
+    return "WEBP"
+
+
+@dataclass(frozen=True, slots=True)
+class Encoder:
+    """
+    Output settings of an image, configured per call site in the ``card-encoding`` section.
+
+    Attributes
+    ----------
+    format: str
+        One of ``WEBP``, ``JPEG`` or ``PNG``.
+    quality: int
+        Quality between 0 and 100, ignored for PNG and lossless WEBP.
+    method: int
+        WEBP compression effort between 0 (fast) and 6 (small).
+    lossless: bool
+        Use lossless WEBP compression.
+    max_size: int | None
+        Size in bytes above which the image is re-encoded as JPEG.
+    fallback_quality: int
+        Quality of the JPEG fallback.
+    """
+
+    format: str = "WEBP"
+    quality: int = 80
+    method: int = 4
+    lossless: bool = False
+    max_size: int | None = None
+    fallback_quality: int = 80
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> Encoder:
+        max_size = config.get("max-size")
+        return cls(
+            format=str(config.get("format", "webp")).upper().replace("JPG", "JPEG"),
+            quality=int(config.get("quality", 80)),
+            method=int(config.get("method", 4)),
+            lossless=bool(config.get("lossless", False)),
+            max_size=int(max_size) * 1024 if max_size else None,
+            fallback_quality=int(config.get("fallback-quality", 80)),
+        )
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.format]
+
+    def save_kwargs(self) -> dict[str, Any]:
+        if self.format == "WEBP":
+            return {
+                "format": "WEBP",
+                "quality": self.quality,
+                "method": self.method,
+                "lossless": self.lossless,
+            }
+        if self.format == "JPEG":
+            return {"format": "JPEG", "quality": self.quality, "optimize": True}
+        return {"format": self.format}
+
+    def encode(self, image: "Image.Image", extra: dict[str, Any] | None = None) -> bytes:
+        """
+        Encode an image with these settings.
+
+        Parameters
+        ----------
+        image: Image.Image
+            The image to encode.
+        extra: dict[str, Any] | None
+            Additional arguments given by the generator, like ``save_all`` for animations.
+            The ``format`` key is ignored.
+
+        Returns
+        -------
+        bytes
+            The encoded image. Use `image_format` to know the format actually used, as it may
+            differ with the JPEG fallback.
+        """
+        kwargs = {k: v for k, v in (extra or {}).items() if k != "format"}
+        kwargs.update(self.save_kwargs())
+        if self.format == "JPEG":
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        image.save(buffer, **kwargs)
+        if self.max_size and buffer.tell() > self.max_size and self.format != "JPEG":
+            buffer = BytesIO()
+            image.convert("RGB").save(
+                buffer, format="JPEG", quality=self.fallback_quality, optimize=True
+            )
+        return buffer.getvalue()
+
+
+def get_encoder(site: str) -> Encoder:
+    """
+    Return the encoder configured for a call site.
+
+    Parameters
+    ----------
+    site: str
+        One of ``spawn``, ``info``, ``pack`` or ``preview``. The values of the ``default`` key
+        are used when not overridden.
+    """
+    config = settings.card_encoding.get("default") or {}
+    config = {**config, **(settings.card_encoding.get(site) or {})}
+    return Encoder.from_config(config)
+
+
+def benchmark_encoders(
+    images: Iterable["Image.Image"], encoders: dict[str, Encoder]
+) -> dict[str, tuple[int, int, float]]:
+    """
+    Encode the given images with every encoder. This is blocking.
+
+    Returns
+    -------
+    dict[str, tuple[int, int, float]]
+        For each encoder, the number of images, the total of encoded bytes and the total time
+        spent encoding in milliseconds.
+    """
+    results = {name: (0, 0, 0.0) for name in encoders}
+    for image in images:
+        for name, encoder in encoders.items():
+            t1 = time.perf_counter()
+            size = len(encoder.encode(image))
+            t2 = time.perf_counter()
+            count, total, duration = results[name]
+            results[name] = (count + 1, total + size, duration + (t2 - t1) * 1000)
+    return results
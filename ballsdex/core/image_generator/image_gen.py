@@ -3,7 +3,9 @@ import textwrap
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFont
+
+from ballsdex.core.image_generator.assets import asset_store
 
 if TYPE_CHECKING:
     from ballsdex.core.models import BallInstance
@@ -17,7 +19,7 @@ RECTANGLE_WIDTH = WIDTH - 40
 RECTANGLE_HEIGHT = (HEIGHT // 5) * 2
 
 CORNERS = ((0, 181), (1428, 948))
-artwork_size = [b - a for a, b in zip(*CORNERS)]
+artwork_size = tuple(b - a for a, b in zip(*CORNERS))
 
 # ===== TIP =====
 #
@@ -45,27 +47,19 @@ def get_credit_color(image: Image.Image, region: tuple) -> tuple:
     brightness = sum(image.convert("L").getdata()) / image.width / image.height  # type: ignore
     return (0, 0, 0, 255) if brightness > 100 else (255, 255, 255, 255)
 
-    
-def draw_card(ball_instance: "BallInstance", media_path: str = "./admin_panel/media/", frame_overlay: Image.Image = None):
+
+def draw_card(ball_instance: "BallInstance", media_path: str = "./admin_panel/media/"):
     ball = ball_instance.countryball
     ball_health = (237, 115, 101, 255)
     ball_credits = ball.credits
     
     if special_image := ball_instance.special_card:
-        image = Image.open(media_path + special_image)
+        image = asset_store.background(media_path + special_image).copy()
         if ball_instance.specialcard and ball_instance.specialcard.credits:
             ball_credits += f" • {ball_instance.specialcard.credits}"
     else:
-        image = Image.open(media_path + ball.cached_regime.background)
-    image = image.convert("RGBA")
-    if frame_overlay:
-        frame_overlay = frame_overlay.resize(image.size)
-        image = Image.alpha_composite(image, frame_overlay)
-    icon = (
-        Image.open(media_path + ball.cached_economy.icon).convert("RGBA")
-        if ball.cached_economy
-        else None
-    )
+        image = asset_store.background(media_path + ball.cached_regime.background).copy()
+    icon = asset_store.icon(media_path + ball.cached_economy.icon) if ball.cached_economy else None
 
     draw = ImageDraw.Draw(image)
     draw.text(
@@ -130,13 +124,10 @@ def draw_card(ball_instance: "BallInstance", media_path: str = "./admin_panel/me
         stroke_fill=(255, 255, 255, 255),
     )
 
-    artwork = Image.open(media_path + ball.collection_card).convert("RGBA")
-    image.paste(ImageOps.fit(artwork, artwork_size), CORNERS[0])  # type: ignore
+    artwork = asset_store.artwork(media_path + ball.collection_card, artwork_size)  # type: ignore
+    image.paste(artwork, CORNERS[0])  # type: ignore
 
     if icon:
-        icon = ImageOps.fit(icon, (170, 170))
         image.paste(icon, (1142, 1030), mask=icon)
-        icon.close()
-    artwork.close()
 
     return image, {"format": "WEBP"}
\ No newline at end of file
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TYPE_CHECKING, Any
+
+from PIL import Image
+
+from ballsdex.core.image_generator.assets import asset_store
+from ballsdex.core.image_generator.cache import card_cache
+from ballsdex.core.image_generator.encoder import Encoder, get_encoder
+from ballsdex.core.image_generator.image_gen import artwork_size, draw_card
+from ballsdex.core.metrics import render_queue_wait, render_time
+from ballsdex.core.models import BallInstance
+
+if TYPE_CHECKING:
+    from tortoise.models import Model
+
+log = logging.getLogger("ballsdex.core.image_generator.render")
+
+__all__ = ("CardDescriptor", "RenderService")
+
+MEDIA_PATH = "./admin_panel/media/"
+
+
+def _dump(instance: "Model") -> dict[str, Any]:
+    return {name: getattr(instance, name) for name in instance._meta.fields_db_projection}
+
+
+@dataclass(frozen=True, slots=True)
+class CardDescriptor:
+    """
+    Picklable description of a card, sent to the render workers instead of ORM objects.
+
+    The rows the card is drawn from are included, so that the workers follow the edits of the
+    models cache without being restarted.
+    """
+
+    ball_id: int
+    special_id: int | None
+    attack_bonus: int
+    health_bonus: int
+    frame: str | None = None
+    rows: tuple[tuple[str, dict[str, Any]], ...] = ()
+
+    @classmethod
+    def from_instance(cls, instance: "BallInstance", frame: str | None = None) -> CardDescriptor:
+        ball = instance.countryball
+        rows = [("balls", ball), ("regimes", ball.cached_regime)]
+        if economy := ball.cached_economy:
+            rows.append(("economies", economy))
+        if special := instance.specialcard:
+            rows.append(("specials", special))
+        return cls(
+            instance.ball_id,
+            instance.special_id,
+            instance.attack_bonus,
+            instance.health_bonus,
+            frame,
+            tuple((name, _dump(row)) for name, row in rows),
+        )
+
+
+def _snapshot() -> dict[str, list[dict[str, Any]]]:
+    from ballsdex.core.models import balls, economies, regimes, specials
+
+    return {
+        "balls": [_dump(x) for x in balls.values()],
+        "regimes": [_dump(x) for x in regimes.values()],
+        "economies": [_dump(x) for x in economies.values()],
+        "specials": [_dump(x) for x in specials.values()],
+    }
+
+
+def _init_worker(snapshot: dict[str, list[dict[str, Any]]], media_path: str):
+    """
+    Initializer of the render processes. Rebuilds the model caches from the snapshot taken
+    by the bot, then decodes all the assets in advance. Fonts are loaded on import.
+    """
+    from tortoise import Tortoise
+
+    from ballsdex.core import models
+
+    # relations must be set up to construct models, no connection is needed for that
+    Tortoise.init_models(["ballsdex.core.models"], "models")
+    _update_rows(tuple((name, row) for name, rows in snapshot.items() for row in rows))
+
+    asset_store.preload(
+        models.balls.values(),
+        models.regimes.values(),
+        models.economies.values(),
+        models.specials.values(),
+        artwork_size,  # type: ignore
+        media_path,
+    )
+
+
+def _draw(instance: BallInstance, media_path: str, frame: str | None, encoder: Encoder) -> bytes:
+    image, kwargs = draw_card(instance, media_path)
+    if frame:
+        # the frame is a single composite step over the base card
+        image = Image.alpha_composite(image, asset_store.overlay(frame, image.size))
+    data = encoder.encode(image, kwargs)
+    image.close()
+    return data
+
+
+def _update_rows(rows: tuple[tuple[str, dict[str, Any]], ...]):
+    """
+    Replace the rows of the models cache of a worker which differ from the ones of the bot.
+    """
+    from ballsdex.core import models
+
+    classes = {
+        "balls": models.Ball,
+        "regimes": models.Regime,
+        "economies": models.Economy,
+        "specials": models.Special,
+    }
+    for name, row in rows:
+        cache: dict = getattr(models, name)
+        if (current := cache.get(row["id"])) is None or _dump(current) != row:
+            cache[row["id"]] = classes[name](**row)
+
+
+def _render(
+    descriptor: CardDescriptor, media_path: str, encoder: Encoder
+) -> tuple[bytes, float, float]:
+    start = time.time()
+    _update_rows(descriptor.rows)
+    instance = BallInstance(
+        ball_id=descriptor.ball_id,
+        special_id=descriptor.special_id,
+        attack_bonus=descriptor.attack_bonus,
+        health_bonus=descriptor.health_bonus,
+    )
+    data = _draw(instance, media_path, descriptor.frame, encoder)
+    return data, start, time.time()
+
+
+class RenderService:
+    """
+    Long-lived pool of processes rendering cards, keeping PIL work away from the event loop.
+
+    The workers hold their own copy of the cached models and of the decoded assets. The rows
+    a card is drawn from are sent with each render, and modified asset files are reloaded, so
+    the pool is only started once. It is started again if a worker dies.
+
+    Parameters
+    ----------
+    workers: int
+        Number of render processes. If 0, cards are rendered in a thread of the bot process.
+    queue_size: int
+        Maximum number of renders submitted at once, additional calls wait for a free slot.
+    media_path: str
+        Path to the folder containing the assets.
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 32, media_path: str = MEDIA_PATH):
+        self.workers = workers
+        self.media_path = media_path
+        self.pending = 0
+        self.executor: ProcessPoolExecutor | None = None
+        self._semaphore = asyncio.Semaphore(queue_size)
+
+    def start(self):
+        """
+        Start the pool of workers with the current models cache, if it isn't running.
+        """
+        if self.workers <= 0 or self.executor is not None:
+            return
+        self._start()
+
+    def _start(self):
+        old = self.executor
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(_snapshot(), self.media_path),
+        )
+        if old:
+            old.shutdown(wait=False)
+        log.debug(f"Started a pool of {self.workers} render workers")
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _submit(
+        self, descriptor: CardDescriptor, instance: "BallInstance", encoder: Encoder
+    ) -> bytes:
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self.pending += 1
+        try:
+            async with self._semaphore:
+                if executor := self.executor:
+                    try:
+                        data, start, end = await loop.run_in_executor(
+                            executor, _render, descriptor, self.media_path, encoder
+                        )
+                    except BrokenProcessPool:
+                        # every later render would fail, replace the pool once and retry
+                        if self.executor is executor:
+                            log.warning("A render worker died, restarting the pool")
+                            self._start()
+                        assert self.executor
+                        data, start, end = await loop.run_in_executor(
+                            self.executor, _render, descriptor, self.media_path, encoder
+                        )
+                else:
+                    start = time.time()
+                    data = await loop.run_in_executor(
+                        None, _draw, instance, self.media_path, descriptor.frame, encoder
+                    )
+                    end = time.time()
+        finally:
+            self.pending -= 1
+        render_queue_wait.observe(start - submitted)
+        render_time.observe(end - start)
+        return data
+
+    async def render(
+        self, instance: "BallInstance", frame: str | None = None, site: str = "info"
+    ) -> BytesIO:
+        """
+        Render the card of a ball instance, or fetch it from the render cache.
+
+        Parameters
+        ----------
+        instance: BallInstance
+            The ball instance to draw.
+        frame: str | None
+            Path to a frame overlay composited over the card.
+        site: str
+            The call site, selecting the encoder settings. See `get_encoder`.
+
+        Returns
+        -------
+        BytesIO
+            A buffer containing the encoded image.
+        """
+        encoder = get_encoder(site)
+        key = None
+        if card_cache.enabled:
+            key = card_cache.key(instance, frame, self.media_path, repr(encoder))
+        if key and (data := card_cache.get(key)) is not None:
+            return BytesIO(data)
+
+        descriptor = CardDescriptor.from_instance(instance, frame)
+        data = await self._submit(descriptor, instance, encoder)
+        if key:
+            card_cache.put(key, data)
+        return BytesIO(data)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import logging
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from PIL import Image
+
+from ballsdex.core.image_generator.encoder import EXTENSIONS, image_format
+
+if TYPE_CHECKING:
+    from ballsdex.core.image_generator.encoder import Encoder
+    from ballsdex.core.models import Ball
+
+log = logging.getLogger("ballsdex.core.image_generator.wild_cards")
+
+__all__ = ("WildCardCache", "wild_cards")
+
+
+class WildCardCache:
+    """
+    In-memory copy of the wild card images sent when a countryball spawns, avoiding a disk
+    read for every spawn.
+
+    The cache is rebuilt as a whole by `load`, and read from the event loop afterwards.
+    """
+
+    def __init__(self):
+        self._payloads: dict[int, tuple[bytes, str]] = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _read(self, path: Path, encoder: "Encoder | None") -> tuple[bytes, str]:
+        data = path.read_bytes()
+        if encoder and encoder.max_size and len(data) > encoder.max_size:
+            with Image.open(BytesIO(data)) as image:
+                # animations are kept as-is, the encoder only outputs the first frame
+                if not getattr(image, "is_animated", False):
+                    data = encoder.encode(image.convert("RGBA"))
+        return data, EXTENSIONS.get(image_format(data), path.suffix.lstrip("."))
+
+    def load(
+        self,
+        balls: Iterable["Ball"],
+        max_size: int,
+        encoder: "Encoder | None" = None,
+        media_path: str = "./admin_panel/media/",
+    ):
+        """
+        Read the wild cards of the enabled balls, most common first, until the memory budget
+        is reached. This is blocking and should be ran in an executor.
+
+        Parameters
+        ----------
+        balls: Iterable[Ball]
+            The balls to load.
+        max_size: int
+            Maximum number of bytes held in memory.
+        encoder: Encoder | None
+            If provided, images bigger than the encoder's size limit are re-encoded with it.
+        media_path: str
+            Path to the folder containing the assets.
+        """
+        payloads: dict[int, tuple[bytes, str]] = {}
+        size = 0
+        for ball in sorted(balls, key=lambda x: x.rarity, reverse=True):
+            if not ball.enabled or ball.rarity <= 0:
+                continue
+            try:
+                data, extension = self._read(Path(media_path + ball.wild_card), encoder)
+            except OSError:
+                log.warning(f"Failed to load wild card of {ball.country}", exc_info=True)
+                continue
+            if size + len(data) > max_size:
+                log.warning(
+                    f"Spawn cache is full, {ball.country} and rarer wild cards are read from disk"
+                )
+                break
+            payloads[ball.pk] = (data, extension)
+            size += len(data)
+        self._payloads = payloads
+        self.size = size
+
+    def get(self, ball: "Ball") -> tuple[BytesIO, str] | None:
+        """
+        Return the wild card of a ball, if it's cached.
+
+        Returns
+        -------
+        tuple[BytesIO, str] | None
+            A buffer over the cached bytes (not copied until written to) and the file extension.
+        """
+        if payload := self._payloads.get(ball.pk):
+            return BytesIO(payload[0]), payload[1]
+        return None
+
+
+wild_cards = WildCardCache()
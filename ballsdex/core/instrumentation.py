@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import functools
+import logging
+import time
+import types
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Iterator
+
+import aiohttp
+import discord
+import discord.http
+from prometheus_client import Gauge, Histogram
+
+from ballsdex.settings import settings
+
+if TYPE_CHECKING:
+    from ballsdex.core.bot import BallsDexBot
+
+log = logging.getLogger("ballsdex.core.instrumentation")
+
+__all__ = (
+    "QueryStats",
+    "current_queries",
+    "instrument_database",
+    "instrument_http",
+    "on_request_end",
+    "on_request_start",
+    "track_queries",
+)
+
+http_counter = Histogram("discord_http_requests", "HTTP requests", ["key", "code"])
+http_ratelimit_remaining = Gauge(
+    "discord_http_ratelimit_remaining",
+    "Requests remaining in the ratelimit bucket of a route, as of its last response",
+    ["key"],
+)
+http_ratelimit_wait = Histogram(
+    "discord_http_ratelimit_wait",
+    "Time spent by HTTP requests waiting before and between attempts, on ratelimits or retries",
+    ["key"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf")),
+)
+
+command_queries = Histogram(
+    "command_db_queries",
+    "Number of database queries made by application commands",
+    ["command"],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200, 500, float("inf")),
+)
+command_rows = Histogram(
+    "command_db_rows",
+    "Number of rows returned by the database to application commands",
+    ["command"],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000, float("inf")),
+)
+command_db_time = Histogram(
+    "command_db_time", "Time spent waiting on the database by application commands", ["command"]
+)
+
+
+class QueryStats:
+    """
+    Database usage accumulated by the code running under `track_queries`.
+    """
+
+    __slots__ = ("queries", "rows", "time")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.time = 0.0
+
+
+current_queries: ContextVar[QueryStats | None] = ContextVar("current_queries", default=None)
+
+
+def _count_rows(result: Any) -> int:
+    # (count, rows) for execute_query, list for execute_query_dict, record for execute_insert
+    if isinstance(result, tuple):
+        return len(result[1])
+    if isinstance(result, list):
+        return len(result)
+    return 0 if result is None else 1
+
+
+def instrument_database():
+    """
+    Count the queries, rows and time spent by the Tortoise client in the current `QueryStats`.
+
+    Every query method of the asyncpg client, in or out of transactions, goes through
+    ``_translate_exceptions``, which is wrapped once here. Nothing is recorded outside of
+    `track_queries`.
+    """
+    from tortoise.backends.asyncpg.client import AsyncpgDBClient
+
+    original = AsyncpgDBClient._translate_exceptions
+    if getattr(original, "__instrumented__", False):
+        return
+
+    @functools.wraps(original)
+    async def _translate_exceptions(self, func, *args, **kwargs):
+        stats = current_queries.get()
+        if stats is None:
+            return await original(self, func, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = await original(self, func, *args, **kwargs)
+        finally:
+            stats.time += time.perf_counter() - start
+            stats.queries += 1
+        stats.rows += _count_rows(result)
+        return result
+
+    _translate_exceptions.__instrumented__ = True  # type: ignore
+    AsyncpgDBClient._translate_exceptions = _translate_exceptions  # type: ignore
+
+
+@contextmanager
+def track_queries(interaction: discord.Interaction["BallsDexBot"]) -> Iterator[QueryStats]:
+    """
+    Attribute the database queries made while handling an interaction to its command.
+
+    Tasks started meanwhile inherit the context and are counted as long as they finish before
+    the command. When the ``query-log-threshold`` setting is set, commands making more queries
+    are logged.
+    """
+    stats = QueryStats()
+    token = current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+        if (
+            interaction.type == discord.InteractionType.application_command
+            and interaction.command is not None
+        ):
+            name = interaction.command.qualified_name
+            if settings.prometheus_enabled:
+                command_queries.labels(name).observe(stats.queries)
+                command_rows.labels(name).observe(stats.rows)
+                command_db_time.labels(name).observe(stats.time)
+            threshold = settings.query_log_threshold
+            if threshold is not None and stats.queries > threshold:
+                log.warning(
+                    f"/{name} made {stats.queries} queries returning {stats.rows} rows "
+                    f"in {stats.time * 1000:.1f}ms (interaction {interaction.id})"
+                )
+
+
+class RouteTrace:
+    """
+    The route of the Discord API request being made by the current task, and the time spent in
+    its HTTP attempts so far.
+    """
+
+    __slots__ = ("key", "http_time")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.http_time = 0.0
+
+
+current_route: ContextVar[RouteTrace | None] = ContextVar("current_route", default=None)
+
+
+def instrument_http():
+    """
+    Wrap `discord.http.HTTPClient.request` once to expose the route of each request to the
+    aiohttp trace callbacks, and measure the time spent outside of the HTTP attempts, which is
+    waiting on ratelimits or retrying.
+    """
+    original = discord.http.HTTPClient.request
+    if getattr(original, "__instrumented__", False):
+        return
+
+    @functools.wraps(original)
+    async def request(self, route: discord.http.Route, *args, **kwargs):
+        trace = RouteTrace(route.key)
+        token = current_route.set(trace)
+        start = time.perf_counter()
+        try:
+            return await original(self, route, *args, **kwargs)
+        finally:
+            current_route.reset(token)
+            waited = time.perf_counter() - start - trace.http_time
+            http_ratelimit_wait.labels(trace.key).observe(max(waited, 0))
+
+    request.__instrumented__ = True  # type: ignore
+    discord.http.HTTPClient.request = request  # type: ignore
+
+
+# observing the duration and status code of HTTP requests through aiohttp TraceConfig
+async def on_request_start(
+    session: aiohttp.ClientSession,
+    trace_ctx: types.SimpleNamespace,
+    params: aiohttp.TraceRequestStartParams,
+):
+    # register t1 before sending request
+    trace_ctx.start = time.perf_counter()
+
+
+async def on_request_end(
+    session: aiohttp.ClientSession,
+    trace_ctx: types.SimpleNamespace,
+    params: aiohttp.TraceRequestEndParams,
+):
+    duration = time.perf_counter() - trace_ctx.start
+
+    # trace callbacks run in the task of the request, where the wrapper of HTTPClient.request
+    # has set the route, "params.url.path" is not usable as it contains raw IDs and tokens
+    if (route := current_route.get()) is not None:
+        route.http_time += duration
+        route_key = route.key
+        if (remaining := params.response.headers.get("X-RateLimit-Remaining")) is not None:
+            http_ratelimit_remaining.labels(route_key).set(float(remaining))
+    else:
+        # requests made directly with the session, such as the gateway connection
+        route_key = f"{params.response.method} {params.url.path}"
+
+    http_counter.labels(route_key, params.response.status).observe(duration)
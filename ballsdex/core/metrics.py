@@ -16,6 +16,14 @@ log = logging.getLogger("ballsdex.core.metrics")
 caught_balls = Counter(
     "caught_cb", "Caught countryballs", ["country", "special", "guild_size", "spawn_algo"]
 )
+render_queue_wait = Histogram(
+    "card_render_wait", "Time spent by card renders waiting for a worker"
+)
+render_time = Histogram("card_render_time", "Time spent rendering and encoding cards")
+autocomplete_time = Histogram(
+    "autocomplete_time", "Time spent generating autocompletion choices", ["transformer"]
+)
+trade_commit_time = Histogram("trade_commit_time", "Time spent committing trades to the database")
 
 
 class PrometheusServer:
@@ -36,6 +44,7 @@ class PrometheusServer:
         self.app.add_routes((web.get("/metrics", self.get),))
 
         self.guild_count = Gauge("guilds", "Number of guilds the server is in", ["size"])
+        self.render_queue = Gauge("card_render_queue", "Number of card renders in progress")
         self.shards_latecy = Histogram(
             "gateway_latency", "Shard latency with the Discord gateway", ["shard_id"]
         )
@@ -73,6 +82,8 @@ class PrometheusServer:
         for size, count in guilds.items():
             self.guild_count.labels(size=size).set(count)
 
+        self.render_queue.set(self.bot.render_service.pending)
+
         for shard_id, latency in self.bot.latencies:
             self.shards_latecy.labels(shard_id=shard_id).observe(latency)
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
 from datetime import datetime, timedelta
 from enum import IntEnum
 from io import BytesIO
@@ -8,11 +8,17 @@ from typing import TYPE_CHECKING, Iterable, Tuple, Type
 
 import discord
 from discord.utils import format_dt
-from tortoise import exceptions, fields, models, signals, timezone, validators
+from tortoise import Tortoise, exceptions, fields, models, signals, timezone, validators
 from tortoise.contrib.postgres.indexes import PostgreSQLIndex
 from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
 
+from ballsdex.core.image_generator.cache import card_cache
+from ballsdex.core.image_generator.encoder import EXTENSIONS, get_encoder, image_format
 from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.metrics import caught_balls
+from ballsdex.core.utils.inventory import inventories
+from ballsdex.core.utils.locks import lock_manager
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -200,6 +206,29 @@ class Ball(models.Model):
 Ball.register_listener(signals.Signals.pre_save, lower_catch_names())
 Ball.register_listener(signals.Signals.pre_save, lower_translations()) 
 
+
+async def update_effective_stats(
+    model: Type[Ball],
+    instance: Ball,
+    created: bool,
+    using_db: "BaseDBAsyncClient | None" = None,
+    update_fields: Iterable[str] | None = None,
+):
+    if created:
+        return
+    # same rounding as BallInstance.attack and BallInstance.health, only changed rows are written
+    connection = using_db or Tortoise.get_connection("default")
+    await connection.execute_query(
+        "UPDATE ballinstance SET effective_attack = $2 + trunc($2 * attack_bonus * 0.01), "
+        "effective_health = $3 + trunc($3 * health_bonus * 0.01) WHERE ball_id = $1 "
+        "AND (effective_attack <> $2 + trunc($2 * attack_bonus * 0.01) "
+        "OR effective_health <> $3 + trunc($3 * health_bonus * 0.01))",
+        [instance.pk, instance.attack, instance.health],
+    )
+
+
+Ball.register_listener(signals.Signals.post_save, update_effective_stats)
+
 class BallInstance(models):
     ball_id: int
     special_id: int
@@ -230,6 +259,12 @@ class BallInstance(models):
         default=None,
     )
     extra_data = fields.JSONField(default={})
+    effective_attack = fields.IntField(
+        default=0, description="Attack including the bonus, maintained for sorting"
+    )
+    effective_health = fields.IntField(
+        default=0, description="Health including the bonus, maintained for sorting"
+    )
 
     class Meta:
         unique_together = ("player", "id")
@@ -237,6 +272,11 @@ class BallInstance(models):
             PostgreSQLIndex(fields=("ball_id",)),
             PostgreSQLIndex(fields=("player_id",)),
             PostgreSQLIndex(fields=("special_id",)),
+            PostgreSQLIndex(fields=("player_id", "ball_id")),
+            PostgreSQLIndex(fields=("player_id", "catch_date")),
+            PostgreSQLIndex(fields=("player_id", "favorite")),
+            PostgreSQLIndex(fields=("player_id", "effective_attack")),
+            PostgreSQLIndex(fields=("player_id", "effective_health")),
         ]
 
     @property
@@ -275,7 +315,7 @@ class BallInstance(models):
 
     def to_string(self, bot: discord.Client | None = None, is_trade: bool = False) -> str:
         emotes = ""
-        if bot and self.pk in bot.locked_balls and not is_trade:  # type: ignore
+        if lock_manager.is_locked(self.pk) and not is_trade:
             emotes += "🔒"
         if self.favorite and not is_trade:
             emotes += settings.favorited_collectible_emoji
@@ -328,16 +368,24 @@ class BallInstance(models):
                     text = f"{emoji} {text}"
         return text
 
-    def draw_card(self) -> BytesIO:
+    def draw_card(self, site: str = "info") -> BytesIO:
+        encoder = get_encoder(site)
+        key = card_cache.key(self, variant=repr(encoder)) if card_cache.enabled else None
+        if key and (data := card_cache.get(key)) is not None:
+            return BytesIO(data)
+
         image, kwargs = draw_card(self)
-        buffer = BytesIO()
-        image.save(buffer, **kwargs)
-        buffer.seek(0)
+        buffer = BytesIO(encoder.encode(image, kwargs))
         image.close()
+        if key:
+            card_cache.put(key, buffer.getvalue())
         return buffer
 
     async def prepare_for_message(
-        self, interaction: discord.Interaction["BallsDexBot"]
+        self,
+        interaction: discord.Interaction["BallsDexBot"],
+        frame: str | None = None,
+        site: str = "info",
     ) -> Tuple[str, discord.File, discord.ui.View]:
         # message content
         trade_content = ""
@@ -375,24 +423,153 @@ class BallInstance(models):
         )
 
         # draw image
-        with ThreadPoolExecutor() as pool:
-            buffer = await interaction.client.loop.run_in_executor(pool, self.draw_card)
+        buffer = await interaction.client.render_service.render(self, frame, site)
+        extension = EXTENSIONS[image_format(buffer.getvalue())]
 
         view = discord.ui.View()
-        return content, discord.File(buffer, "card.webp"), view
+        return content, discord.File(buffer, f"card.{extension}"), view
 
-    async def lock_for_trade(self):
-        self.locked = timezone.now()
-        await self.save(update_fields=("locked",))
+    async def lock_for_trade(self) -> bool:
+        """
+        Lock this instance, returning `False` if it was already locked. Use `lock_manager`
+        directly for multiple instances.
+        """
+        return not await lock_manager.try_lock((self,))
 
     async def unlock(self):
-        self.locked = None  # type: ignore
-        await self.save(update_fields=("locked",))
+        await lock_manager.release((self,))
+
+    async def is_locked(self) -> bool:
+        return bool(await lock_manager.check((self,)))
+
+    @classmethod
+    async def bulk_grant(
+        cls,
+        player: Player,
+        grants: Iterable[tuple[Ball, Special | None, tuple[int, int]]],
+        *,
+        server_id: int | None = None,
+        spawned_time: datetime | None = None,
+        source: str = "grant",
+        guild_size: int = 0,
+    ) -> list[BallInstance]:
+        """
+        Give multiple countryballs to a player with a single insert query.
+
+        Every countryball creation goes through this method, which also records the player
+        statistics, the inventory cache and the ``caught_cb`` metric.
+
+        Parameters
+        ----------
+        player: Player
+            The player receiving the countryballs.
+        grants: Iterable[tuple[Ball, Special | None, tuple[int, int]]]
+            The countryballs to create, with their special and their attack and health bonuses.
+        server_id: int | None
+            The ID of the server where the countryballs were obtained.
+        spawned_time: datetime | None
+            When the countryballs spawned, if they were caught from a spawn.
+        source: str
+            Where the countryballs come from, used as the ``spawn_algo`` label of the
+            ``caught_cb`` metric.
+        guild_size: int
+            The size of the server, used as the ``guild_size`` label of the ``caught_cb`` metric.
+
+        Returns
+        -------
+        list[BallInstance]
+            The created instances with their ID, in the same order as ``grants``.
+        """
+        now = timezone.now()
+        instances = [
+            cls(
+                ball=ball,
+                player=player,
+                special=special,
+                attack_bonus=attack_bonus,
+                health_bonus=health_bonus,
+                server_id=server_id,
+                catch_date=now,
+                spawned_time=spawned_time,
+            )
+            for ball, special, (attack_bonus, health_bonus) in grants
+        ]
+        if not instances:
+            return []
+        for instance in instances:
+            instance.effective_attack = instance.attack
+            instance.effective_health = instance.health
+
+        # bulk_create does not fetch the generated IDs, insert from arrays with RETURNING instead
+        # rows are returned in the order of the arrays, like Django's bulk_create relies on
+        async with in_transaction() as connection:
+            _, rows = await connection.execute_query(
+                "INSERT INTO ballinstance (ball_id, player_id, special_id, attack_bonus, "
+                "health_bonus, effective_attack, effective_health, server_id, catch_date, "
+                "spawned_time, favorite, tradeable, extra_data) "
+                "SELECT ball_id, $2, special_id, attack_bonus, health_bonus, effective_attack, "
+                "effective_health, $3, $4, $10, false, true, '{}'::jsonb "
+                "FROM unnest($1::int[], $5::int[], $6::int[], $7::int[], $8::int[], $9::int[]) "
+                "AS t(ball_id, special_id, attack_bonus, health_bonus, effective_attack, "
+                "effective_health) RETURNING id",
+                [
+                    [x.ball_id for x in instances],
+                    player.pk,
+                    server_id,
+                    now,
+                    [x.special_id for x in instances],
+                    [x.attack_bonus for x in instances],
+                    [x.health_bonus for x in instances],
+                    [x.effective_attack for x in instances],
+                    [x.effective_health for x in instances],
+                    spawned_time,
+                ],
+            )
+            for instance, row in zip(instances, rows):
+                instance.pk = row["id"]
+                instance._saved_in_db = True
+            await PlayerStats.record(player.pk, added=instances, caught=True, using_db=connection)
+        inventories.add(player.pk, instances)
+
+        for (country, special), count in Counter(
+            (x.countryball.country, x.specialcard) for x in instances
+        ).items():
+            caught_balls.labels(
+                country=country, special=special, guild_size=guild_size, spawn_algo=source
+            ).inc(count)
+        return instances
+
+
+async def compute_effective_stats(
+    model: Type[BallInstance],
+    instance: BallInstance,
+    using_db: "BaseDBAsyncClient | None" = None,
+    update_fields: Iterable[str] | None = None,
+):
+    instance.effective_attack = instance.attack
+    instance.effective_health = instance.health
 
-    async def is_locked(self):
-        await self.refresh_from_db(fields=("locked",))
-        self.locked
-        return self.locked is not None and (self.locked + timedelta(minutes=30)) > timezone.now()
+
+async def record_created_instance(
+    model: Type[BallInstance],
+    instance: BallInstance,
+    created: bool,
+    using_db: "BaseDBAsyncClient | None" = None,
+    update_fields: Iterable[str] | None = None,
+):
+    if created:
+        inventories.add(instance.player_id, (instance,))
+
+
+async def record_deleted_instance(
+    model: Type[BallInstance], instance: BallInstance, using_db: "BaseDBAsyncClient | None" = None
+):
+    inventories.remove(instance.player_id, (instance,))
+
+
+BallInstance.register_listener(signals.Signals.pre_save, compute_effective_stats)
+BallInstance.register_listener(signals.Signals.post_save, record_created_instance)
+BallInstance.register_listener(signals.Signals.post_delete, record_deleted_instance)
 
 
 class DonationPolicy(IntEnum):
@@ -463,6 +640,198 @@ class Player(models.Model):
         return self.mention_policy == MentionPolicy.ALLOW
 
 
+async def drop_deleted_inventory(
+    model: Type[Player], instance: Player, using_db: "BaseDBAsyncClient | None" = None
+):
+    inventories.invalidate(instance.pk)
+
+
+Player.register_listener(signals.Signals.post_delete, drop_deleted_inventory)
+
+
+# absolute statistics of the players between two IDs, shared by the rebuild and the checker
+PLAYER_STATS_QUERY = (
+    "SELECT p.id AS player_id, i.owned, i.caught, i.specials, i.distinct_balls, t.trades, "
+    "t.trade_partners, i.last_catch FROM player p "
+    "CROSS JOIN LATERAL (SELECT count(*) AS owned, "
+    "count(*) FILTER (WHERE trade_player_id IS NULL) AS caught, "
+    "count(*) FILTER (WHERE special_id IS NOT NULL) AS specials, "
+    "count(DISTINCT ball_id) AS distinct_balls, "
+    "max(catch_date) FILTER (WHERE trade_player_id IS NULL) AS last_catch "
+    "FROM ballinstance WHERE player_id = p.id) i "
+    "CROSS JOIN LATERAL (SELECT count(*) AS trades, count(DISTINCT CASE WHEN player1_id = p.id "
+    "THEN player2_id ELSE player1_id END) AS trade_partners "
+    "FROM trade WHERE player1_id = p.id OR player2_id = p.id) t "
+    "WHERE p.id BETWEEN $1 AND $2"
+)
+PLAYER_STATS_FIELDS = (
+    "owned",
+    "caught",
+    "specials",
+    "distinct_balls",
+    "trades",
+    "trade_partners",
+    "last_catch",
+)
+
+
+class PlayerStats(models.Model):
+    """
+    Statistics of a player, maintained incrementally in the same transaction as the catches,
+    trades, donations and packs, so that they can be displayed without scanning the inventory.
+
+    Other writes (admin commands, bets, admin panel) are not tracked, the rows are reconciled
+    with `inconsistent` and `rebuild`.
+    """
+
+    player: fields.OneToOneRelation[Player] = fields.OneToOneField(
+        "models.Player", related_name="stats", on_delete=fields.CASCADE
+    )
+    player_id: int
+    owned = fields.IntField(default=0, description="Number of instances owned")
+    caught = fields.IntField(default=0, description="Number of owned instances not traded")
+    specials = fields.IntField(default=0, description="Number of owned special instances")
+    distinct_balls = fields.IntField(default=0, description="Number of different balls owned")
+    trades = fields.IntField(default=0, description="Number of trades and donations")
+    trade_partners = fields.IntField(default=0, description="Number of players traded with")
+    last_catch = fields.DatetimeField(null=True, default=None)
+
+    def __str__(self) -> str:
+        return str(self.player_id)
+
+    @classmethod
+    async def fetch(cls, player: Player) -> PlayerStats:
+        """
+        Return the statistics of a player, computing them first if they were not backfilled.
+        """
+        stats = await cls.get_or_none(player_id=player.pk)
+        if stats is None:
+            await cls.rebuild(player.pk, player.pk)
+            stats = await cls.get(player_id=player.pk)
+        return stats
+
+    @classmethod
+    async def record(
+        cls,
+        player_id: int,
+        *,
+        added: Iterable[BallInstance] = (),
+        removed: Iterable[BallInstance] = (),
+        caught: bool = False,
+        trade: Trade | None = None,
+        using_db: "BaseDBAsyncClient | None" = None,
+    ):
+        """
+        Apply the changes of an operation to the statistics of a player. This must be called
+        after the instances were written, inside the same transaction.
+
+        Parameters
+        ----------
+        player_id: int
+            The ID of the player.
+        added: Iterable[BallInstance]
+            The instances now owned by the player.
+        removed: Iterable[BallInstance]
+            The instances no longer owned by the player, with their ``trade_player`` from before
+            the operation.
+        caught: bool
+            If the added instances were caught or obtained from a pack rather than traded.
+        trade: Trade | None
+            The trade or donation of this operation, if any.
+        using_db: BaseDBAsyncClient | None
+            The transaction of the operation.
+        """
+        added = list(added)
+        removed = list(removed)
+        connection = using_db or Tortoise.get_connection("default")
+        partner_id = None
+        if trade is not None:
+            partner_id = trade.player2_id if trade.player1_id == player_id else trade.player1_id
+        # a ball becomes distinct if it was not owned outside of the added instances, and stops
+        # being distinct if no instance is left, both are index lookups on (player_id, ball_id)
+        # balls both added and removed, like a copy swapped for another, were owned before and
+        # still are, they would otherwise be counted once more
+        added_balls = {x.ball_id for x in added}
+        removed_balls = {x.ball_id for x in removed}
+        swapped = added_balls & removed_balls
+        _, rows = await connection.execute_query(
+            "UPDATE playerstats SET owned = owned + $2, caught = caught + $3, "
+            "specials = specials + $4, trades = trades + $5, "
+            "last_catch = GREATEST(last_catch, $6), "
+            "distinct_balls = distinct_balls + (SELECT count(*) FROM unnest($7::int[]) AS b(id) "
+            "WHERE NOT EXISTS (SELECT 1 FROM ballinstance WHERE player_id = $1 "
+            "AND ball_id = b.id AND id <> ALL($8::bigint[]))) "
+            "- (SELECT count(*) FROM unnest($9::int[]) AS b(id) WHERE NOT EXISTS "
+            "(SELECT 1 FROM ballinstance WHERE player_id = $1 AND ball_id = b.id)), "
+            "trade_partners = trade_partners + CASE WHEN $10::bigint IS NULL OR EXISTS "
+            "(SELECT 1 FROM trade WHERE id <> $10 AND ((player1_id = $1 AND player2_id = $11) "
+            "OR (player1_id = $11 AND player2_id = $1))) THEN 0 ELSE 1 END "
+            "WHERE player_id = $1 RETURNING player_id",
+            [
+                player_id,
+                len(added) - len(removed),
+                (len(added) if caught else 0)
+                - sum(1 for x in removed if x.trade_player_id is None),
+                sum(1 for x in added if x.special_id is not None)
+                - sum(1 for x in removed if x.special_id is not None),
+                1 if trade is not None else 0,
+                max((x.catch_date for x in added), default=None) if caught else None,
+                list(added_balls - swapped),
+                [x.pk for x in added],
+                list(removed_balls - swapped),
+                trade.pk if trade is not None else None,
+                partner_id,
+            ],
+        )
+        if not rows:
+            # new player, or not backfilled yet
+            await cls.rebuild(player_id, player_id, using_db=connection)
+
+    @classmethod
+    async def rebuild(
+        cls, first_id: int, last_id: int, *, using_db: "BaseDBAsyncClient | None" = None
+    ) -> int:
+        """
+        Recompute the statistics of the players between two IDs from their instances and
+        trades.
+
+        Returns
+        -------
+        int
+            The number of players updated.
+        """
+        connection = using_db or Tortoise.get_connection("default")
+        columns = ", ".join(PLAYER_STATS_FIELDS)
+        updates = ", ".join(f"{x} = EXCLUDED.{x}" for x in PLAYER_STATS_FIELDS)
+        _, rows = await connection.execute_query(
+            f"INSERT INTO playerstats (player_id, {columns}) "
+            f"SELECT player_id, {columns} FROM ({PLAYER_STATS_QUERY}) s "
+            f"ON CONFLICT (player_id) DO UPDATE SET {updates} RETURNING player_id",
+            [first_id, last_id],
+        )
+        return len(rows)
+
+    @classmethod
+    async def inconsistent(cls, first_id: int, last_id: int) -> list[int]:
+        """
+        Compare the statistics of the players between two IDs with their instances and trades.
+
+        Returns
+        -------
+        list[int]
+            The IDs of the players whose statistics are missing or wrong.
+        """
+        connection = Tortoise.get_connection("default")
+        _, rows = await connection.execute_query(
+            f"SELECT s.player_id FROM ({PLAYER_STATS_QUERY}) s "
+            "LEFT JOIN playerstats c ON c.player_id = s.player_id "
+            f"WHERE ({', '.join(f's.{x}' for x in PLAYER_STATS_FIELDS)}) IS DISTINCT FROM "
+            f"({', '.join(f'c.{x}' for x in PLAYER_STATS_FIELDS)}) ORDER BY s.player_id",
+            [first_id, last_id],
+        )
+        return [row["player_id"] for row in rows]
+
+
 class BlacklistedID(models.Model):
     discord_id = fields.BigIntField(
         description="Discord user ID", unique=True, validators=[DiscordSnowflakeValidator()]
@@ -576,3 +945,19 @@ class Block(models.Model):
 
     def __str__(self) -> str:
         return str(self.pk)
+
+
+class SpawnSnapshot(models.Model):
+    """
+    Serialized state of the spawn manager for the guilds of a shard, saved periodically so
+    that the spawn progress of the guilds survives restarts.
+    """
+
+    shard_id = fields.IntField(unique=True)
+    shard_count = fields.IntField(description="Number of shards when the state was saved")
+    manager = fields.CharField(max_length=200, description="Python path of the spawn manager")
+    saved_at = fields.DatetimeField(auto_now=True)
+    data = fields.BinaryField(description="Compressed state, specific to the spawn manager")
+
+    def __str__(self) -> str:
+        return str(self.shard_id)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, NamedTuple
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import Ball, Special
+
+__all__ = ("Completion", "CompletionEngine", "completion_engine")
+
+
+class Completion(NamedTuple):
+    owned: int
+    missing: int
+    percentage: float
+
+
+class CompletionEngine:
+    """
+    Computes completion with bitsets over the enabled countryballs.
+
+    Each enabled ball is given a dense bit position when the cache is loaded, a set of balls
+    is then a Python integer where the bit of each ball is set. The balls that count towards
+    the completion of each special are precomputed as masks.
+    """
+
+    def __init__(self):
+        self.ids: list[int] = []
+        self.positions: dict[int, int] = {}
+        self.enabled = 0
+        self.special_masks: dict[int, int] = {}
+
+    def rebuild(self, balls: Iterable["Ball"], specials: Iterable["Special"]):
+        """
+        Recompute the bit positions and masks, needed each time the cache is reloaded.
+        """
+        enabled = sorted((x for x in balls if x.enabled), key=lambda x: x.pk)
+        self.ids = [x.pk for x in enabled]
+        self.positions = {pk: i for i, pk in enumerate(self.ids)}
+        self.enabled = (1 << len(self.ids)) - 1
+        self.special_masks = {}
+        for special in specials:
+            if special.end_date is None:
+                self.special_masks[special.pk] = self.enabled
+            else:
+                # balls created after the end of an event cannot be obtained with it
+                self.special_masks[special.pk] = self.mask(
+                    x.pk for x in enabled if x.created_at < special.end_date
+                )
+
+    def mask(self, ball_ids: Iterable[int]) -> int:
+        """
+        Convert ball IDs to a bitset. Disabled and unknown balls are ignored.
+        """
+        mask = 0
+        for ball_id in ball_ids:
+            if (position := self.positions.get(ball_id)) is not None:
+                mask |= 1 << position
+        return mask
+
+    def ball_ids(self, mask: int) -> list[int]:
+        """
+        Convert a bitset back to ball IDs.
+        """
+        result: list[int] = []
+        while mask:
+            low = mask & -mask
+            result.append(self.ids[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    def eligible(self, special: "Special | None" = None) -> int:
+        """
+        Return the bitset of the balls counting towards completion, optionally for a special.
+        """
+        if special is None:
+            return self.enabled
+        return self.special_masks.get(special.pk, self.enabled)
+
+    def completion(self, owned: int, special: "Special | None" = None) -> Completion:
+        """
+        Compute the completion of a player.
+
+        Parameters
+        ----------
+        owned: int
+            Bitset of the balls owned by the player, as returned by `mask`.
+        special: Special | None
+            Compute the completion of this special instead.
+
+        Returns
+        -------
+        Completion
+            The bitsets of the owned and missing balls, and the completion percentage.
+        """
+        eligible = self.eligible(special)
+        owned &= eligible
+        total = eligible.bit_count()
+        percentage = round(owned.bit_count() / total * 100, 1) if total else 0.0
+        return Completion(owned, eligible & ~owned, percentage)
+
+
+completion_engine = CompletionEngine()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from ballsdex.core.utils.notifications import notifications
+
+log = logging.getLogger("ballsdex.core.utils.guild_configs")
+
+__all__ = ("CachedGuildConfig", "GuildConfigCache", "guild_configs")
+
+# Postgres channel notified by the trigger of the guildconfig table, see the admin panel migrations
+NOTIFY_CHANNEL = "guildconfig"
+
+
+class CachedGuildConfig(NamedTuple):
+    spawn_channel: int | None
+    enabled: bool
+
+
+class GuildConfigCache:
+    """
+    In-memory copy of the guild configurations of the shards handled by this process, shared by
+    the spawner, broadcast and config packages.
+
+    Configurations are loaded with a single query, grouped by shard. They are then kept up to
+    date by the bot when it edits a configuration, and by Postgres notifications sent by a
+    trigger for the writes made elsewhere, such as the admin panel or other processes.
+    """
+
+    def __init__(self):
+        self.shard_count = 1
+        self.shards: dict[int, dict[int, CachedGuildConfig]] = {}
+        # notifications received while loading, applied after it
+        self._pending: list[dict[str, Any]] | None = None
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.shards.values())
+
+    def shard_of(self, guild_id: int) -> int:
+        return (guild_id >> 22) % self.shard_count
+
+    async def load(self, shard_count: int, shard_ids: Iterable[int]) -> int:
+        """
+        Load the configurations of the guilds of the given shards, replacing the current ones.
+
+        Returns
+        -------
+        int
+            The number of configurations loaded.
+        """
+        from ballsdex.core.models import GuildConfig
+
+        self._pending = []
+        try:
+            rows = await GuildConfig.all().values_list("guild_id", "spawn_channel", "enabled")
+        finally:
+            pending, self._pending = self._pending, None
+
+        self.shard_count = shard_count
+        shards: dict[int, dict[int, CachedGuildConfig]] = {x: {} for x in shard_ids}
+        for guild_id, spawn_channel, enabled in rows:
+            if (shard := shards.get(self.shard_of(guild_id))) is not None:
+                shard[guild_id] = CachedGuildConfig(spawn_channel, enabled)
+        self.shards = shards
+        for payload in pending:
+            self._apply(payload)
+        return len(self)
+
+    def get(self, guild_id: int) -> CachedGuildConfig | None:
+        if (shard := self.shards.get(self.shard_of(guild_id))) is None:
+            return None
+        return shard.get(guild_id)
+
+    def spawn_channel(self, guild_id: int) -> int | None:
+        """
+        Return the spawn channel ID of a guild, or `None` if spawning is disabled there.
+        """
+        config = self.get(guild_id)
+        return config.spawn_channel if config and config.enabled else None
+
+    def spawn_channels(self) -> Iterator[tuple[int, int]]:
+        """
+        Yield the guild and spawn channel IDs of the guilds where spawning is enabled.
+        """
+        for shard in self.shards.values():
+            for guild_id, config in shard.items():
+                if config.enabled and config.spawn_channel:
+                    yield guild_id, config.spawn_channel
+
+    def update(self, guild_id: int, spawn_channel: int | None, enabled: bool):
+        """
+        Record the configuration of a guild after saving it. Guilds of other shards are ignored.
+        """
+        if (shard := self.shards.get(self.shard_of(guild_id))) is not None:
+            shard[guild_id] = CachedGuildConfig(spawn_channel, enabled)
+
+    def remove(self, guild_id: int):
+        """
+        Forget the configuration of a guild, until it is loaded or notified again.
+        """
+        if (shard := self.shards.get(self.shard_of(guild_id))) is not None:
+            shard.pop(guild_id, None)
+
+    def _apply(self, payload: dict[str, Any]):
+        if payload["op"] == "DELETE":
+            self.remove(payload["guild_id"])
+        else:
+            self.update(payload["guild_id"], payload["spawn_channel"], payload["enabled"])
+
+    def _on_notify(self, payload: dict[str, Any]):
+        if self._pending is not None:
+            self._pending.append(payload)
+        else:
+            self._apply(payload)
+
+    async def reload(self):
+        """
+        Load again the configurations of the current shards.
+        """
+        await self.load(self.shard_count, list(self.shards))
+
+
+guild_configs = GuildConfigCache()
+notifications.register(NOTIFY_CHANNEL, guild_configs._on_notify, guild_configs.reload)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Iterable
+
+from tortoise.functions import Count
+
+from ballsdex.core.utils.notifications import notifications
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import BallInstance, Player
+
+log = logging.getLogger("ballsdex.core.utils.inventory")
+
+__all__ = ("Inventory", "InventoryCache", "inventories")
+
+# Postgres channel notified by the triggers of the ballinstance table, see the admin panel
+# migrations
+NOTIFY_CHANNEL = "ballinstance"
+
+
+class Inventory:
+    """
+    Summary of the countryballs owned by a player.
+
+    Attributes
+    ----------
+    balls: array[int]
+        Number of instances owned for each ball, indexed by ball ID.
+    specials: dict[int, int]
+        Number of instances owned for each special, indexed by special ID.
+    special_balls: dict[int, dict[int, int]]
+        Number of instances owned for each ball, grouped by special ID.
+    total: int
+        Total number of instances owned.
+    """
+
+    __slots__ = ("balls", "specials", "special_balls", "total")
+
+    def __init__(self):
+        self.balls = array("I")
+        self.specials: dict[int, int] = {}
+        self.special_balls: dict[int, dict[int, int]] = {}
+        self.total = 0
+
+    def add(self, ball_id: int, special_id: int | None, n: int = 1):
+        """
+        Record ``n`` instances, a negative number removing them.
+        """
+        if ball_id >= len(self.balls):
+            self.balls.extend([0] * (ball_id + 1 - len(self.balls)))
+        self.balls[ball_id] = max(self.balls[ball_id] + n, 0)
+        if special_id is not None:
+            count = self.specials.get(special_id, 0) + n
+            if count > 0:
+                self.specials[special_id] = count
+            else:
+                self.specials.pop(special_id, None)
+            counts = self.special_balls.setdefault(special_id, {})
+            count = counts.get(ball_id, 0) + n
+            if count > 0:
+                counts[ball_id] = count
+            else:
+                counts.pop(ball_id, None)
+        self.total = max(self.total + n, 0)
+
+    def count(self, ball_id: int) -> int:
+        return self.balls[ball_id] if ball_id < len(self.balls) else 0
+
+    def owned(self, special_id: int | None = None) -> set[int]:
+        """
+        Return the IDs of the balls owned at least once, optionally only with a special.
+        """
+        if special_id is not None:
+            return set(self.special_balls.get(special_id, ()))
+        return {ball_id for ball_id, count in enumerate(self.balls) if count}
+
+
+class InventoryCache:
+    """
+    Bounded LRU of player inventory summaries, so that completion, counts and pack pulls can
+    be answered without querying the database.
+
+    Summaries are loaded with a single grouped query on first access, then kept up to date
+    incrementally by the code paths creating, transferring or deleting instances. Writes that
+    can't be tracked precisely must call `invalidate`.
+
+    Writes changing the owner, ball or special of instances made by the admin panel or other
+    processes are notified by Postgres, dropping the summaries of the players involved. The
+    notifications of the writes of this bot are ignored, they are already tracked.
+
+    Parameters
+    ----------
+    max_size: int
+        Maximum number of players kept in memory.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: OrderedDict[int, Inventory] = OrderedDict()
+        self._players: dict[int, int] = {}  # discord ID to player ID
+        self._loading: dict[int, bool] = {}  # player ID to "written while loading"
+        self._pending: dict[int, asyncio.Future[Inventory]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, player: "Player") -> Inventory:
+        """
+        Return the inventory summary of a player, loading it if needed.
+        """
+        if (inventory := self._entries.get(player.pk)) is not None:
+            self._entries.move_to_end(player.pk)
+            return inventory
+        # share the query between concurrent calls
+        if (task := self._pending.get(player.pk)) is None:
+            task = asyncio.ensure_future(self._load(player))
+            self._pending[player.pk] = task
+            task.add_done_callback(lambda _: self._pending.pop(player.pk, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, player: "Player") -> Inventory:
+        from ballsdex.core.models import BallInstance
+
+        self._loading[player.pk] = False
+        try:
+            rows = (
+                await BallInstance.filter(player_id=player.pk)
+                .annotate(count=Count("id"))
+                .group_by("ball_id", "special_id")
+                .values_list("ball_id", "special_id", "count")
+            )
+        finally:
+            written = self._loading.pop(player.pk)
+
+        inventory = Inventory()
+        for ball_id, special_id, count in rows:
+            inventory.add(ball_id, special_id, count)
+        # an instance was created or moved during the query, the result may be outdated
+        if not written:
+            self._entries[player.pk] = inventory
+            self._players[player.discord_id] = player.pk
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return inventory
+
+    async def get_by_discord_id(self, discord_id: int) -> Inventory | None:
+        """
+        Return the inventory summary of a player from its Discord ID, or `None` if the player
+        doesn't exist.
+        """
+        pk = self._players.get(discord_id)
+        if pk is not None and (inventory := self._entries.get(pk)) is not None:
+            self._entries.move_to_end(pk)
+            return inventory
+
+        from ballsdex.core.models import Player
+
+        player = await Player.get_or_none(discord_id=discord_id)
+        return await self.get(player) if player else None
+
+    def _update(self, player_id: int, instances: Iterable["BallInstance"], n: int):
+        if player_id in self._loading:
+            self._loading[player_id] = True
+        if (inventory := self._entries.get(player_id)) is None:
+            return
+        for instance in instances:
+            inventory.add(instance.ball_id, instance.special_id, n)
+
+    def add(self, player_id: int, instances: Iterable["BallInstance"]):
+        """
+        Record newly created instances owned by a player.
+        """
+        self._update(player_id, instances, 1)
+
+    def remove(self, player_id: int, instances: Iterable["BallInstance"]):
+        """
+        Record deleted instances of a player.
+        """
+        self._update(player_id, instances, -1)
+
+    def move(self, instances: Iterable["BallInstance"], giver_id: int, receiver_id: int):
+        """
+        Record instances transferred from a player to another.
+        """
+        instances = list(instances)
+        self._update(giver_id, instances, -1)
+        self._update(receiver_id, instances, 1)
+
+    def invalidate(self, player_id: int | None = None):
+        """
+        Drop the summary of a player after an untracked write, or all of them if no player is
+        given.
+        """
+        if player_id is None:
+            self._entries.clear()
+            self._players.clear()
+            for key in self._loading:
+                self._loading[key] = True
+            return
+        if player_id in self._loading:
+            self._loading[player_id] = True
+        self._entries.pop(player_id, None)
+
+    def _on_notify(self, payload: dict[str, Any]):
+        self.invalidate(payload["player_id"])
+
+    async def _on_reconnect(self):
+        # writes may have been missed while disconnected
+        self.invalidate()
+
+
+inventories = InventoryCache()
+notifications.register(
+    NOTIFY_CHANNEL, inventories._on_notify, inventories._on_reconnect, ignore_own=True
+)
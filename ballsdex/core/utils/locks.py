@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable
+
+from tortoise import Tortoise
+from tortoise.timezone import now as tortoise_now
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import BallInstance
+
+log = logging.getLogger("ballsdex.core.utils.locks")
+
+__all__ = ("LOCK_DURATION", "LockManager", "lock_manager")
+
+# locks older than this are considered released, in case the bot stopped while holding them
+LOCK_DURATION = timedelta(minutes=30)
+
+
+class LockManager:
+    """
+    Locks preventing countryball instances from being traded, donated, bet or spawned twice.
+
+    Locks are stored in the ``locked`` column of the instances, each operation works on a batch
+    of instances with a single query. Results are written through an in-process view of the
+    locks, so that displaying the lock state of an instance doesn't need any query.
+    """
+
+    def __init__(self):
+        self._view: dict[int, datetime] = {}
+
+    def is_locked(self, pk: int) -> bool:
+        """
+        Tell if an instance is locked according to the in-process view, without any query.
+
+        This may be outdated if the database was edited from elsewhere, use `check` before
+        acting on an instance.
+        """
+        locked = self._view.get(pk)
+        if locked is None:
+            return False
+        if locked + LOCK_DURATION <= tortoise_now():
+            del self._view[pk]
+            return False
+        return True
+
+    def _write(self, instances: Iterable["BallInstance"], value: datetime | None):
+        for instance in instances:
+            instance.locked = value  # type: ignore
+            if value is None:
+                self._view.pop(instance.pk, None)
+            else:
+                self._view[instance.pk] = value
+
+    def discard(self, instances: Iterable["BallInstance"]):
+        """
+        Mark instances as unlocked after their ``locked`` column was cleared by another query,
+        like a trade or donation commit.
+        """
+        self._write(instances, None)
+
+    async def try_lock(self, instances: Iterable["BallInstance"]) -> list["BallInstance"]:
+        """
+        Lock all the given instances, or none of them if any is already locked.
+
+        Parameters
+        ----------
+        instances: Iterable[BallInstance]
+            The instances to lock.
+
+        Returns
+        -------
+        list[BallInstance]
+            The instances that are already locked. If empty, every instance is now locked,
+            otherwise none of them was.
+        """
+        instances = list({x.pk: x for x in instances}.values())
+        if not instances:
+            return []
+        now = tortoise_now()
+        connection = Tortoise.get_connection("default")
+        # rows already locked are filtered out and re-checked by Postgres after a concurrent
+        # update, making this atomic
+        _, rows = await connection.execute_query(
+            "UPDATE ballinstance SET locked = $1 WHERE id = ANY($2::bigint[]) "
+            "AND (locked IS NULL OR locked <= $3) RETURNING id",
+            [now, [x.pk for x in instances], now - LOCK_DURATION],
+        )
+        acquired = {row["id"] for row in rows}
+        if len(acquired) == len(instances):
+            self._write(instances, now)
+            return []
+
+        # give back what we took, only if nothing else took it in between
+        if acquired:
+            await connection.execute_query(
+                "UPDATE ballinstance SET locked = NULL "
+                "WHERE id = ANY($1::bigint[]) AND locked = $2",
+                [list(acquired), now],
+            )
+        return [x for x in instances if x.pk not in acquired]
+
+    async def release(self, instances: Iterable["BallInstance"]):
+        """
+        Unlock the given instances.
+        """
+        instances = list(instances)
+        if not instances:
+            return
+        connection = Tortoise.get_connection("default")
+        await connection.execute_query(
+            "UPDATE ballinstance SET locked = NULL WHERE id = ANY($1::bigint[])",
+            [[x.pk for x in instances]],
+        )
+        self._write(instances, None)
+
+    async def check(self, instances: Iterable["BallInstance"]) -> list["BallInstance"]:
+        """
+        Read the lock state of the given instances from the database, refreshing the view.
+
+        Returns
+        -------
+        list[BallInstance]
+            The instances that are currently locked.
+        """
+        instances = list(instances)
+        if not instances:
+            return []
+        connection = Tortoise.get_connection("default")
+        _, rows = await connection.execute_query(
+            "SELECT id, locked FROM ballinstance WHERE id = ANY($1::bigint[]) AND locked > $2",
+            [[x.pk for x in instances], tortoise_now() - LOCK_DURATION],
+        )
+        locked = {row["id"]: row["locked"] for row in rows}
+        result: list["BallInstance"] = []
+        for instance in instances:
+            if instance.pk in locked:
+                self._write((instance,), locked[instance.pk])
+                result.append(instance)
+            else:
+                self._write((instance,), None)
+        return result
+
+
+lock_manager = LockManager()
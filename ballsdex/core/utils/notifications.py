@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, NamedTuple
+
+if TYPE_CHECKING:
+    import asyncpg
+
+log = logging.getLogger("ballsdex.core.utils.notifications")
+
+__all__ = ("NotificationListener", "notifications")
+
+# seconds between two checks of the listening connection, and before reconnecting
+LISTEN_CHECK_INTERVAL = 30
+
+Handler = Callable[[dict[str, Any]], None]
+ReconnectHandler = Callable[[], Awaitable[None]]
+
+
+class Channel(NamedTuple):
+    handler: Handler
+    on_reconnect: ReconnectHandler
+    ignore_own: bool
+
+
+class NotificationListener:
+    """
+    Dispatches the Postgres notifications sent by the triggers of the admin panel migrations
+    to the in-memory caches, on a single pooled connection.
+
+    Notifications are lost while disconnected, so each channel also gives a coroutine called
+    after reconnecting, to reload or drop what it caches.
+
+    The server processes of the connections of this bot are tracked with `register_backend`,
+    so that caches already updated by the bot can ignore the notifications of its own writes.
+    """
+
+    def __init__(self):
+        self.channels: dict[str, Channel] = {}
+        self.backends: set[int] = set()
+        self._listener: asyncio.Task | None = None
+
+    def register(
+        self,
+        channel: str,
+        handler: Handler,
+        on_reconnect: ReconnectHandler,
+        *,
+        ignore_own: bool = False,
+    ):
+        """
+        Call ``handler`` with the decoded JSON payload of each notification of ``channel``.
+        Channels must be registered before `start`.
+
+        If ``ignore_own`` is set, the notifications sent by the connections of this bot are
+        skipped.
+        """
+        self.channels[channel] = Channel(handler, on_reconnect, ignore_own)
+
+    async def register_backend(self, connection: "asyncpg.Connection"):
+        """
+        Remember the server process of a new connection of the pool, given as its ``init``
+        callback, until the connection is closed.
+        """
+        pid = connection.get_server_pid()
+        self.backends.add(pid)
+        connection.add_termination_listener(lambda _: self.backends.discard(pid))
+
+    def _on_notify(self, connection: "asyncpg.Connection", pid: int, channel: str, data: str):
+        handler, _, ignore_own = self.channels[channel]
+        if ignore_own and pid in self.backends:
+            return
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            log.warning(f"Invalid notification on {channel}: {data!r}")
+            return
+        try:
+            handler(payload)
+        except Exception:
+            log.exception(f"Failed to handle notification on {channel}: {data!r}")
+
+    async def _listen(self):
+        from tortoise import Tortoise
+
+        client = Tortoise.get_connection("default")
+        reconnecting = False
+        while True:
+            try:
+                async with client.acquire_connection() as connection:
+                    for channel in self.channels:
+                        await connection.add_listener(channel, self._on_notify)
+                    if reconnecting:
+                        for channel in self.channels.values():
+                            await channel.on_reconnect()
+                        log.info("Listening to database notifications again.")
+                    try:
+                        while not connection.is_closed():
+                            await asyncio.sleep(LISTEN_CHECK_INTERVAL)
+                    finally:
+                        if not connection.is_closed():
+                            for channel in self.channels:
+                                await connection.remove_listener(channel, self._on_notify)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Lost the connection listening to database notifications")
+            reconnecting = True
+            await asyncio.sleep(LISTEN_CHECK_INTERVAL)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """
+        Start dispatching the notifications, if not already done.
+        """
+        if self._listener is None or self._listener.done():
+            self._listener = loop.create_task(self._listen())
+
+    def cancel(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+
+
+notifications = NotificationListener()
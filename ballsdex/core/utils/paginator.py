@@ -2,19 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
-from typing import TYPE_CHECKING, Any, Dict, Optional
+import math
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
 
 import discord
 from discord.ext.commands import Paginator as CommandPaginator
+from tortoise.expressions import Q
 
 from ballsdex.core.utils import menus
 
 if TYPE_CHECKING:
+    from tortoise.queryset import QuerySet
+
     from ballsdex.core.bot import BallsDexBot
 
 log = logging.getLogger("ballsdex.core.utils.paginator")
 
+# above this number of rows, the estimate of the query planner is used instead of counting
+EXACT_COUNT_LIMIT = 10000
+
 
 class NumberedPageModal(discord.ui.Modal, title="Go to page"):
     page = discord.ui.TextInput(label="Page", placeholder="Enter a number", min_length=1)
@@ -93,6 +102,10 @@ class Pages(discord.ui.View):
         self, interaction: discord.Interaction["BallsDexBot"], page_number: int
     ) -> None:
         page = await self.source.get_page(page_number)
+        max_pages = self.source.get_max_pages()
+        if max_pages is not None and page_number >= max_pages:
+            # the source found fewer pages than it announced and returned the last one
+            page_number = max_pages - 1
         self.current_page = page_number
         kwargs = await self._get_kwargs_from_page(page)
         self._update_labels(page_number)
@@ -313,6 +326,161 @@ class FieldPageSource(menus.ListPageSource):
         return self.embed
 
 
+async def estimate_count(queryset: "QuerySet") -> tuple[int, bool]:
+    """
+    Count the rows of a queryset, using the estimate of the query planner when it is above
+    `EXACT_COUNT_LIMIT` instead of scanning every row.
+
+    Returns
+    -------
+    tuple[int, bool]
+        The number of rows, and whether it is an estimate.
+    """
+    plan = (await queryset.all().explain())[0]["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate > EXACT_COUNT_LIMIT:
+        return estimate, True
+    return await queryset.count(), False
+
+
+class QuerySetPageSource(menus.PageSource):
+    """
+    A data source fetching the pages of a queryset on demand instead of loading every row.
+
+    Pages are read with keyset pagination: the sort keys of the last row of a page filter the
+    next one, so reading a page costs the same wherever it is in the results. Jumping to a
+    page whose start isn't known yet, or orderings that can't be filtered on, use an offset
+    instead. The next page is prefetched in the background while the current one is shown,
+    and only the pages around the current one are kept.
+
+    Parameters
+    ----------
+    queryset: QuerySet
+        The rows to paginate. It must not be ordered if ``keys`` is given.
+    keys: Sequence[str] | None
+        The ordering, as given to ``order_by``. Each key must be a non-null field or
+        annotation, and the last one must be unique like the primary key. If `None`, the
+        queryset must be ordered already and only offsets are used.
+    per_page: int
+        How many rows are in a page.
+    count: int | None
+        The number of rows if already known, otherwise it's counted or estimated with
+        `estimate_count`.
+    """
+
+    def __init__(
+        self,
+        queryset: "QuerySet",
+        keys: Sequence[str] | None,
+        *,
+        per_page: int,
+        count: int | None = None,
+    ):
+        self.queryset = queryset.order_by(*keys) if keys else queryset
+        self.keys = list(keys) if keys else None
+        self.per_page = per_page
+        self.count = count
+        self.estimated = False
+        self._max_pages: int | None = None
+        self._pages: dict[int, list[Any]] = {}
+        self._cursors: dict[int, tuple[Any, ...]] = {}  # page number to keys of its last row
+        self._prefetch: tuple[int, asyncio.Task[list[Any]]] | None = None
+
+    async def prepare(self):
+        if self._max_pages is not None:
+            return
+        if self.count is None:
+            self.count, self.estimated = await estimate_count(self.queryset)
+        self._max_pages = max(math.ceil(self.count / self.per_page), 1)
+        self._pages[0] = await self._fetch(0)
+
+    def is_paginating(self) -> bool:
+        return self._max_pages is None or self._max_pages > 1
+
+    def get_max_pages(self) -> int | None:
+        return self._max_pages
+
+    def _after(self, cursor: tuple[Any, ...]) -> Q:
+        assert self.keys
+        names = [key.lstrip("-") for key in self.keys]
+        conditions: list[Q] = []
+        for i, key in enumerate(self.keys):
+            filters = dict(zip(names[:i], cursor[:i]))
+            filters[f"{names[i]}__{'lt' if key.startswith('-') else 'gt'}"] = cursor[i]
+            conditions.append(Q(**filters))
+        return Q(*conditions, join_type="OR")
+
+    async def _fetch(self, page_number: int) -> list[Any]:
+        if self.keys and page_number == 0:
+            rows = await self.queryset.limit(self.per_page)
+        elif self.keys and (cursor := self._cursors.get(page_number - 1)) is not None:
+            rows = await self.queryset.filter(self._after(cursor)).limit(self.per_page)
+        else:
+            rows = await self.queryset.offset(page_number * self.per_page).limit(self.per_page)
+        if rows and self.keys:
+            self._cursors[page_number] = tuple(
+                getattr(rows[-1], key.lstrip("-")) for key in self.keys
+            )
+
+        if len(rows) < self.per_page:
+            if page_number == 0:
+                self.count, self.estimated = len(rows), False
+            if rows or page_number == 0:
+                self._max_pages = page_number + 1
+            elif self.estimated:
+                self._max_pages = page_number
+        elif self.estimated and page_number + 1 >= (self._max_pages or 0):
+            # the estimate was too low, allow going further
+            self._max_pages = page_number + 2
+        return rows
+
+    async def _get_rows(self, page_number: int) -> list[Any]:
+        if self._prefetch and self._prefetch[0] == page_number:
+            _, task = self._prefetch
+            self._prefetch = None
+            try:
+                return await task
+            except Exception:
+                log.warning(f"Failed to prefetch page {page_number}", exc_info=True)
+        if (rows := self._pages.get(page_number)) is not None:
+            return rows
+        return await self._fetch(page_number)
+
+    async def _last_page(self) -> int:
+        self.count, self.estimated = await self.queryset.count(), False
+        self._max_pages = max(math.ceil(self.count / self.per_page), 1)
+        return self._max_pages - 1
+
+    async def get_page(self, page_number: int) -> Any:
+        rows = await self._get_rows(page_number)
+        if not rows and page_number > 0:
+            # the estimate was too high and the page is past the end, count the rows to show
+            # the last page instead, `Pages.show_page` follows the lowered page count
+            page_number = await self._last_page()
+            rows = await self._get_rows(page_number)
+        self._pages = {
+            key: value for key, value in self._pages.items() if abs(key - page_number) <= 1
+        }
+        self._pages[page_number] = rows
+
+        next_page = page_number + 1
+        if (
+            rows
+            and next_page not in self._pages
+            and (self._max_pages is None or next_page < self._max_pages)
+        ):
+            if self._prefetch:
+                self._prefetch[1].cancel()
+            self._prefetch = (next_page, asyncio.create_task(self._fetch(next_page)))
+
+        if self.per_page == 1:
+            # no row left, when they were all deleted since counting
+            return rows[0] if rows else None
+        return rows
+
+
 class TextPageSource(menus.ListPageSource):
     def __init__(self, text, *, prefix="```", suffix="```", max_size=2000):
         pages = CommandPaginator(prefix=prefix, suffix=suffix, max_size=max_size - 200)
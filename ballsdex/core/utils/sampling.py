@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Generic, Iterable, Sequence, TypeVar
+
+from tortoise.timezone import get_default_timezone
+from tortoise.timezone import now as tortoise_now
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import Ball, Special
+
+log = logging.getLogger("ballsdex.core.utils.sampling")
+
+__all__ = ("AliasSampler", "SpawnSamplers", "samplers")
+
+T = TypeVar("T")
+
+# specials are rebuilt at least this often, to stay correct if the system clock jumps
+MAX_SPECIALS_REFRESH = timedelta(hours=1)
+
+
+class AliasSampler(Generic[T]):
+    """
+    Weighted random sampler using Vose's alias method.
+
+    Building the tables is O(n), each draw is then O(1) with no allocation. Items with a
+    weight of 0 or less are never drawn.
+
+    Parameters
+    ----------
+    items: Sequence[T]
+        The population to draw from.
+    weights: Sequence[float]
+        The relative weight of each item.
+    """
+
+    __slots__ = ("items", "_probabilities", "_aliases")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        pairs = [(item, weight) for item, weight in zip(items, weights) if weight > 0]
+        self.items: list[T] = [item for item, _ in pairs]
+        n = len(pairs)
+        self._probabilities = [1.0] * n
+        self._aliases = list(range(n))
+        if not n:
+            return
+
+        total = sum(weight for _, weight in pairs)
+        scaled = [weight * n / total for _, weight in pairs]
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probabilities[less] = scaled[less]
+            self._aliases[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+        # leftovers are only due to floating point errors and have a probability of 1
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def draw(self) -> T:
+        """
+        Draw one item.
+
+        Raises
+        ------
+        IndexError
+            The sampler is empty.
+        """
+        i = int(random.random() * len(self.items))
+        if random.random() < self._probabilities[i]:
+            return self.items[i]
+        return self.items[self._aliases[i]]
+
+    def draw_many(self, k: int) -> list[T]:
+        """
+        Draw ``k`` items, with replacement.
+        """
+        return [self.draw() for _ in range(k)]
+
+
+class SpawnSamplers:
+    """
+    Precomputed samplers used when spawning and catching countryballs.
+
+    Attributes
+    ----------
+    balls: AliasSampler[Ball]
+        Enabled countryballs, weighted by rarity. Rebuilt on each cache load.
+    specials: AliasSampler[Special | None]
+        Special events currently running, plus `None` for a common card. Rebuilt on each cache
+        load and when an event starts or ends.
+    """
+
+    def __init__(self):
+        self.balls: AliasSampler["Ball"] = AliasSampler([], [])
+        self.specials: AliasSampler["Special | None"] = AliasSampler([None], [1])
+        self._timer: asyncio.TimerHandle | None = None
+
+    def rebuild_balls(self, balls: Iterable["Ball"]):
+        enabled = [x for x in balls if x.enabled]
+        self.balls = AliasSampler(enabled, [x.rarity for x in enabled])
+
+    def rebuild_specials(self, specials: Iterable["Special"]) -> datetime:
+        """
+        Rebuild the specials sampler with the events running now.
+
+        Returns
+        -------
+        datetime
+            When the next event starts or ends, requiring a new rebuild.
+        """
+        now = tortoise_now()
+        # handle null start/end dates with infinity times
+        min_date = datetime.min.replace(tzinfo=get_default_timezone())
+        max_date = datetime.max.replace(tzinfo=get_default_timezone())
+        population: list["Special"] = []
+        next_change = now + MAX_SPECIALS_REFRESH
+        for special in specials:
+            start = special.start_date or min_date
+            end = special.end_date or max_date
+            if start <= now <= end:
+                population.append(special)
+                next_change = min(next_change, end)
+            elif now < start:
+                next_change = min(next_change, start)
+
+        # Here we try to determine what should be the chance of having a common card
+        # since the rarity field is a value between 0 and 1, 1 being no common
+        # and 0 only common, we get the remaining value by doing (1-rarity)
+        # We then sum each value for each current event, and we should get an algorithm
+        # that kinda makes sense.
+        common_weight = sum(1 - x.rarity for x in population) if population else 1
+        self.specials = AliasSampler(
+            [*population, None], [*(x.rarity for x in population), common_weight]
+        )
+        return next_change
+
+    def schedule_specials(self, loop: asyncio.AbstractEventLoop):
+        """
+        Rebuild the specials sampler from the cache now, then again each time an event window
+        opens or closes.
+        """
+        from ballsdex.core.models import specials
+
+        if self._timer:
+            self._timer.cancel()
+        next_change = self.rebuild_specials(list(specials.values()))
+        # one second of margin, end dates are inclusive
+        delay = (next_change - tortoise_now()).total_seconds() + 1
+        self._timer = loop.call_later(max(delay, 1), self.schedule_specials, loop)
+        log.debug(f"{len(self.specials) - 1} special events running, next update in {delay}s")
+
+    def cancel(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
+samplers = SpawnSamplers()
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import Ball
+
+__all__ = ("BallSearchIndex", "ball_search")
+
+
+class BallSearchIndex:
+    """
+    Precomputed search keys of the cached countryballs, used to resolve a text search into a
+    list of ball IDs without querying the database.
+    """
+
+    def __init__(self):
+        self.keys: dict[int, str] = {}
+        self.names: dict[str, list[int]] = {}
+
+    def rebuild(self, balls: Iterable["Ball"]):
+        """
+        Recompute the search keys, needed each time the cache is reloaded.
+        """
+        self.keys = {}
+        self.names = {}
+        for ball in balls:
+            self.keys[ball.pk] = " ".join(
+                (ball.country, ball.catch_names or "", ball.translations or "")
+            ).lower()
+            self.names.setdefault(ball.country.lower(), []).append(ball.pk)
+
+    def search(self, value: str) -> list[int]:
+        """
+        Return the IDs of the countryballs whose country, catch names or translations contain
+        the given text, case insensitive.
+        """
+        value = value.lower()
+        return [pk for pk, key in self.keys.items() if value in key]
+
+    def exact(self, name: str) -> list[int]:
+        """
+        Return the IDs of the countryballs with this exact country name, case insensitive.
+        """
+        return self.names.get(name.lower(), [])
+
+
+ball_search = BallSearchIndex()
@@ -1,7 +1,9 @@
 import enum
-from typing import TYPE_CHECKING
+import json
+from typing import TYPE_CHECKING, Any
 
 from tortoise.expressions import F, RawSQL
+from tortoise.transactions import in_transaction
 
 if TYPE_CHECKING:
     from tortoise.queryset import QuerySet
@@ -53,20 +55,143 @@ def sort_balls(
             "-stats_bonus"
         )
     elif sort == SortingChoices.health or sort == SortingChoices.attack:
-        # Use the sorting name as the annotation key to avoid issues when this function
-        # is called multiple times. Using the same annotation name twice will error.
-        return queryset.annotate(
-            **{f"{sort.value}_sort": F(f"{sort.value}_bonus") + F(f"ball__{sort.value}")}
-        ).order_by(f"-{sort.value}_sort")
+        # denormalized column, read in order from the (player_id, effective_*) indexes
+        return queryset.order_by(f"-effective_{sort.value}")
     elif sort == SortingChoices.total_stats:
-        return (
-            queryset.select_related("ball")
-            .annotate(
-                stats=RawSQL("ballinstance__ball.health + " "ballinstance__ball.attack :: BIGINT")
-            )
-            .order_by("-stats")
-        )
+        return queryset.annotate(
+            stats=F("effective_health") + F("effective_attack")
+        ).order_by("-stats")
     elif sort == SortingChoices.rarity:
         return queryset.order_by(sort.value, "ball__country")
     else:
         return queryset.order_by(sort.value)
+
+
+def keyset_sort(
+    sort: SortingChoices | None, queryset: "QuerySet[BallInstance]", reverse: bool = False
+) -> tuple["QuerySet[BallInstance]", list[str] | None]:
+    """
+    Prepare a queryset for `QuerySetPageSource` with the selected sorting option.
+
+    Parameters
+    ----------
+    sort: SortingChoices | None
+        One of the supported sorting methods, or `None` to show favorites first.
+    queryset: QuerySet[BallInstance]
+        An existing queryset of ball instances, **without awaiting the result!**
+    reverse: bool
+        Reverse the order.
+
+    Returns
+    -------
+    tuple[QuerySet[BallInstance], list[str] | None]
+        The queryset with the annotations needed for sorting, and the ordering keys ending with
+        the primary key. The keys are `None` for the sorting methods that can't be used in a
+        filter, the queryset is then ordered already.
+    """
+    keyset = True
+    if sort is None:
+        keys = ["-favorite"]
+    elif sort == SortingChoices.duplicates:
+        # window functions can't be filtered on
+        queryset = queryset.annotate(count=RawSQL("COUNT(*) OVER (PARTITION BY ball_id)"))
+        keys = ["-count"]
+        keyset = False
+    elif sort == SortingChoices.special:
+        # nullable, nulls are sorted last and first when descending, like reversing the list
+        keys = ["special__id"]
+        keyset = False
+    elif sort == SortingChoices.alphabetic:
+        queryset = queryset.annotate(country_sort=F("ball__country"))
+        keys = ["country_sort"]
+    elif sort == SortingChoices.rarity:
+        queryset = queryset.annotate(
+            rarity_sort=F("ball__rarity"), country_sort=F("ball__country")
+        )
+        keys = ["rarity_sort", "country_sort"]
+    elif sort in (SortingChoices.health, SortingChoices.attack):
+        keys = [f"-effective_{sort.value}"]
+    elif sort == SortingChoices.stats_bonus:
+        queryset = sort_balls(sort, queryset)
+        keys = ["-stats_bonus"]
+    elif sort == SortingChoices.total_stats:
+        queryset = sort_balls(sort, queryset)
+        keys = ["-stats"]
+    else:
+        keys = [sort.value]
+
+    keys.append("id")
+    if reverse:
+        keys = [key[1:] if key.startswith("-") else f"-{key}" for key in keys]
+    if not keyset:
+        return queryset.order_by(*keys), None
+    return queryset, keys
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _plan_nodes(plan: dict[str, Any]) -> list[str]:
+    node = plan["Node Type"]
+    if index := plan.get("Index Name"):
+        node += f" ({index})"
+    return [node] + [x for child in plan.get("Plans", ()) for x in _plan_nodes(child)]
+
+
+async def benchmark_sorting(
+    rows: int = 1_000_000, player_rows: int = 100_000
+) -> dict[str, tuple[list[str], float]]:
+    """
+    Explain the first page of an inventory with each sorting method, over synthetic data.
+
+    A temporary ``ballinstance`` table with the same columns and indexes shadows the real one
+    for this transaction only. It is filled with ``rows`` instances of the existing balls,
+    ``player_rows`` of them owned by the same player, and is dropped by rolling back.
+
+    Returns
+    -------
+    dict[str, tuple[list[str], float]]
+        For each sorting method, the nodes of the plan from the root and the execution time in
+        milliseconds.
+    """
+    from ballsdex.core.models import BallInstance
+
+    results: dict[str, tuple[list[str], float]] = {}
+    try:
+        async with in_transaction() as connection:
+            await connection.execute_query(
+                "CREATE TEMPORARY TABLE ballinstance "
+                "(LIKE public.ballinstance INCLUDING DEFAULTS INCLUDING INDEXES)"
+            )
+            # explicit IDs to leave the sequence of the real table untouched
+            await connection.execute_query(
+                "INSERT INTO ballinstance (id, ball_id, player_id, catch_date, attack_bonus, "
+                "health_bonus, effective_attack, effective_health, favorite, tradeable, "
+                "extra_data) "
+                "SELECT g, b.id, CASE WHEN g <= $2 THEN 1 ELSE 2 + g % 10000 END, "
+                "now() - g * interval '1 minute', attack_bonus, health_bonus, "
+                "b.attack + trunc(b.attack * attack_bonus * 0.01), "
+                "b.health + trunc(b.health * health_bonus * 0.01), g % 50 = 0, true, '{}' "
+                "FROM (SELECT g, (g * 7919) % 41 - 20 AS attack_bonus, "
+                "(g * 104729) % 41 - 20 AS health_bonus, "
+                "ids[1 + (g * 31) % cardinality(ids)] AS ball_id "
+                "FROM generate_series(1, $1) g, (SELECT array_agg(id) AS ids FROM ball) a) s "
+                "JOIN ball b ON b.id = s.ball_id",
+                [rows, player_rows],
+            )
+            await connection.execute_query("ANALYZE ballinstance")
+
+            for sort in SortingChoices:
+                queryset = sort_balls(sort, BallInstance.filter(player_id=1)).limit(25)
+                _, result = await connection.execute_query(
+                    "EXPLAIN (ANALYZE, FORMAT JSON) " + queryset.sql(params_inline=True)
+                )
+                plan = result[0]["QUERY PLAN"]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                results[sort.name] = (_plan_nodes(plan[0]["Plan"]), plan[0]["Execution Time"])
+            raise _Rollback
+    except _Rollback:
+        pass
+    return results
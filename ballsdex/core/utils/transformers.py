@@ -8,10 +8,11 @@ import discord
 from discord import app_commands
 from discord.interactions import Interaction
 from tortoise.exceptions import DoesNotExist
-from tortoise.expressions import Q, RawSQL
+from tortoise.expressions import Q
 from tortoise.models import Model
 from tortoise.timezone import now as tortoise_now
 
+from ballsdex.core.metrics import autocomplete_time
 from ballsdex.core.models import (
     Ball,
     BallInstance,
@@ -22,6 +23,7 @@ from ballsdex.core.models import (
     economies,
     regimes,
 )
+from ballsdex.core.utils.search import ball_search
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -117,6 +119,7 @@ class ModelTransformer(app_commands.Transformer, Generic[T]):
         for option in await self.get_options(interaction, value):
             choices.append(option)
         t2 = time.time()
+        autocomplete_time.labels(transformer=type(self).__name__).observe(t2 - t1)
         log.debug(
             f"{self.name.title()} autocompletion took "
             f"{round((t2 - t1) * 1000)}ms, {len(choices)} results"
@@ -179,21 +182,21 @@ class BallInstanceTransformer(ModelTransformer[BallInstance]):
                     locked__isnull=False, locked__gt=tortoise_now() - timedelta(minutes=30)
                 )
 
+        # resolve the matching countryballs from the cache first, the query then only needs
+        # the (player_id, ball_id) index instead of scanning all instances of the player
         if value.startswith("="):
-            ball_name = value[1:]
-            balls_queryset = balls_queryset.filter(ball__country__iexact=ball_name)
-        else:
-            balls_queryset = (
-                balls_queryset.select_related("ball")
-                .annotate(
-                    searchable=RawSQL(
-                        "to_hex(ballinstance.id) || ' ' || ballinstance__ball.country || ' ' || "
-                        "COALESCE(ballinstance__ball.catch_names, '') || ' ' || "
-                        "COALESCE(ballinstance__ball.translations, '')"
-                    )
-                )
-                .filter(searchable__icontains=value.replace(".", ""))
-            )
+            balls_queryset = balls_queryset.filter(ball_id__in=ball_search.exact(value[1:]))
+        elif value := value.replace(".", ""):
+            query = Q(ball_id__in=ball_search.search(value))
+            try:
+                instance_id = int(value, 16)
+            except ValueError:
+                pass
+            else:
+                # longer hexadecimal strings can't be IDs and would overflow the bigint column
+                if 0 < instance_id < 2**63:
+                    query |= Q(id=instance_id)
+            balls_queryset = balls_queryset.filter(query)
         balls_queryset = balls_queryset.limit(25)
 
         choices: list[app_commands.Choice] = [
@@ -15,6 +15,7 @@ from tortoise.exceptions import BaseORMException, DoesNotExist
 from ballsdex.core.bot import BallsDex
 from ballsdex.core.models import Ball, BallInstance, Player, Special, Trade, TradeObject
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.inventory import inventories
 from ballsdex.core.utils.logging import log_action
 from ballsdex.core.utils.transformers import (
     BallTransform,
@@ -61,8 +62,10 @@ class GDropView(ui.View):
 
 
         player, _ = await Player.get_or_create(discord_id=interaction.user.id)
+        giver_id = self.ball_instance.player_id
         self.ball_instance.player = player
         await self.ball_instance.save()
+        inventories.move((self.ball_instance,), giver_id, player.pk)
 
         self.claimed = True
 
@@ -255,6 +258,7 @@ class Balls(app_commands.Group):
         special: SpecialTransform | None = None,
         health_bonus: int | None = None,
         attack_bonus: int | None = None,
+        n: app_commands.Range[int, 1, 100] = 1,
     ):
         """
         Give the specified countryball to a player.
@@ -268,6 +272,8 @@ class Balls(app_commands.Group):
             Omit this to make it random.
         attack_bonus: int | None
             Omit this to make it random.
+        n: int
+            The number of countryballs to give. Random bonuses are rolled for each of them.
         """
         # the transformers triggered a response, meaning user tried an incorrect input
         if interaction.response.is_done():
@@ -275,24 +281,34 @@ class Balls(app_commands.Group):
         await interaction.response.defer(ephemeral=True, thinking=True)
 
         player, created = await Player.get_or_create(discord_id=user.id)
-        instance = await BallInstance.create(
-            ball=countryball,
-            player=player,
-            attack_bonus=(
-                attack_bonus
-                if attack_bonus is not None
-                else random.randint(-settings.max_attack_bonus, settings.max_attack_bonus)
-            ),
-            health_bonus=(
-                health_bonus
-                if health_bonus is not None
-                else random.randint(-settings.max_health_bonus, settings.max_health_bonus)
-            ),
-            special=special,
+        instances = await BallInstance.bulk_grant(
+            player,
+            [
+                (
+                    countryball,
+                    special,
+                    (
+                        attack_bonus
+                        if attack_bonus is not None
+                        else random.randint(
+                            -settings.max_attack_bonus, settings.max_attack_bonus
+                        ),
+                        health_bonus
+                        if health_bonus is not None
+                        else random.randint(
+                            -settings.max_health_bonus, settings.max_health_bonus
+                        ),
+                    ),
+                )
+                for _ in range(n)
+            ],
+            source="admin",
         )
+        instance = instances[0]
 
         # Create the embed
         cb_txt = (
+            f"{f'{n}x ' if n > 1 else ''}"
             f"{countryball.country} {settings.collectible_name} was successfully given to "
             f"`{user}`.\nSpecial: `{special.name if special else None}` • ATK: "
             f"`{instance.attack_bonus:+d}` • HP: `{instance.health_bonus:+d}`"
@@ -307,7 +323,7 @@ class Balls(app_commands.Group):
         # Send the message to the sender (interaction user)
         await interaction.followup.send(embed=embed)
 
-        content, file, view = await instance.prepare_for_message(interaction)
+        content, file, view = await instance.prepare_for_message(interaction, site="pack")
 
         embed.set_image(url="attachment://" + file.filename)
 
@@ -322,7 +338,7 @@ class Balls(app_commands.Group):
 
         # Log the action
         await log_action(
-            f"{interaction.user} gave {settings.collectible_name} "
+            f"{interaction.user} gave {n} {settings.collectible_name} "
             f"{countryball.country} to {user}. (Special={special.name if special else None} "
             f"ATK={instance.attack_bonus:+d} HP={instance.health_bonus:+d}).",
             interaction.client,
@@ -453,6 +469,7 @@ class Balls(app_commands.Group):
         player, _ = await Player.get_or_create(discord_id=user.id)
         ball.player = player
         await ball.save()
+        inventories.move((ball,), original_player.pk, player.pk)
 
         trade = await Trade.create(player1=original_player, player2=player)
         await TradeObject.create(trade=trade, ballinstance=ball, player=original_player)
@@ -549,6 +566,7 @@ class Balls(app_commands.Group):
             count = len(to_delete)
         else:
             count = await BallInstance.filter(player=player).delete()
+            inventories.invalidate(player.pk)
         await interaction.followup.send(
             f"{count} {settings.plural_collectible_name} from {user} have been deleted.",
             ephemeral=True,
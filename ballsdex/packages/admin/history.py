@@ -86,10 +86,12 @@ class History(app_commands.Group):
             start_date = end_date - datetime.timedelta(days=days)
             queryset = queryset.filter(date__range=(start_date, end_date))
 
-        queryset = queryset.order_by(sort_value).prefetch_related("player1", "player2")
-        history = await queryset
-
-        if not history:
+        url = f"{settings.admin_url}/bd_models/trade/{query}" if settings.admin_url else None
+        source = TradeViewFormat(
+            queryset, user.display_name, interaction.client, True, url, sorting=sort_value
+        )
+        await source.prepare()
+        if not source.count:
             await interaction.followup.send("No history found.", ephemeral=True)
             return
 
@@ -98,8 +100,6 @@ class History(app_commands.Group):
                 f"History of {user.display_name} and {user2.display_name}:"
             )
 
-        url = f"{settings.admin_url}/bd_models/trade/{query}" if settings.admin_url else None
-        source = TradeViewFormat(history, user.display_name, interaction.client, True, url)
         pages = Pages(source=source, interaction=interaction)
         await pages.start(ephemeral=True)
 
@@ -163,20 +163,23 @@ class History(app_commands.Group):
             queryset = queryset.filter(
                 tradeobjects__ballinstance_id=pk, date__range=(start_date, end_date)
             )
-        trades = await queryset.order_by(sort_value).prefetch_related("player1", "player2")
-
-        if not trades:
-            await interaction.followup.send("No history found.", ephemeral=True)
-            return
-
         url = (
             f"{settings.admin_url}/bd_models/ballinstance/{ball.pk}/change/"
             if settings.admin_url
             else None
         )
         source = TradeViewFormat(
-            trades, f"{settings.collectible_name} {ball}", interaction.client, True, url
+            queryset,
+            f"{settings.collectible_name} {ball}",
+            interaction.client,
+            True,
+            url,
+            sorting=sort_value,
         )
+        await source.prepare()
+        if not source.count:
+            await interaction.followup.send("No history found.", ephemeral=True)
+            return
         pages = Pages(source=source, interaction=interaction)
         await pages.start(ephemeral=True)
 
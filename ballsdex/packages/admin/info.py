@@ -12,6 +12,7 @@ from ballsdex.core.utils.enums import (
     MENTION_POLICY_MAP,
     PRIVATE_POLICY_MAP,
 )
+from ballsdex.core.utils.inventory import inventories
 from ballsdex.settings import settings
 
 
@@ -154,7 +155,7 @@ class Info(app_commands.Group):
         )
         embed.add_field(
             name=f"Total {settings.plural_collectible_name} caught:",
-            value=await BallInstance.filter(player__discord_id=user.id).count(),
+            value=(await inventories.get(player)).total,
         )
         embed.add_field(
             name=f"Total unique {settings.plural_collectible_name} caught:",
@@ -1,27 +1,39 @@
 import enum
 import logging
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING
 import random
 from collections import defaultdict
 
 import discord
+from cachetools import TTLCache
 from discord import Interaction
 from discord import app_commands, File
 from discord.ext import commands
 from discord.ui import Button, View, button
 from tortoise.exceptions import DoesNotExist
 from tortoise.functions import Count
+from tortoise.transactions import in_transaction
 from datetime import datetime, timedelta
 import random
 from discord import Embed, Color
 from pathlib import Path
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
 
-from ballsdex.core.models import BallInstance, DonationPolicy, Player, Trade, TradeObject, balls
+from ballsdex.core.image_generator.encoder import EXTENSIONS, image_format
+from ballsdex.core.models import (
+    BallInstance,
+    DonationPolicy,
+    Player,
+    PlayerStats,
+    PrivacyPolicy,
+    Trade,
+    TradeObject,
+    balls,
+)
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.completion import completion_engine
+from ballsdex.core.utils.inventory import inventories
 from ballsdex.core.utils.paginator import FieldPageSource, Pages
-from ballsdex.core.utils.sorting import SortingChoices, sort_balls
+from ballsdex.core.utils.sorting import SortingChoices, keyset_sort
 from ballsdex.core.utils.transformers import (
     BallEnabledTransform,
     BallInstanceTransform,
@@ -29,9 +41,11 @@ from ballsdex.core.utils.transformers import (
     TradeCommandType,
     RegimeTransform,
 )
-from ballsdex.core.image_generator. image_gen import draw_card
 from ballsdex.core.utils.utils import inventory_privacy, is_staff
-from ballsdex.packages.balls.countryballs_paginator import CountryballsViewer
+from ballsdex.packages.balls.countryballs_paginator import (
+    CountryballsQuerySource,
+    CountryballsViewer,
+)
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -39,6 +53,30 @@ if TYPE_CHECKING:
 
 log = logging.getLogger("ballsdex.packages.countryballs")
 
+
+async def donate(countryball: BallInstance, giver: Player, receiver: Player):
+    """
+    Give a countryball to another player, recording the donation as a trade in the same
+    transaction as the ownership change and the statistics of both players.
+    """
+    async with in_transaction() as connection:
+        trade = await Trade.create(player1=giver, player2=receiver, using_db=connection)
+        await TradeObject.create(
+            trade=trade, ballinstance=countryball, player=giver, using_db=connection
+        )
+        await BallInstance.filter(pk=countryball.pk).using_db(connection).update(
+            player=receiver, trade_player=giver, favorite=False
+        )
+        await PlayerStats.record(giver.pk, removed=(countryball,), trade=trade, using_db=connection)
+        await PlayerStats.record(
+            receiver.pk, added=(countryball,), trade=trade, using_db=connection
+        )
+    countryball.player = receiver
+    countryball.trade_player = giver
+    countryball.favorite = False
+    inventories.move((countryball,), giver.pk, receiver.pk)
+
+
 class DonationRequest(View):
     def __init__(
         self,
@@ -79,14 +117,7 @@ class DonationRequest(View):
         self.stop()
         for item in self.children:
             item.disabled = True  # type: ignore
-        self.countryball.favorite = False
-        self.countryball.trade_player = self.countryball.player
-        self.countryball.player = self.new_player
-        await self.countryball.save()
-        trade = await Trade.create(player1=self.countryball.trade_player, player2=self.new_player)
-        await TradeObject.create(
-            trade=trade, ballinstance=self.countryball, player=self.countryball.trade_player
-        )
+        await donate(self.countryball, self.countryball.player, self.new_player)
         await interaction.response.edit_message(
             content=interaction.message.content  # type: ignore
             + "\n\N{WHITE HEAVY CHECK MARK} The donation was accepted!",
@@ -123,21 +154,20 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
 
     def __init__(self, bot: "BallsDexBot"):
         self.bot = bot
-        self.frame_memory = {}
-
-
-    async def apply_overlay(self, ball_instance: BallInstance, image_fp: BytesIO, overlay_filename: str) -> BytesIO:
-        overlay_path = self.OVERLAY_DIR / overlay_filename
-        overlay_img = Image.open(overlay_path).convert("RGBA")
-
-        # Regenerate the card using the draw_card function with the overlay
-        image, _ = draw_card(ball_instance, frame_overlay=overlay_img)
+        # top players by completion, indexed by special ID
+        self.leaderboards: TTLCache[int | None, list[tuple[int, int]]] = TTLCache(
+            maxsize=128, ttl=600
+        )
 
-        # Save to buffer
-        buffer = BytesIO()
-        image.save(buffer, format="PNG")
-        buffer.seek(0)
-        return buffer
+    def frame_path(self, ball_instance: BallInstance) -> str | None:
+        """
+        Return the path of the frame overlay chosen for this ball instance, if any.
+        """
+        frame = (ball_instance.extra_data or {}).get("frame")
+        if not frame:
+            return None
+        path = self.OVERLAY_DIR / Path(frame).name
+        return str(path) if path.is_file() else None
 
 
     @app_commands.command(name="frame")
@@ -167,26 +197,19 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
 
         await interaction.response.defer()
 
-        self.frame_memory[countryball.id] = frame.value
-
-        # Load the overlay
-        overlay_path = self.OVERLAY_DIR / frame.value
-        overlay_img = Image.open(overlay_path).convert("RGBA")
-
-        # Generate the image with overlay
-        image, _ = draw_card(countryball, frame_overlay=overlay_img)
+        # persisted on the instance so the frame survives restarts and is seen by all shards
+        countryball.extra_data = {**(countryball.extra_data or {}), "frame": frame.value}
+        await countryball.save(update_fields=("extra_data",))
 
-        # Save to buffer
-        buffer = BytesIO()
-        image.save(buffer, format="PNG")
-        buffer.seek(0)
+        buffer = await self.bot.render_service.render(countryball, self.frame_path(countryball))
 
         # Prepare Discord file and embed
-        file = File(fp=buffer, filename="framed_footballer.png")
+        extension = EXTENSIONS[image_format(buffer.getvalue())]
+        file = File(fp=buffer, filename=f"framed_footballer.{extension}")
         embed = Embed(
             title=f"{interaction.user.display_name}'s Footballer with {frame.name} Frame (Only visible in /players info)"
         )
-        embed.set_image(url="attachment://framed_footballer.png")
+        embed.set_image(url=f"attachment://{file.filename}")
 
         await interaction.followup.send(embed=embed, file=file)
 
@@ -250,21 +273,19 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
-        await player.fetch_related("balls")
-        query = player.balls.all()
+        query = BallInstance.filter(player=player)
         if countryball:
             query = query.filter(ball__id=countryball.pk)
         if special:
             query = query.filter(special=special)
         if regime:
             query = query.filter(ball__regime=regime)
-        if sort:
-            countryballs = await sort_balls(sort, query)
-        else:
-            countryballs = await query.order_by("-favorite")
+        # only the displayed page is fetched
+        source = CountryballsQuerySource(*keyset_sort(sort, query, reverse))
+        await source.prepare()
 
         regime_txt = str(regime) if regime else ""
-        if len(countryballs) < 1:
+        if not source.count:
             ball_txt = countryball.country if countryball else ""
             special_txt = special if special else ""
 
@@ -287,10 +308,8 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
                     f"{settings.plural_collectible_name} yet."
                 )
             return
-        if reverse:
-            countryballs.reverse()
 
-        paginator = CountryballsViewer(interaction, countryballs)
+        paginator = CountryballsViewer(interaction, source)
         if user_obj == interaction.user:
             await paginator.start()
         else:
@@ -339,20 +358,8 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
 
             if await inventory_privacy(self.bot, interaction, player, user_obj) is False:
                 return
-        # Filter disabled balls, they do not count towards progression
-        # Only ID and emoji is interesting for us
-        bot_countryballs = {x: y.emoji_id for x, y in balls.items() if y.enabled}
-
-        # Set of ball IDs owned by the player
-        filters = {"player__discord_id": user_obj.id, "ball__enabled": True}
-        if special:
-            filters["special"] = special
-            bot_countryballs = {
-                x: y.emoji_id
-                for x, y in balls.items()
-                if y.enabled and (special.end_date is None or y.created_at < special.end_date)
-            }
-        if not bot_countryballs:
+        # Disabled balls and balls created after the special do not count towards progression
+        if not completion_engine.eligible(special):
             await interaction.followup.send(
                 f"There are no {extra_text}{settings.plural_collectible_name}"
                 " registered on this bot yet.",
@@ -360,16 +367,19 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
-        owned_countryballs = set(
-            x[0]
-            for x in await BallInstance.filter(**filters)
-            .distinct()  # Do not query everything
-            .values_list("ball_id")
+        inventory = await inventories.get_by_discord_id(user_obj.id)
+        owned_mask = (
+            completion_engine.mask(inventory.owned(special.pk if special else None))
+            if inventory
+            else 0
+        )
+        owned_countryballs, missing, completion_pct = completion_engine.completion(
+            owned_mask, special
         )
 
         entries: list[tuple[str, str]] = []
 
-        def fill_fields(title: str, emoji_ids: set[int]):
+        def fill_fields(title: str, emoji_ids: list[int]):
             # check if we need to add "(continued)" to the field name
             first_field_added = False
             buffer = ""
@@ -400,13 +410,16 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             # Getting the list of emoji IDs from the IDs of the owned countryballs
             fill_fields(
                 f"Owned {settings.plural_collectible_name}",
-                set(bot_countryballs[x] for x in owned_countryballs),
+                [balls[x].emoji_id for x in completion_engine.ball_ids(owned_countryballs)],
             )
         else:
             entries.append((f"__**Owned {settings.plural_collectible_name}**__", "Nothing yet."))
 
-        if missing := set(y for x, y in bot_countryballs.items() if x not in owned_countryballs):
-            fill_fields(f"Missing {settings.plural_collectible_name}", missing)
+        if missing:
+            fill_fields(
+                f"Missing {settings.plural_collectible_name}",
+                [balls[x].emoji_id for x in completion_engine.ball_ids(missing)],
+            )
         else:
             entries.append(
                 (
@@ -418,9 +431,6 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
 
         source = FieldPageSource(entries, per_page=5, inline=False, clear_description=False)
         special_str = f" ({special.name})" if special else ""
-        # Calculate completion percentage
-        completion_pct = round(len(owned_countryballs) / len(bot_countryballs) * 100, 1)
-
         # Create a simple progress bar using block characters (max 10 blocks)
         blocks_filled = int(completion_pct // 10)
         blocks_empty = 10 - blocks_filled
@@ -576,25 +586,11 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             return
         await interaction.response.defer(thinking=True)
 
-        # Get embed content, image file, and view
-        content, original_file, view = await countryball.prepare_for_message(interaction)
-
-        # Read image bytes into buffer
-        original_file.fp.seek(0)
-        file_bytes = BytesIO(original_file.fp.read())
-        original_file.close()
-
-        frame_name = self.frame_memory.get(countryball.id)
-        if frame_name:
-            # Apply the frame overlay
-            framed_buffer = await self.apply_overlay(countryball, file_bytes, frame_name)
-            file = discord.File(fp=framed_buffer, filename="framed_footballer.png")
-            image_filename = "framed_footballer.png"
-        else:
-            # Use original image
-            file_bytes.seek(0)
-            file = discord.File(fp=file_bytes, filename="footballer.png")
-            image_filename = "footballer.png"
+        # Get embed content, image file with the frame applied, and view
+        content, file, view = await countryball.prepare_for_message(
+            interaction, frame=self.frame_path(countryball)
+        )
+        image_filename = file.filename
 
         # Create embed
         embed = Embed(
@@ -794,7 +790,13 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             interaction = view.interaction_response
         else:
             await interaction.response.defer()
-        await countryball.lock_for_trade()
+        if not await countryball.lock_for_trade():
+            await interaction.followup.send(
+                f"This {settings.collectible_name} is currently locked for a trade. "
+                "Please try again later.",
+                ephemeral=True,
+            )
+            return
         new_player, _ = await Player.get_or_create(discord_id=user.id)
         old_player = countryball.player
 
@@ -844,13 +846,7 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
-        countryball.player = new_player
-        countryball.trade_player = old_player
-        countryball.favorite = False
-        await countryball.save()
-
-        trade = await Trade.create(player1=old_player, player2=new_player)
-        await TradeObject.create(trade=trade, ballinstance=countryball, player=old_player)
+        await donate(countryball, old_player, new_player)
 
         cb_txt = (
             countryball.description(short=True, include_emoji=True, bot=self.bot, is_trade=True)
@@ -918,7 +914,17 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
 
         await interaction.response.defer(ephemeral=True, thinking=True)
 
-        balls = await BallInstance.filter(**filters).count()
+        inventory = None
+        if not current_server and not (countryball and special):
+            inventory = await inventories.get_by_discord_id(interaction.user.id)
+        if inventory is None:
+            balls = await BallInstance.filter(**filters).count()
+        elif countryball:
+            balls = inventory.count(countryball.pk)
+        elif special:
+            balls = inventory.specials.get(special.pk, 0)
+        else:
+            balls = inventory.total
         country = f"{countryball.country} " if countryball else ""
         plural = "s" if balls > 1 or balls == 0 else ""
         special_str = f"{special.name} " if special else ""
@@ -1031,14 +1037,6 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
         if await inventory_privacy(self.bot, interaction, player, user) is False:
             return
 
-        bot_countryballs = {x: y.emoji_id for x, y in balls.items() if y.enabled}
-        if special:
-            bot_countryballs = {
-                x: y.emoji_id
-                for x, y in balls.items()
-                if y.enabled and (special.end_date is None or y.created_at < special.end_date)
-            }
-
         player1, _ = await Player.get_or_create(discord_id=interaction.user.id)
         player2, _ = await Player.get_or_create(discord_id=user.id)
 
@@ -1055,30 +1053,25 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
                 "You cannot compare with a user that has you blocked.", ephemeral=True
             )
             return
-        queryset = BallInstance.filter(ball__enabled=True).distinct()
-        if special:
-            queryset = queryset.filter(special=special)
-        user1_balls = cast(
-            list[int],
-            await queryset.filter(player=player1).values_list("ball_id", flat=True),
-        )
-        user2_balls = cast(
-            list[int],
-            await queryset.filter(player=player2).values_list("ball_id", flat=True),
-        )
-        both = set(user1_balls) & set(user2_balls)
-        user1_only = set(user1_balls) - set(user2_balls)
-        user2_only = set(user2_balls) - set(user1_balls)
-        neither = set(bot_countryballs.keys()) - both - user1_only - user2_only
+        special_id = special.pk if special else None
+        eligible = completion_engine.eligible(special)
+        user1_balls = completion_engine.mask((await inventories.get(player1)).owned(special_id))
+        user2_balls = completion_engine.mask((await inventories.get(player2)).owned(special_id))
+        user1_balls &= eligible
+        user2_balls &= eligible
+        both = user1_balls & user2_balls
+        user1_only = user1_balls & ~user2_balls
+        user2_only = user2_balls & ~user1_balls
+        neither = eligible & ~(user1_balls | user2_balls)
 
         entries = []
 
-        def fill_fields(title: str, ids: set[int]):
+        def fill_fields(title: str, mask: int):
             first_field_added = False
             buffer = ""
 
-            for ball_id in ids:
-                emoji = self.bot.get_emoji(bot_countryballs[ball_id])
+            for ball_id in completion_engine.ball_ids(mask):
+                emoji = self.bot.get_emoji(balls[ball_id].emoji_id)
                 if not emoji:
                     continue
 
@@ -1117,3 +1110,58 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
 
         pages = Pages(source=source, interaction=interaction, compact=True)
         await pages.start()
+
+    @app_commands.command()
+    @app_commands.checks.cooldown(1, 60, key=lambda i: i.user.id)
+    async def leaderboard(
+        self,
+        interaction: discord.Interaction["BallsDexBot"],
+        special: SpecialEnabledTransform | None = None,
+    ):
+        """
+        Show the players with the highest completion.
+
+        Parameters
+        ----------
+        special: Special
+            Rank the completion of a special event instead.
+        """
+        if interaction.response.is_done():
+            return
+        await interaction.response.defer(thinking=True)
+
+        eligible = completion_engine.eligible(special)
+        key = special.pk if special else None
+        if (top := self.leaderboards.get(key)) is None:
+            # players with a private inventory are not ranked
+            queryset = BallInstance.filter(
+                ball_id__in=completion_engine.ball_ids(eligible),
+                player__privacy_policy=PrivacyPolicy.ALLOW,
+            )
+            if special:
+                queryset = queryset.filter(special=special)
+            top = await (
+                queryset.annotate(owned=Count("ball_id", distinct=True))
+                .group_by("player__discord_id")
+                .order_by("-owned")
+                .limit(10)
+                .values_list("player__discord_id", "owned")
+            )
+            self.leaderboards[key] = top
+
+        if not top:
+            await interaction.followup.send("Nobody is ranked yet.")
+            return
+        total = eligible.bit_count()
+        special_str = f" ({special.name})" if special else ""
+        embed = discord.Embed(
+            title=f"{settings.bot_name}{special_str} completion leaderboard",
+            description="\n".join(
+                f"**{i}.** <@{discord_id}> — {round(owned / total * 100, 1)}% "
+                f"({owned}/{total})"
+                for i, (discord_id, owned) in enumerate(top, start=1)
+            ),
+            colour=discord.Colour.gold(),
+        )
+        embed.set_footer(text="Updated every 10 minutes")
+        await interaction.followup.send(embed=embed)
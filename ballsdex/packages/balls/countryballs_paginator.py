@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, List, Sequence
 
 import discord
 
 from ballsdex.core.models import BallInstance
 from ballsdex.core.utils import menus
-from ballsdex.core.utils.paginator import Pages
+from ballsdex.core.utils.paginator import Pages, QuerySetPageSource
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
+    from tortoise.queryset import QuerySet
+
     from ballsdex.core.bot import BallsDexBot
 
 
@@ -22,10 +24,32 @@ class CountryballsSource(menus.ListPageSource):
         return True  # signal to edit the page
 
 
+class CountryballsQuerySource(QuerySetPageSource):
+    """
+    Lazy version of `CountryballsSource`, fetching each page from the database when shown.
+    """
+
+    def __init__(
+        self,
+        queryset: "QuerySet[BallInstance]",
+        keys: Sequence[str] | None,
+        count: int | None = None,
+    ):
+        super().__init__(queryset, keys, per_page=25, count=count)
+
+    async def format_page(self, menu: CountryballsSelector, balls: List[BallInstance]):
+        menu.set_options(balls)
+        return True  # signal to edit the page
+
+
 class CountryballsSelector(Pages):
-    def __init__(self, interaction: discord.Interaction["BallsDexBot"], balls: List[BallInstance]):
+    def __init__(
+        self,
+        interaction: discord.Interaction["BallsDexBot"],
+        balls: List[BallInstance] | menus.PageSource,
+    ):
         self.bot = interaction.client
-        source = CountryballsSource(balls)
+        source = balls if isinstance(balls, menus.PageSource) else CountryballsSource(balls)
         super().__init__(source, interaction=interaction)
         self.add_item(self.select_ball_menu)
 
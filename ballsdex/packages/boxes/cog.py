@@ -31,6 +31,7 @@ from ballsdex.core.bot import BallsDexBot
 import ballsdex.packages.config.components as Components
 from collections import defaultdict
 from ballsdex.core.image_generator. image_gen import draw_card
+from ballsdex.packages.boxes.engine import PackEngine
 from io import BytesIO
 from ballsdex.core.utils.transformers import (
     BallEnabledTransform,
@@ -80,6 +81,8 @@ class Claim(commands.GroupCog, name="packs"):
         self.bot = bot
         self.bot_tutorial_seen = set()
         self.bot_walletturorial_seen = set()
+        self.engine = PackEngine()
+        self.engine.rebuild(balls.values())
         super().__init__()
 
     def rarity_bar(rarity: float, max_rarity=10.0, length=10) -> str:
@@ -176,83 +179,16 @@ class Claim(commands.GroupCog, name="packs"):
         return embed
 
     async def get_random_ball(self, player: Player) -> Ball | None:
-        owned_ids = set(
-            await BallInstance.filter(player=player).values_list("ball__id", flat=True)
-        )
-        all_balls = await Ball.filter(rarity__gte=0.1, rarity__lte=30.0, enabled=True).all()
-
-        if not all_balls:
-            return None
-
-        weighted_choices = []
-        for ball in all_balls:
-            # base weight based on ownership
-            base_weight = 1 if ball.id in owned_ids else 5
-
-            # rarity weight according to your tiers
-            if 5.0 <= ball.rarity <= 30.0:
-                rarity_weight = 16  # common
-            elif 2.5 <= ball.rarity < 5.0:
-                rarity_weight = 6   # decent
-            elif 1.5 <= ball.rarity < 2.5:
-                rarity_weight = 3   # rare
-            elif 0.5 < ball.rarity < 1.5:
-                rarity_weight = 1   # very rare
-            else:  # ball.rarity == 0.5 exactly (very very rare)
-                rarity_weight = 0.2
-
-            final_weight = base_weight * rarity_weight
-            weighted_choices.append((ball, final_weight))
-
-        choices = []
-        for ball, weight in weighted_choices:
-            choices.extend([ball] * int(weight))
-
-        if not choices:
-            return None
-
-        return random.choice(choices)
-
+        pulls = self.engine.draw("standard", await self.engine.owned_ball_ids(player))
+        return pulls[0] if pulls else None
 
     async def getdasigmaballmate(self, player: Player) -> Ball | None:
-        owned_ids = set(
-            await BallInstance.filter(player=player).values_list("ball__id", flat=True)
-        )
-        all_balls = await Ball.filter(rarity__gte=0.03, rarity__lte=5.0, enabled=True).all()
-
-        if not all_balls:
-            return None
-
-        weighted_choices = []
-        for ball in all_balls:
-            if ball.id in owned_ids:
-                base_weight = 1
-            else:
-                base_weight = 5
-
-            # Explicit rarity weighting
-            if ball.rarity >= 4.5:  # very common
-                rarity_weight = 9
-            elif ball.rarity >= 1.5:  # common
-                rarity_weight = 5
-            elif ball.rarity >= 0.5:  # uncommon
-                rarity_weight = 2
-            else:  # rare (below 0.5 rarity)
-                rarity_weight = 0.2
-
-            final_weight = base_weight * rarity_weight
-            weighted_choices.append((ball, final_weight))
-
-        choices = []
-        for ball, weight in weighted_choices:
-            choices.extend([ball] * int(weight))
-
-        if not choices:
-            return None
-
-        return random.choice(choices)
-
+        pulls = self.engine.draw("weekly", await self.engine.owned_ball_ids(player))
+        return pulls[0] if pulls else None
 
+    @commands.Cog.listener()
+    async def on_ballsdex_cache_loaded(self):
+        self.engine.rebuild(balls.values())
 
     @app_commands.command(name="daily", description="Claim your daily Footballer!")
     @app_commands.checks.cooldown(1, 86400, key=lambda i: i.user.id)
@@ -273,18 +209,14 @@ class Claim(commands.GroupCog, name="packs"):
 
         player, _ = await Player.get_or_create(discord_id=str(interaction.user.id))
 
-        pulls = []
-        for _ in range(3):
-            ball = await self.get_random_ball(player)
-            if not ball:
-                continue
-            instance = await BallInstance.create(
-                ball=ball,
-                player=player,
-                attack_bonus=random.randint(-20, 20),
-                health_bonus=random.randint(-20, 20),
-            )
-            pulls.append((ball, instance))
+        owned = await self.engine.owned_ball_ids(player)
+        drawn = self.engine.draw("standard", owned, k=3)
+        instances = await BallInstance.bulk_grant(
+            player,
+            [(ball, None, (random.randint(-20, 20), random.randint(-20, 20))) for ball in drawn],
+            source="daily",
+        )
+        pulls = list(zip(drawn, instances))
 
         if not pulls:
             await interaction.followup.send("No footballers available right now, try again later.", ephemeral=True)
@@ -336,11 +268,10 @@ class Claim(commands.GroupCog, name="packs"):
             await interaction.response.send_message("No balls are available.", ephemeral=True)
             return
 
-        instance = await BallInstance.create(
-            ball=ball,
-            player=player,
-            attack_bonus=random.randint(-20, 20),
-            health_bonus=random.randint(-20, 20),
+        (instance,) = await BallInstance.bulk_grant(
+            player,
+            [(ball, None, (random.randint(-20, 20), random.randint(-20, 20)))],
+            source="weekly",
         )
 
         # Walkout-style embed animation
@@ -366,7 +297,7 @@ class Claim(commands.GroupCog, name="packs"):
         walkout_embed.title = f"🎁 You got **{ball.country} {ball.id}**!"
         walkout_embed.color = discord.Color.from_rgb(229, 255, 0)  # You can randomize if you want
 
-        content, file, view = await instance.prepare_for_message(interaction)
+        content, file, view = await instance.prepare_for_message(interaction, site="pack")
         walkout_embed.set_image(url="attachment://" + file.filename)
         walkout_embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
 
@@ -435,11 +366,10 @@ class Claim(commands.GroupCog, name="packs"):
             return
 
         # Create an instance of the ball for the user
-        instance = await BallInstance.create(
-            ball=ball,
-            player=player,
-            attack_bonus=random.randint(-20, 20),
-            health_bonus=random.randint(-20, 20),
+        (instance,) = await BallInstance.bulk_grant(
+            player,
+            [(ball, None, (random.randint(-20, 20), random.randint(-20, 20)))],
+            source="packly",
         )
 
         # Walkout-style embed animation
@@ -466,7 +396,7 @@ class Claim(commands.GroupCog, name="packs"):
         walkout_embed.title = f"🎉 You claimed **{ball.country}** from Packly!"
         walkout_embed.color = discord.Color.gold()
 
-        content, file, view = await instance.prepare_for_message(interaction)
+        content, file, view = await instance.prepare_for_message(interaction, site="pack")
         walkout_embed.set_image(url="attachment://" + file.filename)
         walkout_embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
 
@@ -527,23 +457,20 @@ class Claim(commands.GroupCog, name="packs"):
         # Small pause to simulate animation
         await asyncio.sleep(4)
 
-        # Reveal footballers one by one
-        for _ in range(packs):
-            player, _ = await Player.get_or_create(discord_id=str(interaction.user.id))
-            ball = await self.get_random_ball(player)
-
-            if not ball:
-                await interaction.followup.send("No footballers are available.", ephemeral=True)
-                return
-
-            # Create an instance of the ball for the user
-            instance = await BallInstance.create(
-                ball=ball,
-                player=player,
-                attack_bonus=random.randint(-20, 20),
-                health_bonus=random.randint(-20, 20),
-            )
+        # Draw all the packs at once and create the instances in a single insert
+        player, _ = await Player.get_or_create(discord_id=str(interaction.user.id))
+        pulls = self.engine.draw("standard", await self.engine.owned_ball_ids(player), k=packs)
+        if not pulls:
+            await interaction.followup.send("No footballers are available.", ephemeral=True)
+            return
+        await BallInstance.bulk_grant(
+            player,
+            [(ball, None, (random.randint(-20, 20), random.randint(-20, 20))) for ball in pulls],
+            source="multipackly",
+        )
 
+        # Reveal footballers one by one
+        for ball in pulls:
             # Create the walkout embed
             walkout_embed = discord.Embed(
                 title=f"🏆 You pulled {ball.country}!",
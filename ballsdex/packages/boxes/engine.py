@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from ballsdex.core.utils.inventory import inventories
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import Ball, Player
+
+# weight multiplier of the countryballs the player doesn't own yet
+UNOWNED_BOOST = 5
+
+
+def standard_weight(rarity: float) -> float:
+    if rarity >= 5.0:
+        return 16  # common
+    if rarity >= 2.5:
+        return 6  # decent
+    if rarity >= 1.5:
+        return 3  # rare
+    if rarity > 0.5:
+        return 1  # very rare
+    return 0.2  # very very rare
+
+
+def weekly_weight(rarity: float) -> float:
+    if rarity >= 4.5:
+        return 9  # very common
+    if rarity >= 1.5:
+        return 5  # common
+    if rarity >= 0.5:
+        return 2  # uncommon
+    return 0.2  # rare
+
+
+@dataclass(frozen=True)
+class PackType:
+    """
+    Defines which countryballs can be pulled from a pack, and their base weight.
+    """
+
+    min_rarity: float
+    max_rarity: float
+    weight: Callable[[float], float]
+
+
+PACK_TYPES = {
+    "standard": PackType(0.1, 30.0, standard_weight),
+    "weekly": PackType(0.03, 5.0, weekly_weight),
+}
+
+
+@dataclass
+class TierTable:
+    balls: list["Ball"] = field(default_factory=list)
+    weights: list[float] = field(default_factory=list)
+
+
+class PackEngine:
+    """
+    Draws countryballs from packs using tier tables precomputed from the cache.
+
+    Pulls favor the countryballs a player doesn't own yet, the weights of a player are built
+    once per opening and all the pulls are drawn in a single batch.
+    """
+
+    def __init__(self):
+        self.tables: dict[str, TierTable] = {}
+
+    def rebuild(self, balls: Iterable["Ball"]):
+        """
+        Recompute the tier tables, needed each time the cache is reloaded.
+        """
+        balls = [x for x in balls if x.enabled]
+        self.tables = {}
+        for name, pack in PACK_TYPES.items():
+            table = TierTable()
+            for ball in balls:
+                if pack.min_rarity <= ball.rarity <= pack.max_rarity:
+                    table.balls.append(ball)
+                    table.weights.append(pack.weight(ball.rarity))
+            self.tables[name] = table
+
+    async def owned_ball_ids(self, player: "Player") -> set[int]:
+        return (await inventories.get(player)).owned()
+
+    def draw(self, pack: str, owned: set[int], k: int = 1) -> list["Ball"]:
+        """
+        Draw ``k`` countryballs from a pack, with replacement.
+
+        Parameters
+        ----------
+        pack: str
+            The name of the pack type, key of `PACK_TYPES`.
+        owned: set[int]
+            The IDs of the countryballs owned by the player, as returned by `owned_ball_ids`.
+        k: int
+            Number of pulls.
+
+        Returns
+        -------
+        list[Ball]
+            The pulled countryballs, empty if the pack has no countryball available.
+        """
+        table = self.tables.get(pack)
+        if not table or not table.balls:
+            return []
+        cum_weights = list(
+            accumulate(
+                weight if ball.pk in owned else weight * UNOWNED_BOOST
+                for ball, weight in zip(table.balls, table.weights)
+            )
+        )
+        return random.choices(table.balls, cum_weights=cum_weights, k=k)
@@ -3,7 +3,8 @@ from discord.ext import commands
 from discord import app_commands
 from typing import Optional
 import asyncio
-from ballsdex.core.models import GuildConfig, BallInstance
+from ballsdex.core.models import BallInstance
+from ballsdex.core.utils.guild_configs import guild_configs
 from ballsdex.settings import settings
 from ballsdex.core.utils.utils import is_staff
 from datetime import datetime, timedelta, timezone
@@ -27,24 +28,13 @@ class Broadcast(commands.Cog):
         pass
 
     async def get_broadcast_channels(self):
-        try:
-            channels = set()
-            async for config in GuildConfig.filter(enabled=True, spawn_channel__isnull=False):
-                channel = self.bot.get_channel(config.spawn_channel)
-                if channel:
-                    channels.add(config.spawn_channel)
-                else:
-                    try:
-                        config.enabled = False
-                        await config.save()
-                        logger.debug(f"Disabled guild {config.guild_id} due to missing channel {config.spawn_channel}")
-                    except Exception as e:
-                        logger.error(f"Error disabling guild {config.guild_id}: {str(e)}")
-            return channels
-        except Exception as e:
-            logger.error(f"Error getting broadcast channels: {str(e)}")
-            logger.error(traceback.format_exc())
-            return set()
+        channels = set()
+        for guild_id, channel_id in guild_configs.spawn_channels():
+            if self.bot.get_channel(channel_id):
+                channels.add(channel_id)
+            else:
+                logger.debug(f"Skipping guild {guild_id} due to missing channel {channel_id}")
+        return channels
 
     async def get_member_count(self, guild):
         """to get the number of server members"""
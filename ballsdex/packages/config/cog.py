@@ -5,6 +5,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from ballsdex.core.models import GuildConfig
+from ballsdex.core.utils.guild_configs import guild_configs
 from ballsdex.packages.config.components import AcceptTOSView
 from ballsdex.settings import settings
 
@@ -86,6 +87,7 @@ class Config(commands.GroupCog):
         if config.enabled:
             config.enabled = False  # type: ignore
             await config.save()
+            guild_configs.update(guild.id, config.spawn_channel, config.enabled)
             self.bot.dispatch("ballsdex_settings_change", guild, enabled=False)
             await interaction.response.send_message(
                 f"{settings.bot_name} is now disabled in this server. Commands will still be "
@@ -95,6 +97,7 @@ class Config(commands.GroupCog):
         else:
             config.enabled = True  # type: ignore
             await config.save()
+            guild_configs.update(guild.id, config.spawn_channel, config.enabled)
             self.bot.dispatch("ballsdex_settings_change", guild, enabled=True)
             if config.spawn_channel and (channel := guild.get_channel(config.spawn_channel)):
                 if channel:
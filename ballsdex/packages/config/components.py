@@ -4,6 +4,7 @@ import discord
 from discord.ui import Button, View, button
 
 from ballsdex.core.models import GuildConfig
+from ballsdex.core.utils.guild_configs import guild_configs
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -62,6 +63,7 @@ class AcceptTOSView(View):
         config.spawn_channel = self.channel.id  # type: ignore
         config.enabled = True
         await config.save()
+        guild_configs.update(config.guild_id, config.spawn_channel, config.enabled)
         interaction.client.dispatch(
             "ballsdex_settings_change", interaction.guild, channel=self.channel, enabled=True
         )
@@ -9,4 +9,4 @@ if TYPE_CHECKING:
 async def setup(bot: "BallsDexBot"):
     cog = CountryBallsSpawner(bot)
     await bot.add_cog(cog)
-    await cog.load_cache()
+    await cog.restore_spawn_state()
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Callable, Iterator
+
+if TYPE_CHECKING:
+    from ballsdex.packages.countryballs.spawn import BaseSpawnManager
+
+__all__ = ("SyntheticStream", "benchmark_spawn_manager")
+
+# member counts drawn for the synthetic guilds, covering each time multiplier of the manager
+MEMBER_COUNTS = (3, 40, 400, 4000)
+
+
+class SyntheticStream:
+    """
+    Generates a reproducible stream of message-like objects across many guilds, carrying the
+    attributes read by the spawn managers.
+
+    Activity is skewed towards a minority of guilds, each guild having its own member count
+    and set of chatters, a fifth of the messages being shorter than 5 characters.
+
+    Parameters
+    ----------
+    guilds: int
+        Number of guilds.
+    duration: float
+        Number of seconds of virtual time the messages are spread over.
+    start: datetime | None
+        Date of the first message, defaults to now.
+    seed: int
+        Seed of the random generator.
+    """
+
+    def __init__(
+        self,
+        guilds: int,
+        duration: float = 3600,
+        *,
+        start: datetime | None = None,
+        seed: int = 0,
+    ):
+        self.random = random.Random(seed)
+        self.duration = duration
+        self.start = start or datetime.now(timezone.utc)
+        self.state = SimpleNamespace(intents=SimpleNamespace(message_content=True))
+        # IDs shifted like snowflakes, so that managers relying on their timestamp bits work
+        self.guilds = [
+            SimpleNamespace(id=(i + 1) << 22, member_count=self.random.choice(MEMBER_COUNTS))
+            for i in range(guilds)
+        ]
+        self.chatters = [self.random.randint(1, 30) for _ in range(guilds)]
+
+    def messages(self, count: int, batch_size: int = 10000) -> Iterator[list[SimpleNamespace]]:
+        """
+        Yield ``count`` messages in chronological order, by batches.
+        """
+        rand = self.random.random
+        step = self.duration / count
+        for offset in range(0, count, batch_size):
+            batch: list[SimpleNamespace] = []
+            for i in range(offset, min(offset + batch_size, count)):
+                index = int(len(self.guilds) * rand() ** 3)
+                author = (index << 8) | int(rand() * self.chatters[index])
+                batch.append(
+                    SimpleNamespace(
+                        guild=self.guilds[index],
+                        author=SimpleNamespace(id=author + 1),
+                        content="ok" if rand() < 0.2 else "hello there",
+                        created_at=self.start + timedelta(seconds=i * step),
+                        _state=self.state,
+                    )
+                )
+            yield batch
+
+
+async def _replay(manager: "BaseSpawnManager", stream: SyntheticStream, messages: int):
+    elapsed = 0.0
+    spawns = 0
+    for batch in stream.messages(messages):
+        start = time.perf_counter()
+        for message in batch:
+            if await manager.handle_message(message):  # type: ignore
+                spawns += 1
+        elapsed += time.perf_counter() - start
+    return elapsed, spawns
+
+
+async def benchmark_spawn_manager(
+    factory: Callable[[], "BaseSpawnManager"],
+    guilds: int = 50_000,
+    messages: int = 1_000_000,
+    *,
+    seed: int = 0,
+) -> tuple[float, int, int]:
+    """
+    Replay a synthetic stream of messages across many guilds through a spawn manager.
+
+    The stream is replayed twice on new managers. The first replay is timed, only the calls to
+    ``handle_message`` being measured, and the second one is traced with `tracemalloc`, which
+    slows it down.
+
+    Parameters
+    ----------
+    factory: Callable[[], BaseSpawnManager]
+        Returns a new spawn manager.
+    guilds: int
+        Number of guilds.
+    messages: int
+        Number of messages, spread over one hour.
+    seed: int
+        Seed of the synthetic stream.
+
+    Returns
+    -------
+    tuple[float, int, int]
+        Messages handled per second, peak memory allocated during the second replay in bytes,
+        and number of spawns.
+    """
+    start = datetime.now(timezone.utc)
+    stream = SyntheticStream(guilds, start=start, seed=seed)
+    elapsed, spawns = await _replay(factory(), stream, messages)
+
+    stream = SyntheticStream(guilds, start=start, seed=seed)
+    tracemalloc.start()
+    try:
+        await _replay(factory(), stream, messages)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return messages / elapsed if elapsed else 0.0, peak, spawns
@@ -1,14 +1,18 @@
+import asyncio
 import importlib
 import logging
-from typing import TYPE_CHECKING, cast
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Collection, cast
 
 import discord
-from discord.ext import commands
-from tortoise.exceptions import DoesNotExist
+from discord.ext import commands, tasks
 
-from ballsdex.core.models import GuildConfig
+from ballsdex.core.models import SpawnSnapshot
+from ballsdex.core.utils.guild_configs import guild_configs
 from ballsdex.packages.countryballs.countryball import BallSpawnView
 from ballsdex.packages.countryballs.spawn import BaseSpawnManager
+from ballsdex.packages.countryballs.trace import TraceRecorder
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -16,13 +20,15 @@ if TYPE_CHECKING:
 
 log = logging.getLogger("ballsdex.packages.countryballs")
 
+# minutes between two saves of the spawn manager state
+SNAPSHOT_INTERVAL = 5
+
 
 class CountryBallsSpawner(commands.Cog):
     spawn_manager: BaseSpawnManager
 
     def __init__(self, bot: "BallsDexBot"):
         self.bot = bot
-        self.cache: dict[int, int] = {}
         self.countryball_cls = BallSpawnView
 
         module_path, class_name = settings.spawn_manager.rsplit(".", 1)
@@ -32,15 +38,74 @@ class CountryBallsSpawner(commands.Cog):
         spawn_manager = getattr(module, class_name)
         self.spawn_manager = spawn_manager(bot)
 
-    async def load_cache(self):
-        i = 0
-        async for config in GuildConfig.filter(enabled=True, spawn_channel__isnull=False).only(
-            "guild_id", "spawn_channel"
-        ):
-            self.cache[config.guild_id] = config.spawn_channel
-            i += 1
-        grammar = "" if i == 1 else "s"
-        log.info(f"Loaded {i} guild{grammar} in cache.")
+        self.trace_recorder: TraceRecorder | None = None
+        if settings.spawn_trace:
+            self.trace_recorder = TraceRecorder(
+                Path(settings.spawn_trace), bot.intents.message_content
+            )
+
+    async def cog_unload(self):
+        if self.trace_recorder:
+            self.trace_recorder.close()
+        if self.save_spawn_state.is_running():
+            self.save_spawn_state.cancel()
+            await self.save_spawn_state()
+
+    def shard_of(self, guild_id: int) -> int:
+        return (guild_id >> 22) % (self.bot.shard_count or 1)
+
+    def shard_filter(self, shard_ids: Collection[int]) -> Callable[[int], bool]:
+        """
+        Return a function telling whether a guild ID belongs to one of the given shards.
+        """
+        return lambda guild_id: self.shard_of(guild_id) in shard_ids
+
+    async def restore_spawn_state(self):
+        """
+        Restore the spawn manager state of the guilds of the shards handled by this process.
+
+        If the number of shards changed since the state was saved, the snapshots of all the
+        shards are read and filtered instead.
+        """
+        shard_count = self.bot.shard_count or 1
+        shard_ids = set(self.bot.shards) or {0}
+        snapshots = await SpawnSnapshot.filter(
+            manager=settings.spawn_manager, shard_count=shard_count, shard_id__in=shard_ids
+        )
+        if len(snapshots) < len(shard_ids):
+            snapshots = await SpawnSnapshot.filter(manager=settings.spawn_manager)
+
+        owned = self.shard_filter(shard_ids)
+        restored = 0
+        for snapshot in snapshots:
+            data = await asyncio.to_thread(zlib.decompress, snapshot.data)
+            try:
+                restored += self.spawn_manager.restore(data, owned)
+            except Exception:
+                log.exception(f"Failed to restore the spawn state of shard {snapshot.shard_id}")
+        if restored:
+            log.info(f"Restored the spawn state of {restored} guilds.")
+        self.save_spawn_state.start()
+
+    @tasks.loop(minutes=SNAPSHOT_INTERVAL)
+    async def save_spawn_state(self):
+        shard_count = self.bot.shard_count or 1
+        # guilds are grouped by shard in a single pass, serialized in chunks on the loop
+        snapshots = await self.spawn_manager.snapshot(list(self.bot.shards) or [0], self.shard_of)
+        if snapshots is None:
+            return  # not supported by the spawn manager
+        for shard_id, data in snapshots.items():
+            try:
+                await SpawnSnapshot.update_or_create(
+                    defaults={
+                        "shard_count": shard_count,
+                        "manager": settings.spawn_manager,
+                        "data": await asyncio.to_thread(zlib.compress, data),
+                    },
+                    shard_id=shard_id,
+                )
+            except Exception:
+                log.exception(f"Failed to save the spawn state of shard {shard_id}")
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -49,11 +114,14 @@ class CountryBallsSpawner(commands.Cog):
         guild = message.guild
         if not guild:
             return
-        if guild.id not in self.cache:
+        channel_id = guild_configs.spawn_channel(guild.id)
+        if channel_id is None:
             return
         if guild.id in self.bot.blacklist_guild:
             return
 
+        if self.trace_recorder:
+            self.trace_recorder.record(message)
         result = await self.spawn_manager.handle_message(message)
         if result is False:
             return
@@ -63,36 +131,11 @@ class CountryBallsSpawner(commands.Cog):
         else:
             algo = settings.spawn_manager
 
-        channel = guild.get_channel(self.cache[guild.id])
+        channel = guild.get_channel(channel_id)
         if not channel:
-            log.warning(f"Lost channel {self.cache[guild.id]} for guild {guild.name}.")
-            del self.cache[guild.id]
+            log.warning(f"Lost channel {channel_id} for guild {guild.name}.")
+            guild_configs.remove(guild.id)
             return
         ball = await BallSpawnView.get_random(self.bot)
         ball.algo = algo
         await ball.spawn(cast(discord.TextChannel, channel))
-
-    @commands.Cog.listener()
-    async def on_ballsdex_settings_change(
-        self,
-        guild: discord.Guild,
-        channel: discord.TextChannel | None = None,
-        enabled: bool | None = None,
-    ):
-        if guild.id not in self.cache:
-            if enabled is False:
-                return  # do nothing
-            if channel:
-                self.cache[guild.id] = channel.id
-            else:
-                try:
-                    config = await GuildConfig.get(guild_id=guild.id)
-                except DoesNotExist:
-                    return
-                else:
-                    self.cache[guild.id] = config.spawn_channel
-        else:
-            if enabled is False:
-                del self.cache[guild.id]
-            elif channel:
-                self.cache[guild.id] = channel.id
@@ -4,25 +4,25 @@ import logging
 import math
 import random
 import string
-from datetime import datetime
 from typing import TYPE_CHECKING
 
 import discord
 from discord.ui import Button, Modal, TextInput, View, button
-from tortoise.timezone import get_default_timezone
-from tortoise.timezone import now as tortoise_now
+from tortoise.transactions import in_transaction
 
-from ballsdex.core.metrics import caught_balls
+from ballsdex.core.image_generator.wild_cards import wild_cards
 from ballsdex.core.models import (
     Ball,
     BallInstance,
     Player,
+    PlayerStats,
     Special,
     Trade,
     TradeObject,
-    balls,
-    specials,
 )
+from ballsdex.core.utils.inventory import inventories
+from ballsdex.core.utils.locks import lock_manager
+from ballsdex.core.utils.sampling import samplers
 from ballsdex.settings import settings
 from ballsdex.core.image_generator. image_gen import draw_card
 
@@ -84,7 +84,7 @@ class CountryballNamePrompt(Modal, title=f"Catch this {settings.collectible_name
                 allowed_mentions=discord.AllowedMentions(users=player.can_be_mentioned),
                 ephemeral=False,
             )
-        total_balls = await BallInstance.filter(player=player).count()
+        total_balls = (await inventories.get(player)).total
         if total_balls == 1:
             tutorial_embed = discord.Embed(
                 title="📘 Welcome to FootballDex!",
@@ -180,11 +180,9 @@ class BallSpawnView(View):
         The ball instance must be unlocked from trades, and will be locked until caught or timed
         out.
         """
-        if await ball_instance.is_locked():
-            raise RuntimeError("This countryball is locked for a trade")
-
         # prevent countryball from being traded while spawned
-        await ball_instance.lock_for_trade()
+        if not await ball_instance.lock_for_trade():
+            raise RuntimeError("This countryball is locked for a trade")
 
         view = cls(bot, ball_instance.ball)
         view.ballinstance = ball_instance
@@ -195,12 +193,9 @@ class BallSpawnView(View):
         """
         Get a new instance with a random countryball. Rarity values are taken into account.
         """
-        countryballs = list(filter(lambda m: m.enabled, balls.values()))
-        if not countryballs:
+        if not samplers.balls:
             raise RuntimeError("No ball to spawn")
-        rarities = [x.rarity for x in countryballs]
-        cb = random.choices(population=countryballs, weights=rarities, k=1)[0]
-        return cls(bot, cb)
+        return cls(bot, samplers.balls.draw())
 
     @property
     def name(self):
@@ -227,8 +222,11 @@ class BallSpawnView(View):
             source = string.ascii_uppercase + string.ascii_lowercase + string.ascii_letters
             return "".join(random.choices(source, k=15))
 
-        extension = self.model.wild_card.split(".")[-1]
-        file_location = "./admin_panel/media/" + self.model.wild_card
+        if payload := wild_cards.get(self.model):
+            file_location, extension = payload
+        else:
+            extension = self.model.wild_card.split(".")[-1]
+            file_location = "./admin_panel/media/" + self.model.wild_card
         file_name = f"nt_{generate_random_name()}.{extension}"
         spawn_msg = [
             f"A unknown {settings.collectible_name} appeared, catch it before it's to late!",
@@ -320,19 +318,31 @@ class BallSpawnView(View):
         self.caught = True
         self.catch_button.disabled = True
         player = player or (await Player.get_or_create(discord_id=user.id))[0]
-        is_new = not await BallInstance.filter(player=player, ball=self.model).exists()
+        is_new = not (await inventories.get(player)).count(self.model.pk)
 
         if self.ballinstance:
             # if specified, do not create a countryball but switch owner
             # it's important to register this as a trade to avoid bypass
-            trade = await Trade.create(player1=self.ballinstance.player, player2=player)
-            await TradeObject.create(
-                trade=trade, player=self.ballinstance.player, ballinstance=self.ballinstance
-            )
-            self.ballinstance.trade_player = self.ballinstance.player
+            giver = self.ballinstance.player
+            async with in_transaction() as connection:
+                trade = await Trade.create(player1=giver, player2=player, using_db=connection)
+                await TradeObject.create(
+                    trade=trade, player=giver, ballinstance=self.ballinstance, using_db=connection
+                )
+                await BallInstance.filter(pk=self.ballinstance.pk).using_db(connection).update(
+                    player=player, trade_player=giver, locked=None
+                )
+                await PlayerStats.record(
+                    giver.pk, removed=(self.ballinstance,), trade=trade, using_db=connection
+                )
+                await PlayerStats.record(
+                    player.pk, added=(self.ballinstance,), trade=trade, using_db=connection
+                )
+            giver_id = giver.pk
+            self.ballinstance.trade_player = giver
             self.ballinstance.player = player
-            self.ballinstance.locked = None  # type: ignore
-            await self.ballinstance.save(update_fields=("player", "trade_player", "locked"))
+            lock_manager.discard((self.ballinstance,))
+            inventories.move((self.ballinstance,), giver_id, player.pk)
             return self.ballinstance, is_new
 
         # stat may vary by +/- 20% of base stat
@@ -348,50 +358,26 @@ class BallSpawnView(View):
         )
 
         # check if we can spawn cards with a special background
-        special = self.special
-        population = [
-            x
-            for x in specials.values()
-            # handle null start/end dates with infinity times
-            if (x.start_date or datetime.min.replace(tzinfo=get_default_timezone()))
-            <= tortoise_now()
-            <= (x.end_date or datetime.max.replace(tzinfo=get_default_timezone()))
-        ]
-        if not special and population:
-            # Here we try to determine what should be the chance of having a common card
-            # since the rarity field is a value between 0 and 1, 1 being no common
-            # and 0 only common, we get the remaining value by doing (1-rarity)
-            # We then sum each value for each current event, and we should get an algorithm
-            # that kinda makes sense.
-            common_weight = sum(1 - x.rarity for x in population)
-
-            weights = [x.rarity for x in population] + [common_weight]
-            # None is added representing the common countryball
-            special = random.choices(population=population + [None], weights=weights, k=1)[0]
-
-        ball = await BallInstance.create(
-            ball=self.model,
-            player=player,
-            special=special,
-            attack_bonus=bonus_attack,
-            health_bonus=bonus_health,
+        # the sampler only contains running events, None representing the common countryball
+        special = self.special or samplers.specials.draw()
+
+        guild_size = 0
+        if isinstance(user, discord.Member) and user.guild.member_count:
+            # observe the size of the server, rounded to the nearest power of 10
+            guild_size = 10 ** math.ceil(math.log(max(user.guild.member_count - 1, 1), 10))
+        (ball,) = await BallInstance.bulk_grant(
+            player,
+            [(self.model, special, (bonus_attack, bonus_health))],
             server_id=guild.id if guild else None,
             spawned_time=self.message.created_at,
+            source=self.algo,
+            guild_size=guild_size,
         )
 
-        # logging and stats
         log.log(
             logging.INFO if user.id in self.bot.catch_log else logging.DEBUG,
             f"{user} caught {settings.collectible_name} {self.model}, {special=}",
         )
-        if isinstance(user, discord.Member) and user.guild.member_count:
-            caught_balls.labels(
-                country=self.name,
-                special=special,
-                # observe the size of the server, rounded to the nearest power of 10
-                guild_size=10 ** math.ceil(math.log(max(user.guild.member_count - 1, 1), 10)),
-                spawn_algo=self.algo,
-            ).inc()
 
         return ball, is_new
 
@@ -1,11 +1,12 @@
 import asyncio
 import logging
 import random
+import struct
 from abc import abstractmethod
-from collections import deque, namedtuple
+from array import array
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import TYPE_CHECKING, Literal
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Collection, Literal
 
 import discord
 from discord.utils import format_dt
@@ -18,8 +19,19 @@ if TYPE_CHECKING:
 log = logging.getLogger("ballsdex.packages.countryballs")
 
 SPAWN_CHANCE_RANGE = (40, 55)
+# minimum number of seconds between two messages increasing the count of a guild
+INCREASE_COOLDOWN = 10
+# number of recent messages considered for the chatter penalties
+MESSAGE_WINDOW_SIZE = 100
 
-CachedMessage = namedtuple("CachedMessage", ["content", "author_id"])
+# snapshot format of SpawnManager, bump when changing the layouts below
+SNAPSHOT_VERSION = 1
+# guild ID, time, scaled message count, threshold, next increase
+COOLDOWN_STATE = struct.Struct("<QddHd")
+# number of messages, number of distinct authors
+WINDOW_STATE = struct.Struct("<HH")
+# guilds serialized between two yields to the event loop
+SNAPSHOT_CHUNK_SIZE = 1000
 
 
 class BaseSpawnManager:
@@ -75,8 +87,166 @@ class BaseSpawnManager:
         """
         raise NotImplementedError
 
+    async def snapshot(
+        self, shard_ids: Collection[int], shard_of: Callable[[int], int]
+    ) -> dict[int, bytes] | None:
+        """
+        Serialize the state of the guilds of some shards, each to be given back to `restore`
+        after a restart.
+
+        This runs on the event loop while messages are handled, large states should be
+        serialized in chunks, yielding to the loop between them.
+
+        The default implementation has no state to save and returns `None`.
+
+        Parameters
+        ----------
+        shard_ids: Collection[int]
+            The shards to serialize, each one must be in the result even without any guild.
+        shard_of: Callable[[int], int]
+            Returns the shard of the guild with the given ID.
+
+        Returns
+        -------
+        dict[int, bytes] | None
+            The serialized state of each shard, or `None` if this manager doesn't support
+            snapshots.
+        """
+        return None
+
+    def restore(self, data: bytes, owned: Callable[[int], bool]) -> int:
+        """
+        Restore a state serialized by `snapshot` with the same manager class.
+
+        Parameters
+        ----------
+        data: bytes
+            The serialized state.
+        owned: Callable[[int], bool]
+            Returns whether the guild with the given ID must be restored, the snapshot may
+            contain guilds handled by another process.
+
+        Returns
+        -------
+        int
+            The number of guilds restored.
+        """
+        return 0
+
+
+class MessageWindow:
+    """
+    Ring buffer of the authors of the most recent messages in a guild, with running counters
+    updated in constant time when a message is pushed and the oldest one evicted.
+
+    Only the author ID and whether the message is short are kept, in fixed size arrays, so
+    that the memory used per guild is bounded.
+
+    Attributes
+    ----------
+    maxlen: int
+        Number of messages kept.
+    counts: dict[int, int]
+        Number of messages in the window for each author present.
+    short_count: int
+        Number of messages in the window shorter than 5 characters.
+    """
+
+    __slots__ = ("maxlen", "authors", "short", "counts", "short_count", "head", "size")
+
+    def __init__(self, maxlen: int = MESSAGE_WINDOW_SIZE):
+        self.maxlen = maxlen
+        self.authors = array("Q", bytes(8 * maxlen))
+        self.short = bytearray(maxlen)
+        self.counts: dict[int, int] = {}
+        self.short_count = 0
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def push(self, author_id: int, short: bool):
+        """
+        Record a new message, evicting the oldest one if the window is full.
+        """
+        head = self.head
+        if self.size == self.maxlen:
+            evicted = self.authors[head]
+            if (count := self.counts[evicted] - 1) > 0:
+                self.counts[evicted] = count
+            else:
+                del self.counts[evicted]
+            self.short_count -= self.short[head]
+        else:
+            self.size += 1
+        self.authors[head] = author_id
+        self.short[head] = short
+        self.short_count += short
+        self.counts[author_id] = self.counts.get(author_id, 0) + 1
+        self.head = (head + 1) % self.maxlen
+
+    @property
+    def distinct_authors(self) -> int:
+        return len(self.counts)
+
+    def share(self, author_id: int) -> float:
+        """
+        Return the share of the window, full size, taken by the messages of an author.
+        """
+        return self.counts.get(author_id, 0) / self.maxlen
+
+    def major_chatter(self) -> bool:
+        """
+        Whether an author has more than 40% of the messages of the window.
+        """
+        return any(count / self.maxlen > 0.4 for count in self.counts.values())
+
+    def pack(self) -> bytes:
+        """
+        Serialize the window, oldest message first. Authors are stored once, each message
+        being an index in the list of authors, followed by a bitmask of the short messages.
+        """
+        authors = list(self.counts)
+        indexes = {author_id: i for i, author_id in enumerate(authors)}
+        order = [(self.head - self.size + i) % self.maxlen for i in range(self.size)]
+        short = 0
+        for i, slot in enumerate(order):
+            short |= self.short[slot] << i
+        index_format = "B" if len(authors) <= 0x100 else "H"
+        return b"".join(
+            (
+                WINDOW_STATE.pack(self.size, len(authors)),
+                struct.pack(f"<{len(authors)}Q", *authors),
+                struct.pack(
+                    f"<{self.size}{index_format}", *(indexes[self.authors[x]] for x in order)
+                ),
+                short.to_bytes((self.size + 7) // 8, "little"),
+            )
+        )
 
-@dataclass
+    @classmethod
+    def unpack(cls, data: bytes, offset: int = 0) -> "tuple[MessageWindow, int]":
+        """
+        Rebuild a window serialized by `pack`, returning it with the offset following it.
+        """
+        size, count = WINDOW_STATE.unpack_from(data, offset)
+        offset += WINDOW_STATE.size
+        authors = struct.unpack_from(f"<{count}Q", data, offset)
+        offset += 8 * count
+        index_format = "B" if count <= 0x100 else "H"
+        indexes = struct.unpack_from(f"<{size}{index_format}", data, offset)
+        offset += struct.calcsize(f"<{size}{index_format}")
+        short = int.from_bytes(data[offset : offset + (size + 7) // 8], "little")
+        offset += (size + 7) // 8
+
+        window = cls()
+        for i, index in enumerate(indexes):
+            window.push(authors[index], bool(short >> i & 1))
+        return window, offset
+
+
+@dataclass(slots=True)
 class SpawnCooldown:
     """
     Represents the default spawn internal system per guild. Contains the counters that will
@@ -92,54 +262,82 @@ class SpawnCooldown:
     threshold: int
         The number `scaled_message_count` has to reach for spawn.
         Determined randomly with `SPAWN_CHANCE_RANGE`
-    lock: asyncio.Lock
-        Used to ratelimit messages and ignore fast spam
-    message_cache: ~collections.deque[CachedMessage]
-        A list of recent messages used to reduce the spawn chance when too few different chatters
-        are present. Limited to the 100 most recent messages in the guild.
+    next_increase: float
+        Timestamp before which messages don't increase the count, used to ratelimit messages and
+        ignore fast spam.
+    message_cache: MessageWindow
+        The authors of the recent messages, used to reduce the spawn chance when too few
+        different chatters are present. Limited to the 100 most recent messages in the guild.
     """
 
     time: datetime
     # initialize partially started, to reduce the dead time after starting the bot
     scaled_message_count: float = field(default=SPAWN_CHANCE_RANGE[0] // 2)
     threshold: int = field(default_factory=lambda: random.randint(*SPAWN_CHANCE_RANGE))
-    lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
-    message_cache: deque[CachedMessage] = field(default_factory=lambda: deque(maxlen=100))
+    next_increase: float = field(default=0.0, init=False)
+    message_cache: MessageWindow = field(default_factory=MessageWindow)
 
     def reset(self, time: datetime):
         self.scaled_message_count = 1.0
         self.threshold = random.randint(*SPAWN_CHANCE_RANGE)
-        try:
-            self.lock.release()
-        except RuntimeError:  # lock is not acquired
-            pass
         self.time = time
 
-    async def increase(self, message: discord.Message) -> bool:
-        # this is a deque, not a list
-        # its property is that, once the max length is reached (100 for us),
-        # the oldest element is removed, thus we only have the last 100 messages in memory
-        self.message_cache.append(
-            CachedMessage(content=message.content, author_id=message.author.id)
+    def pack(self, guild_id: int) -> bytes:
+        return (
+            COOLDOWN_STATE.pack(
+                guild_id,
+                self.time.timestamp(),
+                self.scaled_message_count,
+                self.threshold,
+                self.next_increase,
+            )
+            + self.message_cache.pack()
         )
 
-        if self.lock.locked():
-            return False
+    @classmethod
+    def unpack(cls, data: bytes, offset: int = 0) -> "tuple[int, SpawnCooldown, int]":
+        """
+        Rebuild a cooldown serialized by `pack`, returning the guild ID, the cooldown and the
+        offset following it.
+        """
+        guild_id, time, count, threshold, next_increase = COOLDOWN_STATE.unpack_from(data, offset)
+        window, offset = MessageWindow.unpack(data, offset + COOLDOWN_STATE.size)
+        cooldown = cls(
+            datetime.fromtimestamp(time, timezone.utc),
+            scaled_message_count=count,
+            threshold=threshold,
+            message_cache=window,
+        )
+        cooldown.next_increase = next_increase
+        return guild_id, cooldown, offset
 
-        async with self.lock:
-            message_multiplier = 1
-            if message.guild.member_count < 5 or message.guild.member_count > 1000:  # type: ignore
-                message_multiplier /= 2
-            if message._state.intents.message_content and len(message.content) < 5:
-                message_multiplier /= 2
-            if len(set(x.author_id for x in self.message_cache)) < 4 or (
-                len(list(filter(lambda x: x.author_id == message.author.id, self.message_cache)))
-                / self.message_cache.maxlen  # type: ignore
-                > 0.4
-            ):
-                message_multiplier /= 2
-            self.scaled_message_count += message_multiplier
-            await asyncio.sleep(10)
+    def on_cooldown(self, time: datetime) -> bool:
+        return time.timestamp() < self.next_increase
+
+    def increase(self, message: discord.Message, time: datetime) -> bool:
+        """
+        Record a message and increase the count, unless the previous increase happened less
+        than `INCREASE_COOLDOWN` seconds before ``time``.
+        """
+        short = message._state.intents.message_content and len(message.content) < 5
+        self.message_cache.push(message.author.id, short)
+
+        timestamp = time.timestamp()
+        if timestamp < self.next_increase:
+            return False
+        self.next_increase = timestamp + INCREASE_COOLDOWN
+
+        message_multiplier = 1
+        if message.guild.member_count < 5 or message.guild.member_count > 1000:  # type: ignore
+            message_multiplier /= 2
+        if short:
+            message_multiplier /= 2
+        if (
+            self.message_cache.distinct_authors < 4
+            or self.message_cache.share(message.author.id) > 0.4
+        ):
+            message_multiplier /= 2
+        self.scaled_message_count += message_multiplier
         return True
 
 
@@ -148,17 +346,45 @@ class SpawnManager(BaseSpawnManager):
         super().__init__(bot)
         self.cooldowns: dict[int, SpawnCooldown] = {}
 
+    async def snapshot(
+        self, shard_ids: Collection[int], shard_of: Callable[[int], int]
+    ) -> dict[int, bytes]:
+        shards: dict[int, list[bytes]] = {x: [bytes((SNAPSHOT_VERSION,))] for x in shard_ids}
+        # guilds are added while yielding, iterate over a copy
+        cooldowns = list(self.cooldowns.items())
+        for start in range(0, len(cooldowns), SNAPSHOT_CHUNK_SIZE):
+            for guild_id, cooldown in cooldowns[start : start + SNAPSHOT_CHUNK_SIZE]:
+                if (chunks := shards.get(shard_of(guild_id))) is not None:
+                    chunks.append(cooldown.pack(guild_id))
+            await asyncio.sleep(0)
+        return {shard_id: b"".join(chunks) for shard_id, chunks in shards.items()}
+
+    def restore(self, data: bytes, owned: Callable[[int], bool]) -> int:
+        if not data or data[0] != SNAPSHOT_VERSION:
+            log.warning("Ignoring spawn state saved in an unsupported format")
+            return 0
+        restored = 0
+        offset = 1
+        while offset < len(data):
+            guild_id, cooldown, offset = SpawnCooldown.unpack(data, offset)
+            # guilds which already received messages since the start are more up to date
+            if owned(guild_id) and guild_id not in self.cooldowns:
+                self.cooldowns[guild_id] = cooldown
+                restored += 1
+        return restored
+
     async def handle_message(self, message: discord.Message) -> bool:
         guild = message.guild
         if not guild:
             return False
 
+        now = message.created_at
         cooldown = self.cooldowns.get(guild.id, None)
         if not cooldown:
-            cooldown = SpawnCooldown(message.created_at)
+            cooldown = SpawnCooldown(now)
             self.cooldowns[guild.id] = cooldown
 
-        delta_t = (message.created_at - cooldown.time).total_seconds()
+        delta_t = (now - cooldown.time).total_seconds()
         # change how the threshold varies according to the member count, while nuking farm servers
         if not guild.member_count:
             return False
@@ -172,7 +398,7 @@ class SpawnManager(BaseSpawnManager):
             time_multiplier = 0.2
 
         # manager cannot be increased more than once per 10 seconds
-        if not await cooldown.increase(message):
+        if not cooldown.increase(message, now):
             return False
 
         # normal increase, need to reach goal
@@ -227,20 +453,12 @@ class SpawnManager(BaseSpawnManager):
         penalities: list[str] = []
         if guild.member_count < 5 or guild.member_count > 1000:
             penalities.append("Server has less than 5 or more than 1000 members")
-        if any(len(x.content) < 5 for x in cooldown.message_cache):
+        if cooldown.message_cache.short_count:
             penalities.append("Some cached messages are less than 5 characters long")
 
-        authors_set = set(x.author_id for x in cooldown.message_cache)
-        low_chatters = len(authors_set) < 4
+        low_chatters = cooldown.message_cache.distinct_authors < 4
         # check if one author has more than 40% of messages in cache
-        major_chatter = any(
-            (
-                len(list(filter(lambda x: x.author_id == author, cooldown.message_cache)))
-                / cooldown.message_cache.maxlen  # type: ignore
-                > 0.4
-            )
-            for author in authors_set
-        )
+        major_chatter = cooldown.message_cache.major_chatter()
         # this mess is needed since either conditions make up to a single penality
         if low_chatters:
             if not major_chatter:
@@ -275,7 +493,7 @@ class SpawnManager(BaseSpawnManager):
         )
 
         informations: list[str] = []
-        if cooldown.lock.locked():
+        if cooldown.on_cooldown(interaction.created_at):
             informations.append("The manager is currently on cooldown.")
         if delta < 600:
             informations.append(
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import logging
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    import discord
+
+log = logging.getLogger("ballsdex.packages.countryballs.trace")
+
+__all__ = ("TraceRecorder", "read_trace")
+
+MAGIC = b"BDSPAWN"
+VERSION = 1
+# magic, version, flags (bit 0: message content intent enabled)
+HEADER = struct.Struct("<7sBB")
+# timestamp, guild ID, author ID, member count, content length
+RECORD = struct.Struct("<dQQIH")
+
+
+class TraceRecorder:
+    """
+    Appends the messages handled by the spawn manager to a binary trace file, for replaying
+    them offline with ``python -m ballsdex.spawnsim``.
+
+    Each message takes 30 bytes, only the fields read by the spawn managers are kept: time,
+    guild ID and member count, author ID and content length.
+
+    Parameters
+    ----------
+    path: Path
+        The trace file, created if needed. Records are appended to an existing trace.
+    message_content: bool
+        Whether the message content intent is enabled, without it the content length is always 0.
+    """
+
+    def __init__(self, path: Path, message_content: bool):
+        self.path = path
+        new = not path.exists() or path.stat().st_size == 0
+        self.file = path.open("ab", buffering=1 << 16)
+        if new:
+            self.file.write(HEADER.pack(MAGIC, VERSION, int(message_content)))
+        log.info(f"Recording spawn trace to {path}")
+
+    def record(self, message: "discord.Message"):
+        assert message.guild
+        self.file.write(
+            RECORD.pack(
+                message.created_at.timestamp(),
+                message.guild.id,
+                message.author.id,
+                message.guild.member_count or 0,
+                min(len(message.content), 0xFFFF),
+            )
+        )
+
+    def close(self):
+        self.file.close()
+
+
+def read_trace(path: Path, batch_size: int = 10000) -> Iterator[list[SimpleNamespace]]:
+    """
+    Read a trace written by `TraceRecorder`, yielding by batches message-like objects with
+    the attributes read by the spawn managers.
+
+    Raises
+    ------
+    ValueError
+        The file is not a spawn trace.
+    """
+    with path.open("rb") as file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a spawn trace")
+        magic, version, flags = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a spawn trace, or of an unsupported version")
+
+        state = SimpleNamespace(intents=SimpleNamespace(message_content=bool(flags & 1)))
+        guilds: dict[int, SimpleNamespace] = {}
+        contents: dict[int, str] = {}
+        while chunk := file.read(RECORD.size * batch_size):
+            # ignore a record truncated by an interrupted recording
+            chunk = chunk[: len(chunk) - len(chunk) % RECORD.size]
+            batch: list[SimpleNamespace] = []
+            for timestamp, guild_id, author_id, member_count, length in RECORD.iter_unpack(chunk):
+                guild = guilds.get(guild_id)
+                if guild is None or guild.member_count != member_count:
+                    guild = SimpleNamespace(id=guild_id, member_count=member_count)
+                    guilds[guild_id] = guild
+                if (content := contents.get(length)) is None:
+                    content = contents[length] = "x" * length
+                batch.append(
+                    SimpleNamespace(
+                        guild=guild,
+                        author=SimpleNamespace(id=author_id),
+                        content=content,
+                        created_at=datetime.fromtimestamp(timestamp, timezone.utc),
+                        _state=state,
+                    )
+                )
+            yield batch
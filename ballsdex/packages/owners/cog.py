@@ -27,6 +27,7 @@ from ballsdex.core.models import (
 )
 from ballsdex.settings import settings
 from ballsdex.core.bot import BallsDexBot
+from ballsdex.core.utils.inventory import inventories
 import ballsdex.packages.config.components as Components
 from collections import defaultdict
 
@@ -58,7 +59,7 @@ class Owners(commands.GroupCog, name="owners"):
         super().__init__()
 
     async def get_random_ball(self, player: Player) -> Ball | None:
-        owned_ids = await BallInstance.filter(player=player).values_list("ball_id", flat=True)
+        owned_ids = (await inventories.get(player)).owned()
         all_balls = await Ball.filter(rarity__gte=0.5, rarity__lte=30.0).all()
 
         if not all_balls:
@@ -85,7 +86,7 @@ class Owners(commands.GroupCog, name="owners"):
         return random.choice(choices)
 
     async def getdasigmaballmate(self, player: Player) -> Ball | None:
-        owned_ids = await BallInstance.filter(player=player).values_list("ball_id", flat=True)
+        owned_ids = (await inventories.get(player)).owned()
         all_balls = await Ball.filter(rarity__gte=0.05, rarity__lte=5.0).all() # same with the get_random_balls
 
         if not all_balls:
@@ -128,11 +129,10 @@ class Owners(commands.GroupCog, name="owners"):
             await interaction.response.send_message("No balls are available.", ephemeral=True)
             return
 
-        instance = await BallInstance.create(
-            ball=ball,
-            player=player,
-            attack_bonus=random.randint(-20, 20),
-            health_bonus=random.randint(-20, 20),
+        (instance,) = await BallInstance.bulk_grant(
+            player,
+            [(ball, None, (random.randint(-20, 20), random.randint(-20, 20)))],
+            source="daily",
         )
 
         emoji = self.bot.get_emoji(ball.emoji_id)
@@ -152,7 +152,7 @@ class Owners(commands.GroupCog, name="owners"):
             value=f"``💖 {instance.attack_bonus}`` ``⚽ {instance.health_bonus}``"
         )
 
-        content, file, view = await instance.prepare_for_message(interaction)
+        content, file, view = await instance.prepare_for_message(interaction, site="pack")
         embed.set_image(url="attachment://" + file.filename)
         embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
         embed.set_footer(text="Come back in 24 hours for your next claim!")
@@ -173,7 +173,7 @@ class Owners(commands.GroupCog, name="owners"):
         await interaction.response.defer()
 
         player, _ = await Player.get_or_create(discord_id=user_id)
-        claimed_instances = []
+        drawn = []
 
         for _ in range(amount):
             ball = None
@@ -190,14 +190,14 @@ class Owners(commands.GroupCog, name="owners"):
             
             if not ball:
                 continue
+            drawn.append(ball)
 
-            instance = await BallInstance.create(
-                ball=ball,
-                player=player,
-                attack_bonus=random.randint(-20, 20),
-                health_bonus=random.randint(-20, 20),
-            )
-            claimed_instances.append((ball, instance))
+        instances = await BallInstance.bulk_grant(
+            player,
+            [(ball, None, (random.randint(-20, 20), random.randint(-20, 20))) for ball in drawn],
+            source="weekly",
+        )
+        claimed_instances = list(zip(drawn, instances))
 
         if not claimed_instances:
             await interaction.followup.send("No footballers are available.", ephemeral=True)
@@ -244,20 +244,18 @@ class Owners(commands.GroupCog, name="owners"):
         await interaction.response.defer()
 
         player, _ = await Player.get_or_create(discord_id=user_id)
-        claimed_instances = []
-
+        drawn = []
         for _ in range(amount):
             ball = await self.getdasigmaballmate(player)
-            if not ball:
-                continue
+            if ball:
+                drawn.append(ball)
 
-            instance = await BallInstance.create(
-                ball=ball,
-                player=player,
-                attack_bonus=random.randint(-20, 20),
-                health_bonus=random.randint(-20, 20),
-            )
-            claimed_instances.append((ball, instance))
+        instances = await BallInstance.bulk_grant(
+            player,
+            [(ball, None, (random.randint(-20, 20), random.randint(-20, 20))) for ball in drawn],
+            source="weekly",
+        )
+        claimed_instances = list(zip(drawn, instances))
 
         if not claimed_instances:
             await interaction.followup.send("No footballers are available.", ephemeral=True)
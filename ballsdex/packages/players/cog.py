@@ -1,5 +1,3 @@
-import zipfile
-from io import BytesIO
 from typing import TYPE_CHECKING
 
 import discord
@@ -10,23 +8,32 @@ from tortoise.exceptions import DoesNotExist
 from tortoise.expressions import Q
 
 from ballsdex.core.models import (
-    BallInstance,
     Block,
     DonationPolicy,
     FriendPolicy,
     Friendship,
     MentionPolicy,
+    PlayerStats,
 )
 from ballsdex.core.models import Player as PlayerModel
-from ballsdex.core.models import PrivacyPolicy, Trade, TradeObject, balls
+from ballsdex.core.models import PrivacyPolicy
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.completion import completion_engine
 from ballsdex.core.utils.enums import (
     DONATION_POLICY_MAP,
     FRIEND_POLICY_MAP,
     MENTION_POLICY_MAP,
     PRIVATE_POLICY_MAP,
 )
+from ballsdex.core.utils.inventory import inventories
 from ballsdex.core.utils.paginator import FieldPageSource, Pages
+from ballsdex.packages.players.export import (
+    ITEMS_HEADER,
+    TRADES_HEADER,
+    ExportArchive,
+    iter_items,
+    iter_trades,
+)
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -516,44 +523,15 @@ class Player(commands.GroupCog):
         """
         await interaction.response.defer(thinking=True, ephemeral=True)
         try:
-            player = await PlayerModel.get(discord_id=interaction.user.id).prefetch_related(
-                "balls"
-            )
+            player = await PlayerModel.get(discord_id=interaction.user.id)
         except DoesNotExist:
             await interaction.followup.send("You haven't got any info to show!", ephemeral=True)
             return
-        ball = await BallInstance.filter(player=player).prefetch_related("special", "trade_player")
+        stats = await PlayerStats.fetch(player)
 
         user = interaction.user
-        bot_countryballs = {x: y.emoji_id for x, y in balls.items() if y.enabled}
-        total_countryballs = len(bot_countryballs)
-        owned_countryballs = set(
-            x[0]
-            for x in await player.balls.filter(ball__enabled=True)
-            .distinct()
-            .values_list("ball_id")
-        )
-
-        if total_countryballs > 0:
-            completion_percentage = (
-                f"{round(len(owned_countryballs) / total_countryballs * 100, 1)}%"
-            )
-        else:
-            completion_percentage = "0.0%"
-
-        caught_owned = [x for x in ball if x.trade_player is None]
-        balls_owned = [x for x in ball]
-        special = [x for x in ball if x.special is not None]
-        trades = await Trade.filter(
-            Q(player1__discord_id=interaction.user.id) | Q(player2__discord_id=interaction.user.id)
-        ).values_list("player1__discord_id", "player2__discord_id")
-
-        trade_partners = set()
-        for p1, p2 in trades:
-            if p1 != interaction.user.id:
-                trade_partners.add(p1)
-            if p2 != interaction.user.id:
-                trade_partners.add(p2)
+        owned_mask = completion_engine.mask((await inventories.get(player)).owned())
+        completion_percentage = f"{completion_engine.completion(owned_mask).percentage}%"
 
         friends = await Friendship.filter(
             Q(player1__discord_id=interaction.user.id) | Q(player2__discord_id=interaction.user.id)
@@ -575,11 +553,11 @@ class Player(commands.GroupCog):
             f"**Amount of Blocked Users:** {blocks}\n"
             "## Player Stats\n"
             f"**Completion:** {completion_percentage}\n"
-            f"**{settings.collectible_name.title()}s Owned:** {len(balls_owned):,}\n"
-            f"**Caught {settings.collectible_name.title()}s Owned**: {len(caught_owned):,}\n"
-            f"**Special {settings.collectible_name.title()}s:** {len(special):,}\n"
-            f"**Trades Completed:** {len(trades):,}\n"
-            f"**Amount of Users Traded With:** {len(trade_partners):,}"
+            f"**{settings.collectible_name.title()}s Owned:** {stats.owned:,}\n"
+            f"**Caught {settings.collectible_name.title()}s Owned**: {stats.caught:,}\n"
+            f"**Special {settings.collectible_name.title()}s:** {stats.specials:,}\n"
+            f"**Trades Completed:** {stats.trades:,}\n"
+            f"**Amount of Users Traded With:** {stats.trade_partners:,}"
         )
         embed.set_footer(text="Keep collecting and trading to improve your stats!")
         embed.set_thumbnail(url=user.display_avatar)  # type: ignore
@@ -603,96 +581,39 @@ class Player(commands.GroupCog):
                 "You don't have any player data to export.", ephemeral=True
             )
             return
-        await interaction.response.defer()
-        files = []
-        if type == "balls":
-            data = await get_items_csv(player)
-            filename = f"{interaction.user.id}_{settings.collectible_name}.csv"
-            data.filename = filename  # type: ignore
-            files.append(data)
-        elif type == "trades":
-            data = await get_trades_csv(player)
-            filename = f"{interaction.user.id}_trades.csv"
-            data.filename = filename  # type: ignore
-            files.append(data)
-        elif type == "all":
-            balls = await get_items_csv(player)
-            trades = await get_trades_csv(player)
-            balls_filename = f"{interaction.user.id}_{settings.collectible_name}.csv"
-            trades_filename = f"{interaction.user.id}_trades.csv"
-            balls.filename = balls_filename  # type: ignore
-            trades.filename = trades_filename  # type: ignore
-            files.append(balls)
-            files.append(trades)
-        else:
-            await interaction.followup.send("Invalid input!", ephemeral=True)
-            return
-        zip_file = BytesIO()
-        with zipfile.ZipFile(zip_file, "w") as z:
-            for file in files:
-                z.writestr(file.filename, file.getvalue())
-        zip_file.seek(0)
-        if zip_file.tell() > 25_000_000:
-            await interaction.followup.send(
-                "Your data is too large to export."
-                "Please contact the bot support for more information.",
-                ephemeral=True,
-            )
+        if type not in ("balls", "trades", "all"):
+            await interaction.response.send_message("Invalid input!", ephemeral=True)
             return
-        files = [discord.File(zip_file, "player_data.zip")]
+        await interaction.response.defer()
+
+        async def send(file: discord.File):
+            if archive.parts == 1:
+                await interaction.user.send("Here is your player data:", file=file)
+            else:
+                await interaction.user.send(
+                    f"Part {archive.parts} of your player data:", file=file
+                )
+
+        # archives are sent as soon as they reach the size limit, memory use doesn't depend on
+        # the size of the inventory
+        archive = ExportArchive("player_data", send)
         try:
-            await interaction.user.send("Here is your player data:", files=files)
-            await interaction.followup.send(
-                "Your player data has been sent via DMs.", ephemeral=True
-            )
+            if type in ("balls", "all"):
+                await archive.open(
+                    f"{interaction.user.id}_{settings.collectible_name}.csv", ITEMS_HEADER
+                )
+                async for rows in iter_items(player):
+                    await archive.write_rows(rows)
+            if type in ("trades", "all"):
+                await archive.open(f"{interaction.user.id}_trades.csv", TRADES_HEADER)
+                async for rows in iter_trades(player):
+                    await archive.write_rows(rows)
+            await archive.close()
         except discord.Forbidden:
             await interaction.followup.send(
                 "I couldn't send the player data to you in DM. "
                 "Either you blocked me or you disabled DMs in this server.",
                 ephemeral=True,
             )
-
-
-async def get_items_csv(player: PlayerModel) -> BytesIO:
-    """
-    Get a CSV file with all items of the player.
-    """
-    balls = await BallInstance.filter(player=player).prefetch_related(
-        "ball", "trade_player", "special"
-    )
-    txt = (
-        f"id,hex id,{settings.collectible_name},catch date,trade_player"
-        ",special,attack,attack bonus,hp,hp_bonus\n"
-    )
-    for ball in balls:
-        txt += (
-            f"{ball.id},{ball.id:0X},{ball.ball.country},{ball.catch_date},"  # type: ignore
-            f"{ball.trade_player.discord_id if ball.trade_player else 'None'},{ball.special},"
-            f"{ball.attack},{ball.attack_bonus},{ball.health},{ball.health_bonus}\n"
-        )
-    return BytesIO(txt.encode("utf-8"))
-
-
-async def get_trades_csv(player: PlayerModel) -> BytesIO:
-    """
-    Get a CSV file with all trades of the player.
-    """
-    trade_history = (
-        await Trade.filter(Q(player1=player) | Q(player2=player))
-        .order_by("date")
-        .prefetch_related("player1", "player2")
-    )
-    txt = "id,date,player1,player2,player1 received,player2 received\n"
-    for trade in trade_history:
-        player1_items = await TradeObject.filter(
-            trade=trade, player=trade.player1
-        ).prefetch_related("ballinstance")
-        player2_items = await TradeObject.filter(
-            trade=trade, player=trade.player2
-        ).prefetch_related("ballinstance")
-        txt += (
-            f"{trade.id},{trade.date},{trade.player1.discord_id},{trade.player2.discord_id},"
-            f"{','.join([i.ballinstance.to_string() for i in player2_items])},"  # type: ignore
-            f"{','.join([i.ballinstance.to_string() for i in player1_items])}\n"  # type: ignore
-        )
-    return BytesIO(txt.encode("utf-8"))
+            return
+        await interaction.followup.send("Your player data has been sent via DMs.", ephemeral=True)
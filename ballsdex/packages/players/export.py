@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import zipfile
+from collections import defaultdict
+from typing import IO, AsyncIterator, Awaitable, Callable, Sequence
+
+import discord
+from tortoise.expressions import Q
+
+from ballsdex.core.models import BallInstance, Player, Trade, TradeObject, balls, specials
+from ballsdex.settings import settings
+
+__all__ = (
+    "EXPORT_CHUNK_SIZE",
+    "EXPORT_PART_SIZE",
+    "ITEMS_HEADER",
+    "TRADES_HEADER",
+    "ExportArchive",
+    "iter_items",
+    "iter_trades",
+)
+
+# number of rows fetched by each query
+EXPORT_CHUNK_SIZE = 1000
+# size after which an archive is sent and a new one is started, leaving room under the
+# attachment limit for the data still buffered by the compressor and the zip trailer
+EXPORT_PART_SIZE = 8_000_000
+
+ITEMS_HEADER = (
+    "id",
+    "hex id",
+    settings.collectible_name,
+    "catch date",
+    "trade_player",
+    "special",
+    "attack",
+    "attack bonus",
+    "hp",
+    "hp_bonus",
+)
+TRADES_HEADER = ("id", "date", "player1", "player2", "player1 received", "player2 received")
+
+
+def encode_rows(rows: Sequence[Sequence[object]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+class ExportArchive:
+    """
+    Writes CSV files into zip archives as rows come, without holding the files in memory.
+
+    When the compressed size of the current archive reaches ``part_size``, it is closed and
+    handed to ``send`` before starting the next one, the CSV file being written continues in
+    the new archive with its header repeated. Compression runs in a thread.
+
+    Parameters
+    ----------
+    name: str
+        Name of the archives, without the extension. Parts after the first one are suffixed
+        with their number.
+    send: Callable[[discord.File], Awaitable[None]]
+        Coroutine function called with each complete archive.
+    part_size: int
+        Compressed size after which a new archive is started.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[discord.File], Awaitable[None]],
+        part_size: int = EXPORT_PART_SIZE,
+    ):
+        self.name = name
+        self.send = send
+        self.part_size = part_size
+        self.parts = 0
+        self._buffer: io.BytesIO | None = None
+        self._zip: zipfile.ZipFile | None = None
+        self._entry: IO[bytes] | None = None
+        self._filename: str | None = None
+        self._header: Sequence[str] = ()
+
+    def _write(self, data: bytes):
+        if self._zip is None:
+            self._buffer = io.BytesIO()
+            self._zip = zipfile.ZipFile(self._buffer, "w", zipfile.ZIP_DEFLATED)
+            self.parts += 1
+        if self._entry is None:
+            assert self._filename
+            self._entry = self._zip.open(self._filename, "w")
+            self._entry.write(encode_rows((self._header,)))
+        self._entry.write(data)
+
+    def _close_entry(self):
+        if self._entry is not None:
+            self._entry.close()
+            self._entry = None
+
+    def _close_part(self) -> io.BytesIO | None:
+        self._close_entry()
+        if self._zip is None:
+            return None
+        self._zip.close()
+        self._zip = None
+        buffer, self._buffer = self._buffer, None
+        return buffer
+
+    async def _flush_part(self):
+        buffer = await asyncio.to_thread(self._close_part)
+        if buffer is None:
+            return
+        buffer.seek(0)
+        suffix = f"_{self.parts}" if self.parts > 1 else ""
+        await self.send(discord.File(buffer, f"{self.name}{suffix}.zip"))
+
+    async def open(self, filename: str, header: Sequence[str]):
+        """
+        Start a new CSV file in the archive.
+        """
+        await asyncio.to_thread(self._close_entry)
+        self._filename = filename
+        self._header = header
+        await asyncio.to_thread(self._write, b"")
+
+    async def write_rows(self, rows: Sequence[Sequence[object]]):
+        """
+        Append rows to the current CSV file, sending the archive if it reached its size limit.
+        """
+        await asyncio.to_thread(self._write, encode_rows(rows))
+        if self._buffer is not None and self._buffer.tell() >= self.part_size:
+            await self._flush_part()
+
+    async def close(self):
+        """
+        Send the last archive.
+        """
+        await self._flush_part()
+
+
+async def iter_items(player: Player) -> AsyncIterator[list[tuple]]:
+    """
+    Yield the CSV rows of the instances of a player by chunks, using keyset pagination.
+    """
+    last_id = 0
+    while True:
+        rows = (
+            await BallInstance.filter(player=player, id__gt=last_id)
+            .order_by("id")
+            .limit(EXPORT_CHUNK_SIZE)
+            .values_list(
+                "id",
+                "ball_id",
+                "catch_date",
+                "trade_player__discord_id",
+                "special_id",
+                "attack_bonus",
+                "health_bonus",
+            )
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        chunk: list[tuple] = []
+        for pk, ball_id, catch_date, trade_player, special_id, attack_bonus, health_bonus in rows:
+            ball = balls.get(ball_id)
+            special = specials.get(special_id) if special_id else None
+            attack = ball.attack + int(ball.attack * attack_bonus * 0.01) if ball else ""
+            health = ball.health + int(ball.health * health_bonus * 0.01) if ball else ""
+            chunk.append(
+                (
+                    pk,
+                    f"{pk:0X}",
+                    ball.country if ball else ball_id,
+                    catch_date,
+                    trade_player,
+                    special,
+                    attack,
+                    attack_bonus,
+                    health,
+                    health_bonus,
+                )
+            )
+        yield chunk
+
+
+async def iter_trades(player: Player) -> AsyncIterator[list[tuple]]:
+    """
+    Yield the CSV rows of the trades of a player by chunks, using keyset pagination. The
+    objects of each chunk of trades are fetched with a single query.
+    """
+    last_id = 0
+    while True:
+        trades = (
+            await Trade.filter(Q(player1=player) | Q(player2=player), id__gt=last_id)
+            .order_by("id")
+            .limit(EXPORT_CHUNK_SIZE)
+            .values_list("id", "date", "player1_id", "player2_id")
+        )
+        if not trades:
+            return
+        last_id = trades[-1][0]
+        # (trade ID, giver ID) to the descriptions of the given instances
+        given: defaultdict[tuple[int, int], list[str]] = defaultdict(list)
+        objects = await TradeObject.filter(trade_id__in=[x[0] for x in trades]).values_list(
+            "trade_id",
+            "player_id",
+            "ballinstance_id",
+            "ballinstance__ball_id",
+            "ballinstance__special_id",
+        )
+        for trade_id, player_id, pk, ball_id, special_id in objects:
+            instance = BallInstance(id=pk, ball_id=ball_id, special_id=special_id)
+            given[trade_id, player_id].append(instance.to_string(is_trade=True))
+        player_ids = {x for trade in trades for x in trade[2:]}
+        discord_ids = dict(
+            await Player.filter(id__in=player_ids).values_list("id", "discord_id")
+        )
+        yield [
+            (
+                trade_id,
+                date,
+                discord_ids.get(player1_id),
+                discord_ids.get(player2_id),
+                ",".join(given[trade_id, player2_id]),
+                ",".join(given[trade_id, player1_id]),
+            )
+            for trade_id, date, player1_id, player2_id in trades
+        ]
@@ -12,6 +12,7 @@ from ballsdex.core.models import (
     balls,
     BallInstance,
     Player,
+    PlayerStats,
     Trade,
     Special,
 )
@@ -21,6 +22,7 @@ import ballsdex.packages.config.components as Components
 from collections import defaultdict
 from discord.ui import View, button, Button
 from tortoise import fields
+from tortoise.functions import Count
 from tortoise.models import Model
 
 
@@ -113,18 +115,21 @@ class Profiles(commands.GroupCog, name="profile"):
             return await interaction.followup.send("That user does not have a profile yet.", ephemeral=True)
 
         profile = self.get_profile(user.id)
-        data = await BallInstance.filter(player=player)
+        stats = await PlayerStats.fetch(player)
 
         days = 7 
-        data_recent = await BallInstance.filter(
+        # the recent window isn't part of the stats row, only count it grouped per server
+        recent = await BallInstance.filter(
             player=player,
             catch_date__gte=datetime.now() - timedelta(days=days)
-        )
+        ).annotate(count=Count("id")).group_by("server_id").values_list("server_id", "count")
+        recent_count = sum(count for _, count in recent)
+        recent_servers = sum(1 for server_id, _ in recent if server_id)
 
-        special_count = await BallInstance.filter(player=player, special=True).count()
+        special_count = stats.specials
 
         # Determine rank based on total number of balls
-        total_count = len(data)
+        total_count = stats.owned
         if total_count >= 3000:
             rank = "🐐 GOAT"
         elif total_count >= 2000:
@@ -151,17 +156,17 @@ class Profiles(commands.GroupCog, name="profile"):
         )
         embed.add_field(
             name=f"🎉 Footballers Caught ({days}d)",
-            value=str(len(data_recent)),
+            value=str(recent_count),
             inline=True
         )
         embed.add_field(
             name=f"🌍 Servers Caught In ({days}d)",
-            value=len(set(ball.server_id for ball in data_recent if ball.server_id)),
+            value=recent_servers,
             inline=True
         )
         embed.add_field(
             name=f"📈 Total Foootballers Caught",
-            value=str(len(data)),
+            value=str(total_count),
             inline=True
         )
         embed.add_field(
@@ -31,6 +31,8 @@ from ballsdex.core.models import (
 )
 from ballsdex.settings import settings
 from ballsdex.core.bot import BallsDexBot
+from ballsdex.core.utils.inventory import inventories
+from ballsdex.core.utils.locks import lock_manager
 import ballsdex.packages.config.components as Components
 from collections import defaultdict
 from ballsdex.core.image_generator. image_gen import draw_card
@@ -138,6 +140,10 @@ class CoinFlip(commands.GroupCog, name="bet"):
                 await interaction.followup.send("This Bet already has two players.", ephemeral=True)
                 return
 
+            if not await countryball.lock_for_trade():
+                await interaction.followup.send("This footballer is locked in a trade or donation.", ephemeral=True)
+                return
+
             session["players"][user_id] = {"balls": [countryball], "locked": False}
 
             await interaction.followup.send(
@@ -145,6 +151,10 @@ class CoinFlip(commands.GroupCog, name="bet"):
                 ephemeral=False
             )
         else:
+            if not await countryball.lock_for_trade():
+                await interaction.followup.send("This footballer is locked in a trade or donation.", ephemeral=True)
+                return
+
             players = {
                 user_id: {"balls": [countryball], "locked": False}
             }
@@ -189,6 +199,10 @@ class CoinFlip(commands.GroupCog, name="bet"):
             await interaction.followup.send("⚠️ You already added this footballer to the Bet!", ephemeral=True)
             return
 
+        if not await countryball.lock_for_trade():
+            await interaction.followup.send("This footballer is locked in a trade or donation.", ephemeral=True)
+            return
+
         session["players"][user_id]["balls"].append(countryball)
 
 
@@ -267,6 +281,7 @@ class CoinFlip(commands.GroupCog, name="bet"):
         # Optionally notify both players
         players = session["players"]
         del self.coinflip_sessions[channel_id]
+        await lock_manager.release([ball for p in players.values() for ball in p["balls"]])
 
         embed = discord.Embed(
             title="🪙 FootballDex Bet Cancelled",
@@ -329,8 +344,10 @@ class CoinFlip(commands.GroupCog, name="bet"):
                 except (AttributeError, DoesNotExist):
                     pass
 
+                loser_player_id = ball.player_id
                 ball.player = winner_player
                 await ball.save()
+                inventories.move((ball,), loser_player_id, winner_player.pk)
 
             async def ball_name(ball_instance):
                 await ball_instance.fetch_related("ball")
@@ -358,6 +375,7 @@ class CoinFlip(commands.GroupCog, name="bet"):
             await interaction.channel.send(embed=result_embed)
 
             del self.coinflip_sessions[interaction.channel_id]
+            await lock_manager.release(winner_balls + loser_balls)
 
         else:
             await interaction.followup.send("✅ You've locked in! Waiting for the other player...", ephemeral=True)
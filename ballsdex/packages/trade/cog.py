@@ -219,7 +219,7 @@ class Trade(commands.GroupCog):
                 ephemeral=True,
             )
             return
-        if await countryball.is_locked():
+        if not await countryball.lock_for_trade():
             await interaction.followup.send(
                 f"This {settings.collectible_name} is currently in an active trade or donation, "
                 "please try again later.",
@@ -227,7 +227,6 @@ class Trade(commands.GroupCog):
             )
             return
 
-        await countryball.lock_for_trade()
         trader.proposal.append(countryball)
         await interaction.followup.send(
             f"{countryball.countryball.country} added.", ephemeral=True
@@ -408,18 +407,12 @@ class Trade(commands.GroupCog):
         if special:
             queryset = queryset.filter(Q(tradeobjects__ballinstance__special=special)).distinct()
 
-        history = await queryset.order_by(sort_value).prefetch_related(
-            "player1",
-            "player2",
-            "tradeobjects__ballinstance__ball",
-            "tradeobjects__ballinstance__special",
-        )
-
-        if not history:
+        source = TradeViewFormat(queryset, interaction.user.name, self.bot, sorting=sort_value)
+        await source.prepare()
+        if not source.count:
             await interaction.followup.send("No history found.", ephemeral=True)
             return
 
-        source = TradeViewFormat(history, interaction.user.name, self.bot)
         pages = Pages(source=source, interaction=interaction)
         await pages.start()
 
@@ -1,32 +1,58 @@
-from typing import TYPE_CHECKING, Iterable
+from typing import TYPE_CHECKING
 
 import discord
 
 from ballsdex.core.models import Trade as TradeModel
-from ballsdex.core.utils import menus
-from ballsdex.core.utils.paginator import Pages
+from ballsdex.core.utils.paginator import Pages, QuerySetPageSource
 from ballsdex.packages.trade.trade_user import TradingUser
 
 if TYPE_CHECKING:
+    from tortoise.queryset import QuerySet
+
     from ballsdex.core.bot import BallsDexBot
 
 
-class TradeViewFormat(menus.ListPageSource):
+class TradeViewFormat(QuerySetPageSource):
+    """
+    Display a trade history one trade per page, fetching each trade when shown.
+
+    Parameters
+    ----------
+    queryset: QuerySet[TradeModel]
+        The trades to display, not ordered.
+    header: str
+        The subject of the history, shown in the title.
+    bot: BallsDexBot
+        The bot object.
+    is_admin: bool
+        Show the details reserved to admins.
+    url: str | None
+        Link of the title, for admins.
+    sorting: str
+        ``"-date"`` to show the most recent trades first, or ``"date"``.
+    """
+
     def __init__(
         self,
-        entries: Iterable[TradeModel],
+        queryset: "QuerySet[TradeModel]",
         header: str,
         bot: "BallsDexBot",
         is_admin: bool = False,
         url: str | None = None,
+        sorting: str = "-date",
     ):
         self.header = header
         self.url = url
         self.bot = bot
         self.is_admin = is_admin
-        super().__init__(entries, per_page=1)
+        keys = [sorting, "-id" if sorting.startswith("-") else "id"]
+        super().__init__(queryset.prefetch_related("player1", "player2"), keys, per_page=1)
 
-    async def format_page(self, menu: Pages, trade: TradeModel) -> discord.Embed:
+    async def format_page(self, menu: Pages, trade: TradeModel | None) -> discord.Embed:
+        if trade is None:
+            return discord.Embed(
+                title=f"Trade history for {self.header}", description="No history found."
+            )
         embed = discord.Embed(
             title=f"Trade history for {self.header}",
             description=f"Trade ID: {trade.pk:0X}",
@@ -8,9 +8,13 @@ from typing import TYPE_CHECKING, List, Set, cast
 import discord
 from discord.ui import Button, View, button
 from discord.utils import format_dt, utcnow
+from tortoise.transactions import in_transaction
 
-from ballsdex.core.models import BallInstance, Player, Trade, TradeObject
+from ballsdex.core.metrics import trade_commit_time
+from ballsdex.core.models import BallInstance, Player, PlayerStats, Trade, TradeObject
 from ballsdex.core.utils import menus
+from ballsdex.core.utils.inventory import inventories
+from ballsdex.core.utils.locks import lock_manager
 from ballsdex.core.utils.buttons import ConfirmChoiceView
 from ballsdex.core.utils.paginator import Pages
 from ballsdex.packages.balls.countryballs_paginator import CountryballsViewer
@@ -100,8 +104,7 @@ class TradeView(View):
             )
             return
 
-        for countryball in trader.proposal:
-            await countryball.unlock()
+        await lock_manager.release(trader.proposal)
 
         trader.proposal.clear()
         await interaction.followup.send("Proposal cleared.", ephemeral=True)
@@ -305,8 +308,7 @@ class TradeMenu:
         if self.task:
             self.task.cancel()
 
-        for countryball in self.trader1.proposal + self.trader2.proposal:
-            await countryball.unlock()
+        await lock_manager.release(self.trader1.proposal + self.trader2.proposal)
 
         self.current_view.stop()
         for item in self.current_view.children:
@@ -345,38 +347,64 @@ class TradeMenu:
         await self.cancel()
 
     async def perform_trade(self):
-        valid_transferable_countryballs: list[BallInstance] = []
-
-        trade = await Trade.create(player1=self.trader1.player, player2=self.trader2.player)
-
-        for countryball in self.trader1.proposal:
-            await countryball.refresh_from_db()
-            if countryball.player.discord_id != self.trader1.player.discord_id:
-                # This is a invalid mutation, the player is not the owner of the countryball
-                raise InvalidTradeOperation()
-            countryball.player = self.trader2.player
-            countryball.trade_player = self.trader1.player
-            countryball.favorite = False
-            valid_transferable_countryballs.append(countryball)
-            await TradeObject.create(
-                trade=trade, ballinstance=countryball, player=self.trader1.player
-            )
-
-        for countryball in self.trader2.proposal:
-            if countryball.player.discord_id != self.trader2.player.discord_id:
-                # This is a invalid mutation, the player is not the owner of the countryball
-                raise InvalidTradeOperation()
-            countryball.player = self.trader1.player
-            countryball.trade_player = self.trader2.player
-            countryball.favorite = False
-            valid_transferable_countryballs.append(countryball)
-            await TradeObject.create(
-                trade=trade, ballinstance=countryball, player=self.trader2.player
-            )
-
-        for countryball in valid_transferable_countryballs:
-            await countryball.unlock()
-            await countryball.save()
+        """
+        Transfer the proposals in a single transaction. The instances are locked for update and
+        their owner is checked first, raising `InvalidTradeOperation` and leaving the database
+        untouched if any of them changed.
+        """
+        transfers = (
+            (self.trader1.proposal, self.trader1.player, self.trader2.player),
+            (self.trader2.proposal, self.trader2.player, self.trader1.player),
+        )
+        with trade_commit_time.time():
+            async with in_transaction() as connection:
+                ids = [x.pk for proposal, _, _ in transfers for x in proposal]
+                rows = {
+                    x.pk: x
+                    for x in await BallInstance.filter(id__in=ids)
+                    .select_for_update()
+                    .using_db(connection)
+                }
+                for proposal, giver, _ in transfers:
+                    for countryball in proposal:
+                        row = rows.get(countryball.pk)
+                        # deleted, owned by someone else, or its trade lock was released
+                        if row is None or row.player_id != giver.pk or row.locked is None:
+                            raise InvalidTradeOperation()
+
+                trade = await Trade.create(
+                    player1=self.trader1.player, player2=self.trader2.player, using_db=connection
+                )
+                for proposal, giver, receiver in transfers:
+                    if not proposal:
+                        continue
+                    await BallInstance.filter(id__in=[x.pk for x in proposal]).using_db(
+                        connection
+                    ).update(player=receiver, trade_player=giver, favorite=False, locked=None)
+                await TradeObject.bulk_create(
+                    [
+                        TradeObject(trade=trade, ballinstance=countryball, player=giver)
+                        for proposal, giver, _ in transfers
+                        for countryball in proposal
+                    ],
+                    using_db=connection,
+                )
+                for trader, other in ((self.trader1, self.trader2), (self.trader2, self.trader1)):
+                    await PlayerStats.record(
+                        trader.player.pk,
+                        added=other.proposal,
+                        removed=trader.proposal,
+                        trade=trade,
+                        using_db=connection,
+                    )
+
+        for proposal, giver, receiver in transfers:
+            for countryball in proposal:
+                countryball.player = receiver
+                countryball.trade_player = giver
+                countryball.favorite = False
+            lock_manager.discard(proposal)
+            inventories.move(proposal, giver.pk, receiver.pk)
 
     async def confirm(self, trader: TradingUser) -> bool:
         """
@@ -532,25 +560,24 @@ class CountryballsSelector(Pages):
                     f"{settings.collectible_name.title()} #{ball.pk:0X} is not tradeable.",
                     ephemeral=True,
                 )
-            if await ball.is_locked():
-                return await interaction.followup.send(
-                    f"{settings.collectible_name.title()} #{ball.pk:0X} is locked "
-                    "for trade and won't be added to the proposal.",
-                    ephemeral=True,
-                )
+        if any(ball.favorite for ball in self.balls_selected):
             view = ConfirmChoiceView(interaction)
-            if ball.favorite:
-                await interaction.followup.send(
-                    f"One or more of the {settings.plural_collectible_name} is favorited, "
-                    "are you sure you want to add it to the trade?",
-                    view=view,
-                    ephemeral=True,
-                )
-                await view.wait()
-                if not view.value:
-                    return
-            trader.proposal.append(ball)
-            await ball.lock_for_trade()
+            await interaction.followup.send(
+                f"One or more of the {settings.plural_collectible_name} is favorited, "
+                "are you sure you want to add it to the trade?",
+                view=view,
+                ephemeral=True,
+            )
+            await view.wait()
+            if not view.value:
+                return
+        if busy := await lock_manager.try_lock(self.balls_selected):
+            return await interaction.followup.send(
+                f"{settings.collectible_name.title()} #{busy[0].pk:0X} is locked "
+                "for trade and won't be added to the proposal.",
+                ephemeral=True,
+            )
+        trader.proposal.extend(self.balls_selected)
         grammar = (
             f"{settings.collectible_name}"
             if len(self.balls_selected) == 1
@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import yaml
 
@@ -68,6 +68,20 @@ class Settings:
         ID of the Discord application
     client_secret: str
         Secret key of the Discord application (not the bot token)
+    card_cache_size: int
+        Memory budget of the rendered cards cache, in megabytes. 0 disables it.
+    card_cache_directory: str | None
+        Directory where rendered cards are persisted across restarts, disabled if empty
+    render_workers: int
+        Number of processes rendering cards. 0 renders them in a thread of the bot process.
+    render_queue_size: int
+        Maximum number of card renders submitted at once
+    card_encoding: dict[str, dict[str, Any]]
+        Output format of the card images per call site, see `get_encoder`
+    spawn_cache_size: int
+        Memory budget of the wild cards cache, in megabytes. 0 disables it.
+    spawn_cache_reencode: bool
+        Whether wild cards above the size limit of the spawn encoder are re-encoded
     """
 
     bot_token: str = ""
@@ -108,8 +122,19 @@ class Settings:
     prometheus_enabled: bool = False
     prometheus_host: str = "0.0.0.0"
     prometheus_port: int = 15260
+    query_log_threshold: int | None = None
 
     spawn_manager: str = "ballsdex.packages.countryballs.spawn.SpawnManager"
+    spawn_trace: str | None = None
+
+    # card rendering
+    card_cache_size: int = 64
+    card_cache_directory: str | None = None
+    render_workers: int = 2
+    render_queue_size: int = 32
+    card_encoding: dict[str, dict[str, Any]] = field(default_factory=dict)
+    spawn_cache_size: int = 64
+    spawn_cache_reencode: bool = False
 
     # django admin panel
     webhook_url: str | None = None
@@ -154,6 +179,7 @@ def read_settings(path: "Path"):
     settings.prometheus_enabled = content["prometheus"]["enabled"]
     settings.prometheus_host = content["prometheus"]["host"]
     settings.prometheus_port = content["prometheus"]["port"]
+    settings.query_log_threshold = content["prometheus"].get("query-log-threshold")
 
     settings.max_favorites = content.get("max-favorites", 50)
     settings.max_attack_bonus = content.get("max-attack-bonus", 20)
@@ -172,6 +198,21 @@ def read_settings(path: "Path"):
     settings.spawn_manager = content.get(
         "spawn-manager", "ballsdex.packages.countryballs.spawn.SpawnManager"
     )
+    settings.spawn_trace = content.get("spawn-trace")
+
+    if card_cache := content.get("card-cache"):
+        settings.card_cache_size = card_cache.get("memory-size", 64)
+        settings.card_cache_directory = card_cache.get("directory")
+
+    if card_render := content.get("card-render"):
+        settings.render_workers = card_render.get("workers", 2)
+        settings.render_queue_size = card_render.get("queue-size", 32)
+
+    settings.card_encoding = content.get("card-encoding") or {}
+
+    if spawn_cache := content.get("spawn-cache"):
+        settings.spawn_cache_size = spawn_cache.get("memory-size", 64)
+        settings.spawn_cache_reencode = spawn_cache.get("re-encode", False)
 
     if admin := content.get("admin-panel"):
         settings.webhook_url = admin.get("webhook-url")
@@ -299,8 +340,55 @@ prometheus:
   enabled: false
   host: "0.0.0.0"
   port: 15260
+  # log the application commands making more database queries than this, leave empty to disable
+  query-log-threshold:
 
 spawn-manager: ballsdex.packages.countryballs.spawn.SpawnManager
+
+# file where the messages handled by the spawn manager are recorded, to evaluate spawn managers
+# offline with "python -m ballsdex.spawnsim --trace <file>", leave empty to disable
+spawn-trace:
+
+# cache of the generated card images
+card-cache:
+  # memory used to keep recently rendered cards, in megabytes (0 to disable)
+  memory-size: 64
+
+  # optional directory where rendered cards are persisted across restarts
+  directory:
+
+# card rendering processes
+card-render:
+  # number of processes drawing cards, 0 renders them in a thread of the bot process
+  workers: 2
+
+  # maximum number of renders submitted at once, further requests wait for a free slot
+  queue-size: 32
+
+# output format of the card images, per context
+# "default" applies everywhere, and can be overridden for "spawn" (wild cards), "info" (/balls
+# info and lists), "pack" (pack walkouts and gifts) and "preview" (admin panel previews)
+card-encoding:
+  default:
+    # webp, jpeg or png
+    format: webp
+    # quality between 0 and 100, ignored for png and lossless webp
+    quality: 80
+    # webp compression effort, between 0 (fastest) and 6 (smallest)
+    method: 4
+    lossless: false
+    # size in kilobytes above which the image is re-encoded as jpeg, leave empty to disable
+    max-size:
+  preview:
+    format: png
+
+# cache of the wild card images sent when a countryball spawns
+spawn-cache:
+  # memory used to keep the wild cards, in megabytes (0 to disable)
+  memory-size: 64
+
+  # re-encode the wild cards bigger than the "max-size" of the "spawn" card encoding
+  re-encode: false
   """  # noqa: W291
     )
 
@@ -317,6 +405,10 @@ def update_settings(path: "Path"):
     add_packages = "packages:" not in content
     add_spawn_manager = "spawn-manager" not in content
     add_django = "Admin panel related settings" not in content
+    add_card_cache = "card-cache:" not in content
+    add_card_render = "card-render:" not in content
+    add_card_encoding = "card-encoding:" not in content
+    add_spawn_cache = "spawn-cache:" not in content
 
     for line in content.splitlines():
         if line.startswith("owners:"):
@@ -402,6 +494,59 @@ admin-panel:
     # set to an empty string to disable those links entirely
     url: http://localhost:8000
 
+"""
+
+    if add_card_cache:
+        content += """
+# cache of the generated card images
+card-cache:
+  # memory used to keep recently rendered cards, in megabytes (0 to disable)
+  memory-size: 64
+
+  # optional directory where rendered cards are persisted across restarts
+  directory:
+"""
+
+    if add_card_render:
+        content += """
+# card rendering processes
+card-render:
+  # number of processes drawing cards, 0 renders them in a thread of the bot process
+  workers: 2
+
+  # maximum number of renders submitted at once, further requests wait for a free slot
+  queue-size: 32
+"""
+
+    if add_card_encoding:
+        content += """
+# output format of the card images, per context
+# "default" applies everywhere, and can be overridden for "spawn" (wild cards), "info" (/balls
+# info and lists), "pack" (pack walkouts and gifts) and "preview" (admin panel previews)
+card-encoding:
+  default:
+    # webp, jpeg or png
+    format: webp
+    # quality between 0 and 100, ignored for png and lossless webp
+    quality: 80
+    # webp compression effort, between 0 (fastest) and 6 (smallest)
+    method: 4
+    lossless: false
+    # size in kilobytes above which the image is re-encoded as jpeg, leave empty to disable
+    max-size:
+  preview:
+    format: png
+"""
+
+    if add_spawn_cache:
+        content += """
+# cache of the wild card images sent when a countryball spawns
+spawn-cache:
+  # memory used to keep the wild cards, in megabytes (0 to disable)
+  memory-size: 64
+
+  # re-encode the wild cards bigger than the "max-size" of the "spawn" card encoding
+  re-encode: false
 """
 
     if any(
@@ -415,6 +560,10 @@ admin-panel:
             add_packages,
             add_spawn_manager,
             add_django,
+            add_card_cache,
+            add_card_render,
+            add_card_encoding,
+            add_spawn_cache,
         )
     ):
         path.write_text(content)
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Iterable
+
+from rich import box, print
+from rich.table import Table
+
+from ballsdex.settings import read_settings, settings
+
+if TYPE_CHECKING:
+    from ballsdex.packages.countryballs.spawn import BaseSpawnManager
+
+# guild size categories, matching the time multipliers of the default spawn manager
+GUILD_SIZES = ((5, "1-4"), (100, "5-99"), (1000, "100-999"), (None, "1000+"))
+
+
+class CLIFlags(argparse.Namespace):
+    manager: str | None
+    trace: Path | None
+    guilds: int
+    messages: int
+    hours: float
+    seed: int
+    config_file: Path | None
+
+
+def parse_cli_flags(arguments: list[str]) -> CLIFlags:
+    parser = argparse.ArgumentParser(
+        prog="python -m ballsdex.spawnsim",
+        description="Replay a recorded or synthetic message trace through a spawn manager, "
+        "with time following the messages",
+    )
+    parser.add_argument(
+        "--manager",
+        help="Python path to the spawn manager class, defaults to the configured one",
+    )
+    parser.add_argument(
+        "--trace", type=Path, help="Trace recorded with the spawn-trace setting to replay"
+    )
+    parser.add_argument(
+        "--guilds", type=int, default=10000, help="Number of guilds of the synthetic trace"
+    )
+    parser.add_argument(
+        "--messages", type=int, default=500_000, help="Number of messages of the synthetic trace"
+    )
+    parser.add_argument(
+        "--hours", type=float, default=24, help="Duration of the synthetic trace in hours"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generators")
+    parser.add_argument(
+        "--config-file", type=Path, help="Load this config.yml, for managers reading settings"
+    )
+    return parser.parse_args(arguments, namespace=CLIFlags())
+
+
+def guild_size(member_count: int) -> str:
+    for limit, name in GUILD_SIZES:
+        if limit is None or member_count < limit:
+            return name
+    raise AssertionError("unreachable")
+
+
+@dataclass
+class GuildStats:
+    member_count: int = 0
+    messages: int = 0
+    spawns: int = 0
+
+
+@dataclass
+class SimulationResult:
+    guilds: dict[int, GuildStats] = field(default_factory=dict)
+    algorithms: Counter[str] = field(default_factory=Counter)
+    messages: int = 0
+    spawns: int = 0
+    elapsed: float = 0.0
+    start: datetime | None = None
+    end: datetime | None = None
+
+    @property
+    def hours(self) -> float:
+        if self.start is None or self.end is None:
+            return 0.0
+        return (self.end - self.start).total_seconds() / 3600
+
+
+async def simulate(
+    manager: "BaseSpawnManager", batches: Iterable[list[SimpleNamespace]]
+) -> SimulationResult:
+    """
+    Feed batches of message-like objects to a spawn manager, in order.
+
+    Time only moves with the creation date of the messages, the default managers don't read
+    any other clock. Only the calls to ``handle_message`` are timed.
+    """
+    result = SimulationResult()
+    for batch in batches:
+        if not batch:
+            continue
+        if result.start is None:
+            result.start = batch[0].created_at
+        result.end = batch[-1].created_at
+
+        start = time.perf_counter()
+        outcomes = [await manager.handle_message(message) for message in batch]  # type: ignore
+        result.elapsed += time.perf_counter() - start
+
+        for message, outcome in zip(batch, outcomes):
+            stats = result.guilds.get(message.guild.id)
+            if stats is None:
+                stats = result.guilds[message.guild.id] = GuildStats()
+            stats.member_count = message.guild.member_count
+            stats.messages += 1
+            if outcome is False:
+                continue
+            stats.spawns += 1
+            result.algorithms[outcome[1] if isinstance(outcome, tuple) else "default"] += 1
+        result.messages += len(batch)
+    result.spawns = sum(x.spawns for x in result.guilds.values())
+    return result
+
+
+def print_report(result: SimulationResult):
+    hours = result.hours
+    rate = result.messages / result.elapsed if result.elapsed else 0.0
+    print(
+        f"Replayed [cyan]{result.messages:,}[/cyan] messages from "
+        f"[cyan]{len(result.guilds):,}[/cyan] guilds over [cyan]{hours:.1f}[/cyan] hours"
+    )
+    print(f"Handler throughput: [green]{rate:,.0f}[/green] messages per second")
+
+    table = Table(box=box.SIMPLE)
+    table.add_column("Members", style="cyan")
+    table.add_column("Guilds", justify="right")
+    table.add_column("Messages", justify="right")
+    table.add_column("Spawns", justify="right", style="green")
+    table.add_column("Spawns / guild-hour", justify="right", style="green")
+    table.add_column("Spawns / 1k messages", justify="right")
+
+    sizes: dict[str, list[GuildStats]] = {name: [] for _, name in GUILD_SIZES}
+    for stats in result.guilds.values():
+        sizes[guild_size(stats.member_count)].append(stats)
+    for name, guilds in [*sizes.items(), ("Total", list(result.guilds.values()))]:
+        messages = sum(x.messages for x in guilds)
+        spawns = sum(x.spawns for x in guilds)
+        table.add_row(
+            name,
+            f"{len(guilds):,}",
+            f"{messages:,}",
+            f"{spawns:,}",
+            f"{spawns / (len(guilds) * hours):.3f}" if guilds and hours else "-",
+            f"{spawns / messages * 1000:.2f}" if messages else "-",
+        )
+    print(table)
+
+    if len(result.algorithms) > 1:
+        table = Table(box=box.SIMPLE)
+        table.add_column("Algorithm", style="cyan")
+        table.add_column("Spawns", justify="right", style="green")
+        for algorithm, spawns in result.algorithms.most_common():
+            table.add_row(algorithm, f"{spawns:,}")
+        print(table)
+
+
+def main():
+    flags = parse_cli_flags(sys.argv[1:])
+    if flags.config_file:
+        read_settings(flags.config_file)
+    # the thresholds drawn by the managers are reproducible too
+    random.seed(flags.seed)
+
+    module_path, class_name = (flags.manager or settings.spawn_manager).rsplit(".", 1)
+    manager_cls: type[BaseSpawnManager] = getattr(
+        importlib.import_module(module_path), class_name
+    )
+    # no bot is running, managers must not rely on it to handle messages
+    manager = manager_cls(None)  # type: ignore
+
+    if flags.trace:
+        from ballsdex.packages.countryballs.trace import read_trace
+
+        batches = read_trace(flags.trace)
+    else:
+        from ballsdex.packages.countryballs.benchmark import SyntheticStream
+
+        stream = SyntheticStream(flags.guilds, flags.hours * 3600, seed=flags.seed)
+        batches = stream.messages(flags.messages)
+
+    result = asyncio.run(simulate(manager, batches))
+    print(f"Spawn manager: [cyan]{manager_cls.__module__}.{manager_cls.__name__}[/cyan]")
+    print_report(result)
+
+
+if __name__ == "__main__":
+    main()